@@ -1,14 +1,23 @@
 # =======================================
 # 🌐 PROXY API — Mercado Livre + Shopee
 # =======================================
-from flask import Flask, request, jsonify
-import requests
+from quart import Quart, Response, request, jsonify
+import asyncio
+import json
 import hmac
 import hashlib
 import time
 import os
 
-app = Flask(__name__)
+from utils.http import enviar, fechar_clientes
+from utils.cache import TTLCache, normalizar_termo, MISS, STALE, STALE_ERROR
+from utils import metrics, shared
+from utils.breaker import CircuitoAberto, estados
+
+app = Quart(__name__)
+
+# Estado para as sondas: pronto depois do startup, drenando depois do SIGTERM
+_saude = {"inicio": time.monotonic(), "pronto": False, "drenando": False}
 
 # ============================
 # 🔧 CONFIGURAÇÕES
@@ -16,35 +25,103 @@ app = Flask(__name__)
 SHOPEE_APP_ID = os.getenv("SHOPEE_APP_ID")
 SHOPEE_APP_SECRET = os.getenv("SHOPEE_APP_SECRET")
 
+# sobrescrevíveis para apontar a um upstream local (tools/mock_upstream.py)
+ML_BASE = os.getenv("ML_API_BASE", "https://api.mercadolibre.com")
+SHOPEE_BASE = os.getenv("SHOPEE_AFFILIATE_BASE", "https://open-api.affiliate.shopee.com.br")
+PAGE_SIZE = 5
+# Limites do endpoint em lote
+BULK_MAX_TERMOS = int(os.getenv("BULK_MAX_TERMS", 50))
+BULK_MAX_LIMIT = int(os.getenv("BULK_MAX_LIMIT", 50))
+
+# Cache das respostas do proxy: chave = (plataforma, termo normalizado, limit, offset)
+cache = TTLCache(
+    max_itens=int(os.getenv("PROXY_CACHE_SIZE", 1024)),
+    ttls={
+        "ml": float(os.getenv("PROXY_CACHE_TTL_ML", 120)),
+        "shopee": float(os.getenv("PROXY_CACHE_TTL_SHOPEE", 300)),
+    },
+    # serve vencido e revalida em segundo plano por até PROXY_SWR s;
+    # com o upstream falhando, serve a última resposta boa por até PROXY_STALE_GRACE s
+    swr=float(os.getenv("PROXY_SWR", 60)),
+    grace=float(os.getenv("PROXY_STALE_GRACE", 900)),
+    # SHARED_STATE: cache visto por todos os workers/réplicas
+    backend=shared.backend(),
+)
+
+
+def _ok(resultado) -> bool:
+    return resultado[1] == 200
+
+
+async def _consultar(plataforma: str, termo: str, limit: int, offset: int):
+    """Busca via cache (e rate limit do enviar): (body, status, estado, idade)."""
+    chave = (plataforma, termo, limit, offset)
+    fetch = BUSCAS[plataforma]
+    try:
+        (body, status), estado, idade = await cache.get_swr(chave, lambda: fetch(termo, limit, offset), _ok)
+    except Exception as e:
+        return {"error": str(e)}, 500, MISS, 0.0
+    return body, status, estado, idade
+
+
+async def _responder(plataforma: str, termo: str, limit: int = PAGE_SIZE, offset: int = 0):
+    """Resposta do proxy via cache, com cabeçalhos indicando se é stale."""
+    body, status, estado, idade = await _consultar(plataforma, termo, limit, offset)
+    headers = {"X-Cache": estado, "Age": str(int(idade))}
+    if estado == STALE:
+        headers["Warning"] = '110 - "Response is Stale"'
+    elif estado == STALE_ERROR:
+        headers["Warning"] = '111 - "Revalidation Failed"'
+    return jsonify(body), status, headers
+
+
+@app.before_serving
+async def _startup():
+    # o token do ML não é usado pelas rotas do proxy: a renovação proativa
+    # (tokens.iniciar) fica com o processo que publica, senão cada worker
+    # gastaria o mesmo refresh token de uso único
+    _saude["pronto"] = True
+
+
+@app.after_serving
+async def _shutdown():
+    await fechar_clientes()
+
+
+def iniciar_drenagem():
+    """Chamado pelo server.py no SIGTERM: /readyz passa a responder 503."""
+    _saude["drenando"] = True
+
 
 # ============================
 # 🟡 MERCADO LIVRE
 # ============================
-@app.route("/proxy/ml")
-def proxy_ml():
-    termo = request.args.get("q", "celulares")
+async def _buscar_ml(termo: str, limit: int, offset: int = 0):
+    params = {"q": termo, "limit": limit, "offset": offset, "sort": "price_asc", "condition": "new"}
     try:
-        url = f"https://api.mercadolibre.com/sites/MLB/search?q={termo}&limit=5&sort=price_asc&condition=new"
-        resp = requests.get(url, timeout=10)
+        resp = await enviar(ML_BASE, "GET", "/sites/MLB/search", params=params, hedge=True)
         if resp.status_code != 200:
-            return jsonify({"error": f"HTTP {resp.status_code}"}), resp.status_code
-        return jsonify(resp.json())
+            return {"error": f"HTTP {resp.status_code}"}, resp.status_code
+        return resp.json(), 200
+    except CircuitoAberto as e:
+        return {"error": str(e)}, 503
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+
+@app.route("/proxy/ml")
+async def proxy_ml():
+    termo = normalizar_termo(request.args.get("q", "celulares"))
+    return await _responder("ml", termo)
 
 
 # ============================
 # 🟠 SHOPEE
 # ============================
-@app.route("/proxy/shopee")
-def proxy_shopee():
-    termo = request.args.get("q", "celulares")
+async def _buscar_shopee(termo: str, page_size: int, offset: int = 0):
     timestamp = int(time.time())
     api_path = "/api/v1/offer/product_offer"
 
-    if not SHOPEE_APP_ID or not SHOPEE_APP_SECRET:
-        return jsonify({"error": "Shopee não configurado"}), 400
-
     # Assinatura HMAC
     base_string = f"{SHOPEE_APP_ID}{api_path}{timestamp}"
     sign = hmac.new(
@@ -53,36 +130,153 @@ def proxy_shopee():
         hashlib.sha256,
     ).hexdigest()
 
-    url = f"https://open-api.affiliate.shopee.com.br{api_path}"
     headers = {
         "Content-Type": "application/json",
         "X-Appid": str(SHOPEE_APP_ID),
         "X-Timestamp": str(timestamp),
         "X-Sign": sign,
     }
-    payload = {"page_size": 5, "page": 1, "keyword": termo}
+    # a API de afiliados pagina por número de página
+    payload = {"page_size": page_size, "page": offset // page_size + 1, "keyword": termo}
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
+        resp = await enviar(SHOPEE_BASE, "POST", api_path, headers=headers, json=payload)
         if resp.status_code != 200:
-            return jsonify({"error": f"HTTP {resp.status_code}"}), resp.status_code
-        return jsonify(resp.json())
+            return {"error": f"HTTP {resp.status_code}"}, resp.status_code
+        return resp.json(), 200
+    except CircuitoAberto as e:
+        return {"error": str(e)}, 503
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+
+@app.route("/proxy/shopee")
+async def proxy_shopee():
+    if not _shopee_configurado():
+        return jsonify({"error": "Shopee não configurado"}), 400
+
+    termo = normalizar_termo(request.args.get("q", "celulares"))
+    return await _responder("shopee", termo)
+
+
+BUSCAS = {"ml": _buscar_ml, "shopee": _buscar_shopee}
+
+
+def _shopee_configurado() -> bool:
+    return bool(SHOPEE_APP_ID and SHOPEE_APP_SECRET)
+
+
+# ============================
+# 📦 LOTE (NDJSON)
+# ============================
+def _inteiro(valor, padrao: int, minimo: int, maximo: int) -> int:
+    try:
+        n = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return max(minimo, min(n, maximo))
+
+
+@app.route("/proxy/bulk", methods=["GET", "POST"])
+async def proxy_bulk():
+    """
+    Vários termos numa requisição só: ?platform=ml&q=a&q=b,c&offset=0&limit=20
+    (ou POST com JSON {"platform", "terms", "offset", "limit"}). Os termos
+    vão ao upstream em paralelo, passando pelo cache e pelo rate limit, e
+    cada resultado sai como uma linha NDJSON assim que fica pronto. Na
+    Shopee o offset precisa ser múltiplo de limit.
+    """
+    dados = (await request.get_json(silent=True) or {}) if request.method == "POST" else {}
+    if not isinstance(dados, dict):
+        return jsonify({"error": "o corpo precisa ser um objeto JSON"}), 400
+    plataforma = dados.get("platform") or request.args.get("platform", "ml")
+    if not isinstance(plataforma, str) or plataforma not in BUSCAS:
+        return jsonify({"error": f"plataforma inválida: {plataforma}"}), 400
+    if plataforma == "shopee" and not _shopee_configurado():
+        return jsonify({"error": "Shopee não configurado"}), 400
+
+    brutos = dados.get("terms") or request.args.getlist("q")
+    if isinstance(brutos, str):
+        brutos = [brutos]
+    if not isinstance(brutos, list) or not all(isinstance(t, str) for t in brutos):
+        return jsonify({"error": "terms precisa ser uma string ou uma lista de strings"}), 400
+    termos = list(dict.fromkeys(
+        normalizar_termo(t) for item in brutos for t in item.split(",") if t.strip()
+    ))
+    if not termos:
+        return jsonify({"error": "informe ao menos um termo (q)"}), 400
+    if len(termos) > BULK_MAX_TERMOS:
+        return jsonify({"error": f"máximo de {BULK_MAX_TERMOS} termos por lote"}), 400
+
+    limit = _inteiro(dados.get("limit", request.args.get("limit")), PAGE_SIZE, 1, BULK_MAX_LIMIT)
+    offset = _inteiro(dados.get("offset", request.args.get("offset")), 0, 0, 10_000)
+    if plataforma == "shopee" and offset % limit:
+        # a API de afiliados só pagina por número de página
+        return jsonify({"error": "na Shopee o offset precisa ser múltiplo de limit"}), 400
+
+    async def linha(termo):
+        body, status, estado, idade = await _consultar(plataforma, termo, limit, offset)
+        return json.dumps({
+            "q": termo, "status": status, "cache": estado, "age": int(idade), "data": body,
+        }, ensure_ascii=False) + "\n"
+
+    async def gerar():
+        # se o cliente desconectar, as buscas em andamento terminam e ficam no
+        # cache (podem estar sendo aguardadas por outras requisições)
+        tarefas = [asyncio.ensure_future(linha(t)) for t in termos]
+        for proxima in asyncio.as_completed(tarefas):
+            yield (await proxima).encode("utf-8")
+
+    return Response(gerar(), content_type="application/x-ndjson; charset=utf-8")
+
+
+# ============================
+# 📊 STATS
+# ============================
+@app.route("/stats")
+async def stats():
+    return jsonify({"cache": cache.stats(), "circuitos": estados()})
+
+
+@app.route("/metrics")
+async def metrics_endpoint():
+    for nome, valor in cache.stats().items():
+        metrics.definir(f"proxy_cache_{nome}", valor)
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ============================
+# ❤️ SONDAS (liveness / readiness)
+# ============================
+@app.route("/healthz")
+async def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid(), "uptime": int(time.monotonic() - _saude["inicio"])})
+
+
+@app.route("/readyz")
+async def readyz():
+    if _saude["drenando"]:
+        return jsonify({"status": "draining"}), 503
+    if not _saude["pronto"]:
+        return jsonify({"status": "starting"}), 503
+    return jsonify({"status": "ready"})
 
 
 # ============================
 # 🩵 ROOT TEST
 # ============================
 @app.route("/")
-def index():
+async def index():
     return jsonify({
         "status": "ok",
         "message": "Proxy ativo ✅",
-        "endpoints": ["/proxy/ml?q=termo", "/proxy/shopee?q=termo"]
+        "endpoints": ["/proxy/ml?q=termo", "/proxy/shopee?q=termo",
+                      "/proxy/bulk?platform=ml&q=a,b&offset=0&limit=20", "/stats", "/metrics", "/healthz", "/readyz"]
     })
 
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
+    # produção: WEB_CONCURRENCY workers, sondas e drenagem no SIGTERM
+    from server import main
+
+    main()
@@ -1,8 +1,13 @@
 import os
-import requests
+import json
+import time
+import fcntl
+import asyncio
 import logging
+import tempfile
+from utils.http import enviar
+from utils import metrics, shared
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Variáveis do ambiente (Railway)
@@ -10,45 +15,273 @@ CLIENT_ID = os.getenv("ML_CLIENT_ID")
 CLIENT_SECRET = os.getenv("ML_CLIENT_SECRET")
 REFRESH_TOKEN = os.getenv("ML_REFRESH_TOKEN")
 
-def atualizar_token():
+ML_BASE = os.getenv("ML_API_BASE", "https://api.mercadolibre.com")
+TOKEN_FILE = os.getenv("ML_TOKEN_FILE", "data/ml_token.json")
+# Renova o token este tanto de segundos antes de expirar
+MARGEM = float(os.getenv("ML_TOKEN_MARGIN", 600))
+# Com SHARED_STATE: chave do token e tempo máximo esperando outro worker renovar
+CHAVE_COMPARTILHADA = "ml_token"
+ESPERA_RENOVACAO = 30.0
+
+
+def _salvar_atomico(path: str, dados: dict):
+    """Grava em arquivo temporário no mesmo diretório e troca com os.replace."""
+    pasta = os.path.dirname(path) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=".ml_token.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+class TokenManager:
     """
-    Atualiza automaticamente o token de acesso do Mercado Livre
-    usando o refresh_token salvo no Railway.
+    Mantém o access token do Mercado Livre em memória junto com a validade
+    (`expires_in`), renova antes de expirar em segundo plano e junta
+    renovações simultâneas numa só. O par access/refresh novo é persistido
+    em TOKEN_FILE (o refresh token do ML é de uso único); processos que
+    dividem o arquivo renovam um de cada vez (flock em TOKEN_FILE.lock) e
+    adotam o par que outro já gravou em vez de renovar de novo. Com estado
+    compartilhado (SHARED_STATE) o token também fica lá e só um worker
+    renova por vez; os outros adotam o token novo.
     """
-    if not all([CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN]):
-        logger.warning("⚠️ Variáveis do Mercado Livre não configuradas corretamente.")
-        return None
 
-    logger.info("🔄 Atualizando token de acesso do Mercado Livre...")
+    def __init__(self, path: str = TOKEN_FILE):
+        self.path = path
+        self.access_token = os.getenv("ML_ACCESS_TOKEN")
+        self.refresh_token = REFRESH_TOKEN
+        self.expira_em = None  # desconhecido para o token vindo do ambiente
+        self._renovando = None
+        self._tarefa = None
+        self._carregar()
 
-    url = "https://api.mercadolibre.com/oauth/token"
-    data = {
-        "grant_type": "refresh_token",
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "refresh_token": REFRESH_TOKEN
-    }
+    def _carregar(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.access_token = dados.get("access_token") or self.access_token
+        self.refresh_token = dados.get("refresh_token") or self.refresh_token
+        self.expira_em = dados.get("expira_em")
 
-    try:
-        response = requests.post(url, data=data)
-        if response.status_code == 200:
-            tokens = response.json()
-            novo_access = tokens.get("access_token")
-            novo_refresh = tokens.get("refresh_token")
+    def _perto_de_expirar(self) -> bool:
+        return self.expira_em is not None and time.time() >= self.expira_em - MARGEM
+
+    def _dados(self) -> dict:
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "expira_em": self.expira_em,
+        }
+
+    def _adotar(self, dados: dict, expirado: str = None) -> bool:
+        """Troca o par local por `dados` se for mais novo; True se ainda vale."""
+        novo = dados.get("access_token")
+        if not novo or novo == expirado or novo == self.access_token:
+            return False
+        if self.expira_em is not None and (dados.get("expira_em") or 0) <= self.expira_em:
+            return False
+        self.access_token = novo
+        self.refresh_token = dados.get("refresh_token") or self.refresh_token
+        self.expira_em = dados.get("expira_em")
+        return not self._perto_de_expirar()
+
+    async def _do_compartilhado(self, expirado: str = None) -> bool:
+        """Adota o token do estado compartilhado se for mais novo que o local."""
+        be = shared.backend()
+        if be is None:
+            return False
+        entrada = await be.get(CHAVE_COMPARTILHADA)
+        if entrada is None:
+            return False
+        return self._adotar(entrada[1], expirado)
+
+    def _do_arquivo(self, expirado: str = None) -> bool:
+        """Adota o par que outro processo gravou em TOKEN_FILE, se for mais novo."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        return self._adotar(dados, expirado)
+
+    async def _travar_arquivo(self):
+        """
+        Trava exclusiva (flock) em TOKEN_FILE.lock, esperando até
+        ESPERA_RENOVACAO. Devolve o descritor (fechar solta a trava) ou None
+        se o arquivo não pode ser criado; TimeoutError se outro processo não
+        soltou a trava a tempo.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            logger.warning(f"⚠️ Sem trava em {self.path}.lock: {e}")
+            return None
+        prazo = time.monotonic() + ESPERA_RENOVACAO
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    if time.monotonic() >= prazo:
+                        raise TimeoutError(f"trava {self.path}.lock ocupada")
+                    await asyncio.sleep(0.1)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    async def get_token(self):
+        if not self.access_token or self._perto_de_expirar():
+            if not await self._do_compartilhado():
+                await self.renovar()
+        return self.access_token
+
+    async def renovar(self, expirado: str = None):
+        """
+        Renova o token. Se `expirado` for informado e outro chamador já
+        trocou o token, devolve o atual sem nova chamada.
+        """
+        if expirado is not None and self.access_token and expirado != self.access_token:
+            return self.access_token
+        if self._renovando is None:
+            self._renovando = asyncio.ensure_future(self._renovar_compartilhado(expirado))
+            self._renovando.add_done_callback(lambda _: setattr(self, "_renovando", None))
+        return await asyncio.shield(self._renovando)
+
+    async def _renovar_compartilhado(self, expirado: str = None):
+        """Entre workers: um renova, os outros esperam e adotam o token novo."""
+        be = shared.backend()
+        if be is None:
+            return await self._renovar()
+        if await self._do_compartilhado(expirado or self.access_token):
+            return self.access_token
+        reservado = await be.lease("ml_token_refresh", ESPERA_RENOVACAO)
+        prazo = time.monotonic() + ESPERA_RENOVACAO
+        while not reservado and time.monotonic() < prazo:
+            await asyncio.sleep(0.5)
+            if await self._do_compartilhado(expirado or self.access_token):
+                return self.access_token
+            reservado = await be.lease("ml_token_refresh", ESPERA_RENOVACAO)
+        try:
+            # o refresh token pode ter sido trocado por outro worker enquanto esperávamos
+            if await self._do_compartilhado(expirado or self.access_token):
+                return self.access_token
+            token = await self._renovar()
+            if token:
+                await be.set(CHAVE_COMPARTILHADA, self._dados(), max(60.0, self.expira_em - time.time()))
+            return token
+        finally:
+            if reservado:
+                await be.liberar("ml_token_refresh")
+
+    async def _renovar(self):
+        if not all([CLIENT_ID, CLIENT_SECRET, self.refresh_token]):
+            logger.warning("⚠️ Variáveis do Mercado Livre não configuradas corretamente.")
+            return None
+
+        try:
+            trava = await self._travar_arquivo()
+        except TimeoutError as e:
+            logger.warning(f"⚠️ Outro processo está renovando o token do ML: {e}")
+            return None
+        try:
+            # outro processo pode ter renovado enquanto esperávamos a trava:
+            # o refresh token que temos já foi gasto, adota o par do arquivo
+            if self._do_arquivo(self.access_token):
+                logger.info("🔁 Token do Mercado Livre renovado por outro processo.")
+                return self.access_token
+            return await self._renovar_travado()
+        finally:
+            if trava is not None:
+                os.close(trava)
+
+    async def _renovar_travado(self):
+        logger.info("🔄 Atualizando token de acesso do Mercado Livre...")
 
-            logger.info("✅ Token atualizado com sucesso!")
-            logger.info(f"Novo Access Token: {novo_access[:30]}...")
+        data = {
+            "grant_type": "refresh_token",
+            "client_id": CLIENT_ID,
+            "client_secret": CLIENT_SECRET,
+            "refresh_token": self.refresh_token
+        }
 
-            print("\n🚀 Atualize no Railway:")
-            print(f"ML_ACCESS_TOKEN={novo_access}")
-            print(f"ML_REFRESH_TOKEN={novo_refresh}\n")
+        try:
+            # uma tentativa só: o refresh token é de uso único, e repetir depois
+            # de uma resposta perdida (o ML já trocou o par) queimaria o token.
+            # Quem decide tentar de novo é o loop de fundo / o próximo chamador.
+            with metrics.cronometro("ml_token_refresh_seconds"):
+                response = await enviar(ML_BASE, "POST", "/oauth/token", data=data, tentativas=1)
+        except Exception as e:
+            metrics.contar("ml_token_refresh_total", resultado="erro")
+            logger.error(f"❌ Erro ao tentar atualizar token: {e}")
+            return None
 
-            return novo_access
-        else:
+        if response.status_code != 200:
+            metrics.contar("ml_token_refresh_total", resultado=str(response.status_code))
             logger.warning(f"⚠️ Erro ao atualizar token: {response.status_code}")
             logger.warning(response.text)
             return None
 
-    except Exception as e:
-        logger.error(f"❌ Erro ao tentar atualizar token: {e}")
-        return None
+        metrics.contar("ml_token_refresh_total", resultado="ok")
+        tokens = response.json()
+        self.access_token = tokens.get("access_token")
+        self.refresh_token = tokens.get("refresh_token") or self.refresh_token
+        self.expira_em = time.time() + float(tokens.get("expires_in") or 21600)
+
+        os.environ["ML_ACCESS_TOKEN"] = self.access_token
+        os.environ["ML_REFRESH_TOKEN"] = self.refresh_token
+        try:
+            _salvar_atomico(self.path, self._dados())
+        except OSError as e:
+            logger.error(f"❌ Não foi possível salvar o token em {self.path}: {e}")
+
+        logger.info("✅ Token atualizado com sucesso!")
+        return self.access_token
+
+    def iniciar(self) -> bool:
+        """
+        Agenda a renovação proativa em segundo plano (se houver credenciais).
+        Só no processo que publica: as rotas do proxy não usam o token.
+        """
+        if not all([CLIENT_ID, CLIENT_SECRET, self.refresh_token]):
+            return False
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+            logger.info("🗓️ Renovação do token do Mercado Livre agendada.")
+        return True
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+    async def _loop(self):
+        while True:
+            if self.expira_em is None:
+                espera = MARGEM
+            else:
+                espera = max(0.0, self.expira_em - MARGEM - time.time())
+            await asyncio.sleep(espera)
+            if self.expira_em is None or self._perto_de_expirar():
+                if await self.renovar() is None:
+                    await asyncio.sleep(60)
+
+
+tokens = TokenManager()
+
+
+async def atualizar_token():
+    """
+    Atualiza o token de acesso do Mercado Livre (compatibilidade; use `tokens`).
+    """
+    return await tokens.renovar()
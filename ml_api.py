@@ -1,12 +1,22 @@
 import os
-import requests
 import random
+import asyncio
 import logging
-from mercadolivre_token import atualizar_token  # Importa o atualizador automático
+from mercadolivre_token import tokens  # Gerenciador do token OAuth
+from utils.http import enviar
+from utils.store import get_store
+from utils.parsing import ler_itens, projetar_ml
+from utils import metrics
 
-# Configuração de log
 logger = logging.getLogger("ml_api")
-logging.basicConfig(level=logging.INFO)
+
+# ML_API_BASE aponta para outro servidor (ex.: tools/mock_upstream.py)
+ML_BASE = os.getenv("ML_API_BASE", "https://api.mercadolibre.com")
+PAGE_SIZE = 50  # máximo de resultados por página em /sites/MLB/search
+PAGINAS_BUSCA = 5  # páginas olhadas atrás de itens ainda não postados
+MAX_OFFSET = 1000  # a busca pública não pagina além disso
+MULTIGET_LOTE = 20  # máximo de ids por /items?ids=
+MULTIGET_ATRIBUTOS = "id,title,price,currency_id,permalink,thumbnail"
 
 # Categorias para sortear buscas
 CATEGORIAS = [
@@ -19,18 +29,11 @@ CATEGORIAS = [
     "smartphones"
 ]
 
+# categoria -> offset da próxima página (buscar_ofertas_mercadolivre)
+_cursores = {}
 
-async def buscar_produto_mercadolivre():
-    """
-    Busca produtos do Mercado Livre via API oficial.
-    Evita bloqueios 403 e tenta modo público se necessário.
-    """
-
-    categoria = random.choice(CATEGORIAS)
-    url = f"https://api.mercadolibre.com/sites/MLB/search?q={categoria}"
-
-    access_token = os.getenv("ML_ACCESS_TOKEN")
 
+def _headers(access_token: str = None) -> dict:
     # Headers "disfarçados" de navegador real
     headers = {
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -49,49 +52,142 @@ async def buscar_produto_mercadolivre():
         headers["Authorization"] = f"Bearer {access_token}"
     else:
         logger.warning("⚠️ Token de acesso do Mercado Livre não configurado.")
+    return headers
+
+
+async def buscar_pagina_mercadolivre(categoria: str, offset: int = 0):
+    """
+    Busca a página da categoria que começa em `offset`, registra tudo no
+    pool local e devolve (ofertas ainda não postadas, offset da próxima
+    página). O próximo é None no fim da busca e o próprio `offset` em caso
+    de erro (a mesma página é tentada de novo).
+    Evita bloqueios 403 e tenta modo público se necessário.
+    """
+    path = "/sites/MLB/search"
+    params = {"q": categoria, "offset": offset, "limit": PAGE_SIZE}
+    access_token = await tokens.get_token()
+    headers = _headers(access_token)
+
+    async def _get():
+        return await enviar(ML_BASE, "GET", path, params=params, headers=headers, stream=True, hedge=True)
 
     try:
-        logger.info(f"🤖 Buscando ofertas na plataforma: MERCADOLIVRE ({categoria})")
-        response = requests.get(url, headers=headers, timeout=10)
+        logger.info(f"🤖 Buscando ofertas na plataforma: MERCADOLIVRE ({categoria}, offset {offset})")
+        response = await _get()
 
         # Token expirado → tenta atualizar automaticamente
         if response.status_code == 401:
             logger.warning("⚠️ Token expirado. Tentando atualizar automaticamente...")
-            novo_token = atualizar_token()
-            if novo_token:
-                headers["Authorization"] = f"Bearer {novo_token}"
-                response = requests.get(url, headers=headers, timeout=10)
+            metrics.contar("ml_fallback_total", tipo="401_refresh")
+            with metrics.cronometro("ml_fallback_seconds", tipo="401_refresh"):
+                novo_token = await tokens.renovar(expirado=access_token)
+                if novo_token:
+                    await response.aclose()
+                    headers["Authorization"] = f"Bearer {novo_token}"
+                    response = await _get()
 
         # Se ainda 403 → tenta modo público
         if response.status_code == 403:
+            await response.aclose()
             logger.warning("⚠️ Erro 403. Tentando novamente sem token (modo público)...")
-            headers.pop("Authorization", None)
-            response = requests.get(url, headers=headers, timeout=10)
+            metrics.contar("ml_fallback_total", tipo="403_public")
+            with metrics.cronometro("ml_fallback_seconds", tipo="403_public"):
+                headers.pop("Authorization", None)
+                response = await _get()
 
         if response.status_code != 200:
+            await response.aclose()
             logger.warning(f"⚠️ Erro da API Mercado Livre: {response.status_code}")
-            return None
+            return [], offset
 
-        data = response.json()
-        results = data.get("results", [])
+        # decodifica (em streaming se o corpo for grande) guardando só os campos usados
+        ofertas = await ler_itens(response, "results.item", projetar_ml)
 
-        if not results:
-            logger.warning("⚠️ Nenhuma oferta encontrada. Pulando ciclo.")
-            return None
+    except Exception as e:
+        logger.error(f"❌ Erro inesperado ao buscar produto: {e}")
+        return [], offset
 
-        produto = random.choice(results)
-        titulo = produto.get("title", "Produto sem título")
-        preco = produto.get("price", "Preço não informado")
-        link = produto.get("permalink", "Sem link")
+    store = get_store()
+    await store.registrar("MERCADOLIVRE", ofertas)
+    postados = await store.postados("MERCADOLIVRE", (o.chave for o in ofertas))
+    proximo = offset + PAGE_SIZE
+    if len(ofertas) < PAGE_SIZE or proximo >= MAX_OFFSET:
+        proximo = None
+    return [o for o in ofertas if o.chave not in postados], proximo
 
-        logger.info(f"✅ Produto encontrado: {titulo} - R${preco}")
 
-        return {
-            "titulo": titulo,
-            "preco": preco,
-            "link": link
-        }
+async def buscar_ofertas_mercadolivre(categoria: str) -> list:
+    """
+    Devolve as ofertas ainda não postadas da categoria, seguindo o cursor
+    dela: olha até PAGINAS_BUSCA páginas a partir de onde o ciclo anterior
+    parou e recomeça do início quando a busca acaba.
+    """
+    offset = _cursores.get(categoria, 0)
+    novas = []
+    for _ in range(PAGINAS_BUSCA):
+        novas, proximo = await buscar_pagina_mercadolivre(categoria, offset)
+        if proximo == offset:
+            break
+        offset = proximo or 0
+        if novas:
+            break
+    _cursores[categoria] = offset
+    return novas
+
+
+async def buscar_precos_mercadolivre(item_ids) -> list:
+    """
+    Preço atual de itens já conhecidos via multiget (/items?ids=, até 20
+    por chamada, só com os atributos do Offer). Lotes em paralelo; o rate
+    limit do host segura o ritmo.
+    """
+    ids = list(dict.fromkeys(str(i) for i in item_ids if i))
+    access_token = await tokens.get_token()
+    headers = {"Authorization": f"Bearer {access_token}"} if access_token else {}
+
+    async def _lote(parte):
+        params = {"ids": ",".join(parte), "attributes": MULTIGET_ATRIBUTOS}
+        try:
+            resp = await enviar(ML_BASE, "GET", "/items", params=params, headers=headers, hedge=True)
+        except Exception as e:
+            logger.error(f"❌ Erro no multiget do Mercado Livre: {e}")
+            return []
+        if resp.status_code != 200:
+            logger.warning(f"⚠️ Multiget Mercado Livre HTTP {resp.status_code}")
+            return []
+        return [projetar_ml(r.get("body") or {}) for r in resp.json() if r.get("code") == 200]
+
+    lotes = await asyncio.gather(*(
+        _lote(ids[i:i + MULTIGET_LOTE]) for i in range(0, len(ids), MULTIGET_LOTE)
+    ))
+    return [o for lote in lotes for o in lote if o is not None]
 
-    except Exception as e:
-        logger.error(f"❌ Erro inesperado ao buscar produto: {e}")
+
+async def buscar_produto_mercadolivre():
+    """
+    Busca produtos do Mercado Livre via API oficial.
+    Usa primeiro o pool local de ofertas; só busca na API quando ele esvazia.
+    """
+    store = get_store()
+    produto = await store.proxima("MERCADOLIVRE")
+    if produto:
+        logger.info(f"✅ Produto do pool: {produto.titulo} - {produto.preco}")
+        return produto
+
+    categoria = random.choice(CATEGORIAS)
+    if not await buscar_ofertas_mercadolivre(categoria):
+        logger.warning("⚠️ Nenhuma oferta nova encontrada. Pulando ciclo.")
+        return None
+
+    produto = await store.proxima("MERCADOLIVRE")
+    if not produto:
         return None
+
+    logger.info(f"✅ Produto encontrado: {produto.titulo} - {produto.preco}")
+    return produto
+
+
+async def buscar_ofertas(categorias: list, max_itens: int = 2) -> list:
+    """Interface comum dos provedores (providers/registry.py): uma oferta por rodada."""
+    produto = await buscar_produto_mercadolivre()
+    return [produto] if produto else []
@@ -0,0 +1,57 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional
+
+from providers import registry
+from utils.offer import Offer
+
+logger = logging.getLogger(__name__)
+
+# Prazo padrão (s) de cada provedor; pode ser ajustado por AGG_DEADLINE_<FONTE>
+DEADLINE = float(os.getenv("AGG_DEADLINE", "8"))
+
+
+def _normalizar(oferta, fonte: str) -> Optional[Offer]:
+    if isinstance(oferta, dict):
+        oferta = Offer.from_dict(oferta, fonte)
+    if not oferta or not oferta.link:
+        return None
+    return oferta
+
+
+def _deadline(fonte: str) -> float:
+    return float(os.getenv(f"AGG_DEADLINE_{fonte}", DEADLINE))
+
+
+async def _com_prazo(fonte: str, categorias: List[str], max_itens: int) -> List[Offer]:
+    prazo = _deadline(fonte)
+    try:
+        # o provedor só é importado aqui, na primeira busca
+        busca = registry.busca(fonte)
+        ofertas = await asyncio.wait_for(busca(categorias, max_itens), timeout=prazo)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ {fonte} passou do prazo ({prazo:.1f}s). Ignorado nesta rodada.")
+        return []
+    except Exception as e:
+        logger.error(f"❌ Falha no provedor {fonte}: {e}")
+        return []
+    return [o for o in (_normalizar(o, fonte) for o in ofertas or []) if o]
+
+
+async def buscar_ofertas(categorias: List[str], max_itens: int = 2,
+                         fontes: Optional[List[str]] = None) -> List[Offer]:
+    """
+    Consulta todos os provedores configurados ao mesmo tempo. Cada um tem o
+    seu prazo; o que não terminar a tempo é descartado. Devolve as ofertas
+    normalizadas (Offer: fonte/titulo/preco/link/imagem).
+    """
+    ativos = registry.configurados(fontes)
+    if not ativos:
+        logger.warning("⚠️ Nenhum provedor configurado.")
+        return []
+
+    lotes = await asyncio.gather(*(
+        _com_prazo(fonte, categorias, max_itens) for fonte in ativos
+    ))
+    return [oferta for lote in lotes for oferta in lote]
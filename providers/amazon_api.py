@@ -1,13 +1,16 @@
 import os
-import time
+import asyncio
 import json
-import hmac
-import base64
-import hashlib
 from typing import List, Dict
-import httpx
 import logging
 
+import httpx
+
+from utils.http import enviar
+from utils.offer import Offer
+from utils.sigv4 import SigV4Signer
+from utils.parsing import ler_itens, projetar_amazon
+
 logger = logging.getLogger(__name__)
 
 # PA-API 5
@@ -17,118 +20,142 @@ ASSOC_TAG  = os.getenv("AMAZON_ASSOCIATE_TAG", "").strip()
 HOST       = os.getenv("AMAZON_HOST", "webservices.amazon.com.br").strip()
 REGION     = os.getenv("AMAZON_REGION", "us-east-1").strip()
 
-# Endpoints PA-API 5
-ENDPOINT = f"https://{HOST}/paapi5/searchitems"
+# Servidor da PA-API 5 (AMAZON_BASE troca o servidor sem mudar o Host assinado)
+BASE = os.getenv("AMAZON_BASE", f"https://{HOST}").rstrip("/")
+TIMEOUT = 15.0
+
+RESOURCES = [
+    "Images.Primary.Large",
+    "ItemInfo.Title",
+    "Offers.Listings.Price"
+]
+
+# Limite de chamadas simultâneas à PA-API (a cota é baixa)
+CONCURRENCY = int(os.getenv("AMAZON_CONCURRENCY", "2"))
+GETITEMS_BATCH = 10  # máximo de ItemIds por GetItems
+
+# keywords simples por categoria
+KEYWORDS = {
+    "eletronicos": "eletrônicos ofertas",
+    "pecas de computador": "hardware pc ofertas",
+    "eletrodomesticos": "eletrodomésticos ofertas",
+    "ferramentas": "ferramentas elétricas ofertas"
+}
+
+_semaforo = None
+_signers: Dict[str, SigV4Signer] = {}
+
+
+def _limite() -> asyncio.Semaphore:
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(CONCURRENCY)
+    return _semaforo
+
+
+def _signer(operation: str) -> SigV4Signer:
+    # Assinatura V4 (PA-API usa SigV4 em HTTP + JSON); um assinador por operação
+    signer = _signers.get(operation)
+    if signer is None:
+        signer = SigV4Signer(
+            ACCESS_KEY, SECRET_KEY, HOST, REGION, "ProductAdvertisingAPI",
+            uri=f"/paapi5/{operation.lower()}",
+            target=f"com.amazon.paapi5.v1.ProductAdvertisingAPIv1.{operation}",
+        )
+        _signers[operation] = signer
+    return signer
+
+
+class _Assinatura(httpx.Auth):
+    """
+    Assina no momento do envio (dentro do semáforo, depois da espera no
+    token bucket) e de novo a cada tentativa: a PA-API recusa assinaturas
+    com mais de 5 minutos.
+    """
+
+    def __init__(self, signer: SigV4Signer, payload: str):
+        self.signer = signer
+        self.payload = payload
+
+    def auth_flow(self, request):
+        request.headers.update(self.signer.sign(self.payload))
+        yield request
+
+
+def _configurado() -> bool:
+    return bool(ACCESS_KEY and SECRET_KEY and ASSOC_TAG)
+
+
+async def _paapi_request(operation: str, payload: Dict, prefixo: str) -> List[Offer]:
+    """
+    Assina e envia uma operação da PA-API 5 (SearchItems, GetItems...).
+    A resposta é lida em streaming e só os itens em `prefixo` são mantidos.
+    Devolve a lista de ofertas ou [] em caso de falha.
+    """
+    request_payload = json.dumps(payload)
+    assinatura = _Assinatura(_signer(operation), request_payload)
+    canonical_uri = f"/paapi5/{operation.lower()}"
 
-# Assinatura V4 (PA-API usa SigV4 em HTTP + JSON)
-def _sign(key, msg):
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+    async with _limite():
+        try:
+            resp = await enviar(
+                BASE, "POST", canonical_uri,
+                auth=assinatura, content=request_payload, timeout=TIMEOUT, stream=True
+            )
+            if resp.status_code != 200:
+                await resp.aread()
+                logger.warning(f"Amazon API {resp.status_code}: {resp.text[:300]}")
+                return []
+            return await ler_itens(resp, prefixo, projetar_amazon)
+        except Exception as e:
+            logger.exception(f"Falha PA-API: {e}")
+            return []
 
-def _get_signature_key(key, dateStamp, regionName, serviceName):
-    kDate = _sign(("AWS4" + key).encode("utf-8"), dateStamp)
-    kRegion = _sign(kDate, regionName)
-    kService = _sign(kRegion, serviceName)
-    kSigning = _sign(kService, "aws4_request")
-    return kSigning
 
-async def _paapi_search(keywords: str, max_results: int = 2) -> List[Dict]:
-    if not (ACCESS_KEY and SECRET_KEY and ASSOC_TAG):
+async def _paapi_search(keywords: str, max_results: int = 2) -> List[Offer]:
+    if not _configurado():
         logger.warning("Amazon PA-API não configurada. Pulei Amazon.")
         return []
 
     payload = {
         "Keywords": keywords,
-        "Resources": [
-            "Images.Primary.Large",
-            "ItemInfo.Title",
-            "Offers.Listings.Price"
-        ],
+        "Resources": RESOURCES,
         "PartnerTag": ASSOC_TAG,
         "PartnerType": "Associates",
         "Marketplace": "www.amazon.com.br",
         "ItemCount": max_results
     }
-    request_payload = json.dumps(payload)
+    return await _paapi_request("SearchItems", payload, "SearchResult.Items.item")
+
 
-    # Cabeçalhos para SigV4
-    method = "POST"
-    service = "ProductAdvertisingAPI"
-    content_type = "application/json; charset=UTF-8"
-    amz_target = "com.amazon.paapi5.v1.ProductAdvertisingAPIv1.SearchItems"
-
-    t = time.gmtime()
-    amz_date = time.strftime("%Y%m%dT%H%M%SZ", t)
-    datestamp = time.strftime("%Y%m%d", t)
-
-    canonical_uri = "/paapi5/searchitems"
-    canonical_querystring = ""
-    canonical_headers = f"content-encoding:amz-1.0\ncontent-type:{content_type}\nhost:{HOST}\nx-amz-date:{amz_date}\nx-amz-target:{amz_target}\n"
-    signed_headers = "content-encoding;content-type;host;x-amz-date;x-amz-target"
-    payload_hash = hashlib.sha256(request_payload.encode("utf-8")).hexdigest()
-    canonical_request = "\n".join([method, canonical_uri, canonical_querystring, canonical_headers, signed_headers, payload_hash])
-
-    algorithm = "AWS4-HMAC-SHA256"
-    credential_scope = f"{datestamp}/{REGION}/{service}/aws4_request"
-    string_to_sign = "\n".join([algorithm, amz_date, credential_scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
-
-    signing_key = _get_signature_key(SECRET_KEY, datestamp, REGION, service)
-    signature = hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
-
-    headers = {
-        "Content-Encoding": "amz-1.0",
-        "Content-Type": content_type,
-        "X-Amz-Date": amz_date,
-        "X-Amz-Target": amz_target,
-        "Authorization": f"{algorithm} Credential={ACCESS_KEY}/{credential_scope}, SignedHeaders={signed_headers}, Signature={signature}",
-        "Host": HOST
+async def _paapi_get_items(asins: List[str]) -> List[Offer]:
+    payload = {
+        "ItemIds": asins,
+        "Resources": RESOURCES,
+        "PartnerTag": ASSOC_TAG,
+        "PartnerType": "Associates",
+        "Marketplace": "www.amazon.com.br"
     }
+    return await _paapi_request("GetItems", payload, "ItemsResult.Items.item")
 
-    items: List[Dict] = []
-    timeout = httpx.Timeout(15.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            resp = await client.post(ENDPOINT, headers=headers, content=request_payload)
-            if resp.status_code != 200:
-                logger.warning(f"Amazon API {resp.status_code}: {resp.text[:300]}")
-                return []
 
-            data = resp.json()
-            for it in (data.get("SearchResult", {}) or {}).get("Items", []):
-                title = (((it.get("ItemInfo") or {}).get("Title") or {}).get("DisplayValue")) or "Produto Amazon"
-                url   = it.get("DetailPageURL")
-                price = None
-                try:
-                    price = it["Offers"]["Listings"][0]["Price"]["DisplayAmount"]
-                except Exception:
-                    pass
-                img = None
-                try:
-                    img = it["Images"]["Primary"]["Large"]["URL"]
-                except Exception:
-                    pass
-
-                if url:
-                    items.append({
-                        "fonte": "AMAZON",
-                        "titulo": title,
-                        "preco": price or "—",
-                        "link": url,
-                        "imagem": img
-                    })
-        except Exception as e:
-            logger.exception(f"Falha PA-API: {e}")
-    return items
-
-async def buscar_ofertas_amazon(categorias: List[str], max_itens: int = 2) -> List[Dict]:
-    resultados: List[Dict] = []
-    for cat in categorias:
-        # keywords simples por categoria
-        kw = {
-            "eletronicos": "eletrônicos ofertas",
-            "pecas de computador": "hardware pc ofertas",
-            "eletrodomesticos": "eletrodomésticos ofertas",
-            "ferramentas": "ferramentas elétricas ofertas"
-        }.get(cat.lower(), cat)
-        items = await _paapi_search(kw, max_results=max_itens)
+async def buscar_precos_amazon(asins: List[str]) -> List[Offer]:
+    """
+    Atualiza preço/título de ASINs já conhecidos via GetItems, em lotes de
+    até 10 por chamada (sem refazer a busca por categoria).
+    """
+    if not _configurado():
+        return []
+    asins = list(dict.fromkeys(a for a in asins if a))
+    lotes = [asins[i:i + GETITEMS_BATCH] for i in range(0, len(asins), GETITEMS_BATCH)]
+    resultados = await asyncio.gather(*(_paapi_get_items(lote) for lote in lotes))
+    return [item for lote in resultados for item in lote]
+
+
+async def buscar_ofertas_amazon(categorias: List[str], max_itens: int = 2) -> List[Offer]:
+    # categorias em paralelo, limitadas por AMAZON_CONCURRENCY
+    buscas = [_paapi_search(KEYWORDS.get(cat.lower(), cat), max_results=max_itens) for cat in categorias]
+    resultados: List[Offer] = []
+    for items in await asyncio.gather(*buscas):
         resultados.extend(items)
     return resultados[:max_itens * len(categorias)]
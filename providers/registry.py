@@ -0,0 +1,79 @@
+"""
+Registro dos provedores de ofertas. Cada provedor é descrito só por texto
+(módulo, função de busca e variáveis de ambiente obrigatórias), então
+descobrir quais estão configurados não importa nada; o módulo, com seu
+cliente, assinador e token, só é carregado na primeira busca.
+"""
+import os
+import time
+import logging
+import importlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Provedor:
+    fonte: str
+    alvo: str  # "modulo:funcao" -> async funcao(categorias, max_itens) -> list[Offer]
+    # cada grupo precisa de pelo menos uma variável preenchida
+    credenciais: Tuple[Tuple[str, ...], ...] = ()
+
+    def configurado(self) -> bool:
+        return all(any(os.getenv(v, "").strip() for v in grupo) for grupo in self.credenciais)
+
+
+_provedores: Dict[str, Provedor] = {}
+_carregados: Dict[str, Callable] = {}
+
+
+def registrar(fonte: str, alvo: str, credenciais=()):
+    """Adiciona (ou troca) um provedor; nada é importado aqui."""
+    _provedores[fonte] = Provedor(fonte, alvo, tuple(tuple(g) for g in credenciais))
+    _carregados.pop(fonte, None)
+
+
+def fontes() -> List[str]:
+    return list(_provedores)
+
+
+def configurado(fonte: str) -> bool:
+    provedor = _provedores.get(fonte)
+    return provedor is not None and provedor.configurado()
+
+
+def configurados(filtro: Optional[List[str]] = None) -> List[str]:
+    return [f for f, p in _provedores.items() if (filtro is None or f in filtro) and p.configurado()]
+
+
+def carregado(fonte: str) -> bool:
+    return fonte in _carregados
+
+
+def busca(fonte: str) -> Callable:
+    """Função de busca do provedor, importando o módulo na primeira vez."""
+    funcao = _carregados.get(fonte)
+    if funcao is None:
+        modulo, _, nome = _provedores[fonte].alvo.partition(":")
+        inicio = time.perf_counter()
+        funcao = getattr(importlib.import_module(modulo), nome)
+        _carregados[fonte] = funcao
+        logger.info(f"🔌 Provedor {fonte} carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return funcao
+
+
+registrar("MERCADOLIVRE", "ml_api:buscar_ofertas")  # sem token cai no modo público
+registrar("SHOPEE", "shopee_api:buscar_ofertas", [
+    ("SHOPEE_PARTNER_ID", "SHOPEE_APP_ID"),
+    ("SHOPEE_PARTNER_SECRET", "SHOPEE_SECRET"),
+    ("SHOPEE_SHOP_ID",),
+    ("SHOPEE_ACCESS_TOKEN",),
+])
+registrar("SHOPEE_OPENAPI", "providers.shopee_api:buscar_ofertas_shopee", [
+    ("SHOPEE_PARTNER_ID",), ("SHOPEE_PARTNER_KEY",), ("SHOPEE_SHOP_ID",),
+])
+registrar("AMAZON", "providers.amazon_api:buscar_ofertas_amazon", [
+    ("AMAZON_ACCESS_KEY",), ("AMAZON_SECRET_KEY",), ("AMAZON_ASSOCIATE_TAG",),
+])
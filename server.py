@@ -0,0 +1,130 @@
+# =======================================
+# 🚀 SERVIDOR DE PRODUÇÃO — proxy (bot.py)
+# =======================================
+"""
+Sobe o app Quart do bot.py no hypercorn com WEB_CONCURRENCY processos
+compartilhando o mesmo socket de escuta (aberto aqui, herdado pelos
+workers). No SIGTERM cada worker marca /readyz como 503, espera
+DRAIN_DELAY s para o balanceador tirar a instância, para de aceitar
+conexões e dá até GRACEFUL_TIMEOUT s para as requisições em andamento.
+Worker que morrer fora do desligamento é recriado. Com mais de um worker
+e SHARED_STATE vazio, os workers dividem o estado em SQLite
+(SHARED_STATE_PATH); SHARED_STATE=memory mantém cada um por si.
+"""
+import os
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.connection
+
+from hypercorn.config import Config
+from hypercorn.utils import wrap_app
+from hypercorn.asyncio.run import worker_serve
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", 5))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", 30))
+
+
+def criar_config() -> Config:
+    config = Config()
+    config.bind = [f"0.0.0.0:{int(os.getenv('PORT', 8080))}"]
+    config.backlog = int(os.getenv("BACKLOG", 2048))
+    config.graceful_timeout = GRACEFUL_TIMEOUT
+    config.keep_alive_timeout = float(os.getenv("KEEP_ALIVE", 5))
+    config.accesslog = "-" if os.getenv("ACCESS_LOG") == "1" else None
+    config.errorlog = None  # vai pelo logging raiz, como o resto do bot
+    return config
+
+
+async def _aguardar_sigterm(parada: asyncio.Event):
+    await parada.wait()
+    from bot import iniciar_drenagem
+
+    iniciar_drenagem()
+    logger.info(f"🛑 [{os.getpid()}] SIGTERM: drenando por {DRAIN_DELAY:.0f}s antes de fechar o socket")
+    await asyncio.sleep(DRAIN_DELAY)
+
+
+async def _servir(config: Config, sockets=None):
+    from bot import app
+
+    parada = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, parada.set)
+    await worker_serve(
+        wrap_app(app, config.wsgi_max_body_size, None), config,
+        sockets=sockets, shutdown_trigger=lambda: _aguardar_sigterm(parada),
+    )
+
+
+def _worker(config: Config, sockets):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_servir(config, sockets))
+
+
+def main(workers: int = WORKERS):
+    logging.basicConfig(level=logging.INFO)
+    config = criar_config()
+    logger.info(f"🚀 {max(workers, 1)} worker(s) em {config.bind[0]}")
+    if workers <= 1:
+        asyncio.run(_servir(config))
+        return
+
+    if not os.getenv("SHARED_STATE"):
+        # sem isso cada worker teria buckets, breakers e cache próprios e a
+        # cota por host valeria WEB_CONCURRENCY vezes
+        os.environ["SHARED_STATE"] = "sqlite"
+        logger.info("🔗 SHARED_STATE vazio com vários workers: usando SQLite")
+
+    sockets = config.create_sockets()
+    ctx = multiprocessing.get_context("spawn")
+    processos = []
+    ativo = True
+
+    def novo():
+        p = ctx.Process(target=_worker, args=(config, sockets), daemon=False)
+        p.start()
+        processos.append(p)
+
+    def desligar(signum, _frame):
+        nonlocal ativo
+        ativo = False
+        for p in processos:
+            if p.is_alive():
+                os.kill(p.pid, signal.SIGTERM)
+
+    # os workers herdam SIGINT ignorado; quem decide o desligamento é o pai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for _ in range(workers):
+        novo()
+    signal.signal(signal.SIGTERM, desligar)
+    signal.signal(signal.SIGINT, desligar)
+
+    while ativo:
+        multiprocessing.connection.wait([p.sentinel for p in processos], timeout=1)
+        for p in list(processos):
+            if p.exitcode is not None and ativo:
+                logger.warning(f"⚠️ Worker {p.pid} saiu com código {p.exitcode}; recriando")
+                processos.remove(p)
+                novo()
+
+    limite = DRAIN_DELAY + GRACEFUL_TIMEOUT + 5
+    prazo = time.monotonic() + limite
+    for p in processos:
+        p.join(max(0.0, prazo - time.monotonic()))
+        if p.is_alive():
+            logger.warning(f"⚠️ Worker {p.pid} não terminou em {limite:.0f}s; encerrando")
+            p.kill()
+            p.join()
+    for sock in sockets.insecure_sockets:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
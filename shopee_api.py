@@ -3,10 +3,14 @@ import os
 import time
 import hmac
 import json
-import random
 import hashlib
+import asyncio
 import logging
-import requests
+from utils.http import enviar
+from utils.store import get_store
+from utils.cache import TTLCache
+from utils.offer import Offer
+from utils import precos, metrics
 
 logger = logging.getLogger("shopee_api")
 
@@ -15,8 +19,15 @@ PARTNER_SECRET = os.environ.get("SHOPEE_PARTNER_SECRET") or os.environ.get("SHOP
 SHOP_ID = os.environ.get("SHOPEE_SHOP_ID")
 ACCESS_TOKEN = os.environ.get("SHOPEE_ACCESS_TOKEN")
 
-BASE_URL = "https://partner.shopeemobile.com"
+BASE_URL = os.environ.get("SHOPEE_PARTNER_BASE", "https://partner.shopeemobile.com")
 TIMEOUT = 12
+PAGE_SIZE = 50
+ITEM_BATCH = 50  # máximo de ids aceito em item_id_list
+PAGINAS_BUSCA = 5  # páginas olhadas atrás de itens ainda não postados
+DETAIL_TTL = float(os.environ.get("SHOPEE_DETAIL_TTL", 3600))
+
+# detalhes resolvidos por item_id
+_detalhes = TTLCache(max_itens=10_000, ttl_padrao=DETAIL_TTL)
 
 def _sign(path: str, timestamp: int, access_token: str, shop_id: str) -> str:
     """
@@ -26,7 +37,7 @@ def _sign(path: str, timestamp: int, access_token: str, shop_id: str) -> str:
     msg = f"{PARTNER_ID}{path}{timestamp}{access_token}{shop_id}"
     return hmac.new(PARTNER_SECRET.encode("utf-8"), msg.encode("utf-8"), hashlib.sha256).hexdigest()
 
-def _call_api(path: str, params: dict):
+async def _call_api(path: str, params: dict):
     """
     Faz uma chamada GET para a OpenAPI v2 com assinatura.
     """
@@ -35,7 +46,8 @@ def _call_api(path: str, params: dict):
         return None
 
     ts = int(time.time())
-    sign = _sign(path, ts, ACCESS_TOKEN, SHOP_ID)
+    with metrics.cronometro("sign_seconds", servico="shopee"):
+        sign = _sign(path, ts, ACCESS_TOKEN, SHOP_ID)
 
     query = {
         "partner_id": PARTNER_ID,
@@ -46,8 +58,7 @@ def _call_api(path: str, params: dict):
         **params,
     }
 
-    url = f"{BASE_URL}{path}"
-    resp = requests.get(url, params=query, timeout=TIMEOUT)
+    resp = await enviar(BASE_URL, "GET", path, params=query, timeout=TIMEOUT, hedge=True)
     if resp.status_code != 200:
         logger.warning(f"⚠️ Shopee API HTTP {resp.status_code}: {resp.text[:300]}")
         return None
@@ -58,80 +69,157 @@ def _call_api(path: str, params: dict):
         return None
     return data
 
-def _format_price(raw) -> str:
-    """
-    Shopee costuma devolver preço em 'price' *ou* em micros (ex.: 123450000 -> 1.234,50).
-    Tentamos detectar automaticamente.
-    """
-    if raw is None:
-        return "Indisponível"
-    try:
-        v = float(raw)
-        # heurística: se muito grande, assume micros (1e6)
-        if v > 1e6:
-            v = v / 1_000_000.0
-        elif v > 1e3 and v % 100 == 0:
-            # alguns retornos vêm em centavos * 100
-            v = v / 100.0
-        return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
-        return "Indisponível"
+def _configurado() -> bool:
+    return bool(PARTNER_ID and PARTNER_SECRET and SHOP_ID and ACCESS_TOKEN)
 
-async def buscar_produto_shopee():
+
+def _oferta(info: dict, centavos: int) -> Offer:
+    item_id = str(info["item_id"])
+    title = info.get("item_name") or "Produto Shopee"
+    price_info = (info.get("price_info") or [{}])[0]
+    imagens = (info.get("image") or {}).get("image_url_list") or [None]
+    return Offer(
+        fonte="SHOPEE",
+        titulo=title.strip(),
+        # Link público do item no padrão /product/<shop_id>/<item_id>
+        link=f"https://shopee.com.br/product/{SHOP_ID}/{item_id}",
+        preco_centavos=None if centavos == precos.SEM_PRECO else centavos,
+        moeda=price_info.get("currency") or "BRL",
+        imagem=imagens[0],
+        item_id=item_id,
+    )
+
+
+async def _resolver_itens(item_ids, usar_cache: bool = True) -> list:
     """
-    Pega uma lista de itens da loja via OpenAPI v2 e retorna um item aleatório no formato:
-    { 'titulo': str, 'preco': str, 'link': str }
-    Se não conseguir, retorna None (o bot tenta outra plataforma).
+    Resolve os detalhes de vários itens com get_item_base_info em lotes de
+    até ITEM_BATCH ids por chamada. Itens já resolvidos vêm do cache (TTL),
+    a não ser com `usar_cache=False` (reprecificação).
     """
-    if not (PARTNER_ID and PARTNER_SECRET and SHOP_ID and ACCESS_TOKEN):
-        logger.warning("⚠️ Credenciais Shopee ausentes. Retornando None.")
-        return None
-
-    # 1) listar itens da loja
-    path_list = "/api/v2/product/get_item_list"
-    data = _call_api(
-        path_list,
+    ofertas = []
+    faltando = []
+    for item_id in dict.fromkeys(str(i) for i in item_ids):
+        oferta = _detalhes.get(("item", item_id)) if usar_cache else None
+        if oferta is not None:
+            ofertas.append(oferta)
+        else:
+            faltando.append(item_id)
+
+    for i in range(0, len(faltando), ITEM_BATCH):
+        lote = faltando[i:i + ITEM_BATCH]
+        data = await _call_api(
+            "/api/v2/product/get_item_base_info",
+            {"item_id_list": ",".join(lote)},
+        )
+        item_list = ((data or {}).get("response") or {}).get("item_list") or []
+        # preço de cada item pela unidade do campo de onde veio
+        for info, centavos in zip(item_list, precos.normalizar_pagina(item_list)):
+            oferta = _oferta(info, centavos)
+            _detalhes.set(("item", oferta.item_id), oferta)
+            ofertas.append(oferta)
+    return ofertas
+
+
+async def buscar_precos_shopee(item_ids) -> list:
+    """Preço atual dos item_id (de get_item_list) ignorando o cache de detalhes."""
+    if not _configurado():
+        return []
+    return await _resolver_itens(item_ids, usar_cache=False)
+
+
+async def _listar_pagina(offset: int):
+    data = await _call_api(
+        "/api/v2/product/get_item_list",
         {
             "item_status": "NORMAL",   # itens ativos
-            "page_size": 50,
-            "offset": 0,
+            "page_size": PAGE_SIZE,
+            "offset": offset,
         },
     )
+    resposta = (data or {}).get("response") or {}
+    ids = [it["item_id"] for it in resposta.get("item") or []]
+    proximo = resposta.get("next_offset") if resposta.get("has_next_page") else None
+    return ids, proximo
 
-    if not data or "response" not in data or "item" not in data["response"] or not data["response"]["item"]:
-        logger.warning("⚠️ Nenhum item retornado pela Shopee.")
-        return None
 
-    items = data["response"]["item"]
-    item = random.choice(items)
-    item_id = str(item["item_id"])
+async def atualizar_catalogo(max_paginas: int = 20) -> int:
+    """
+    Percorre get_item_list com `offset` e resolve cada página em lote,
+    registrando tudo no pool local. Devolve quantos itens foram resolvidos.
+    """
+    if not _configurado():
+        return 0
+    total = 0
+    offset = 0
+    for _ in range(max_paginas):
+        ids, proximo = await _listar_pagina(offset)
+        if ids:
+            ofertas = await _resolver_itens(ids)
+            await get_store().registrar("SHOPEE", ofertas)
+            total += len(ofertas)
+        if proximo is None:
+            break
+        offset = proximo
+    logger.info(f"📦 Catálogo Shopee atualizado: {total} itens.")
+    return total
+
+
+async def manter_catalogo():
+    """Loop de fundo: reconstrói o catálogo sempre que o cache de detalhes expira."""
+    while True:
+        try:
+            await atualizar_catalogo()
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar catálogo Shopee: {e}")
+        await asyncio.sleep(DETAIL_TTL)
 
-    # 2) buscar info base dos itens
-    path_info = "/api/v2/product/get_item_base_info"
-    data2 = _call_api(
-        path_info,
-        {
-            "item_id_list": item_id,
-        },
-    )
 
-    if not data2 or "response" not in data2 or "item_list" not in data2["response"] or not data2["response"]["item_list"]:
-        logger.warning("⚠️ Não foi possível obter detalhes do item.")
+async def buscar_produto_shopee():
+    """
+    Pega uma lista de itens da loja via OpenAPI v2 e retorna um item (Offer).
+    A página inteira é resolvida numa única chamada e guardada no pool local;
+    os próximos ciclos saem do pool sem chamar a Shopee.
+    Se não conseguir, retorna None (o bot tenta outra plataforma).
+    """
+    if not _configurado():
+        logger.warning("⚠️ Credenciais Shopee ausentes. Retornando None.")
         return None
 
-    info = data2["response"]["item_list"][0]
-    title = info.get("item_name") or "Produto Shopee"
-    # tenta vários campos de preço que aparecem em diferentes respostas
-    price = info.get("price") or info.get("original_price") or info.get("price_info", [{}])[0].get("current_price")
-    preco_fmt = _format_price(price)
+    store = get_store()
+    produto = await store.proxima("SHOPEE")
+    if produto:
+        logger.info(f"✅ Shopee produto (pool): {produto.titulo} - {produto.preco}")
+        return produto
+
+    # 1) listar itens da loja, pulando as páginas já postadas
+    novos = []
+    offset = 0
+    for _ in range(PAGINAS_BUSCA):
+        ids, proximo = await _listar_pagina(offset)
+        postados = await store.postados("SHOPEE", ids)
+        novos = [i for i in ids if str(i) not in postados]
+        if novos or proximo is None:
+            break
+        offset = proximo
+    if not novos:
+        logger.warning("⚠️ Nenhum item novo retornado pela Shopee. Pulando ciclo.")
+        return None
 
-    # Link público do item no padrão /product/<shop_id>/<item_id>
-    link = f"https://shopee.com.br/product/{SHOP_ID}/{item_id}"
+    # 2) buscar info base da página inteira (uma chamada)
+    ofertas = await _resolver_itens(novos)
+    if not ofertas:
+        logger.warning("⚠️ Não foi possível obter detalhes dos itens.")
+        return None
 
-    produto = {
-        "titulo": title.strip(),
-        "preco": preco_fmt,
-        "link": link,
-    }
-    logger.info(f"✅ Shopee produto: {produto['titulo']} - R$ {produto['preco']}")
+    await store.registrar("SHOPEE", ofertas)
+    produto = await store.proxima("SHOPEE")
+    if not produto:
+        return None
+    logger.info(f"✅ Shopee produto: {produto.titulo} - {produto.preco}")
     return produto
+
+
+async def buscar_ofertas(categorias: list, max_itens: int = 2) -> list:
+    """Interface comum dos provedores (providers/registry.py): uma oferta por rodada."""
+    produto = await buscar_produto_shopee()
+    return [produto] if produto else []
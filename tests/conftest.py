@@ -0,0 +1,7 @@
+import os
+import sys
+
+# os módulos do bot ficam soltos na raiz do repositório
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,77 @@
+"""
+/proxy/bulk na Shopee: a API de afiliados pagina por número de página, então
+offset desalinhado com limit é recusado e o alinhado vira a página certa;
+corpo JSON fora do formato vira 400.
+"""
+import json
+import asyncio
+
+import httpx
+import pytest
+
+import bot
+from utils import http, ratelimit
+
+BASE = "http://shopee.test"
+
+
+@pytest.fixture
+def shopee(monkeypatch):
+    paginas = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        corpo = json.loads(request.content)
+        paginas.append((corpo["page"], corpo["page_size"]))
+        return httpx.Response(200, json={"data": {"productOfferV2": {"nodes": []}}})
+
+    monkeypatch.setattr(bot, "SHOPEE_APP_ID", "1")
+    monkeypatch.setattr(bot, "SHOPEE_APP_SECRET", "segredo")
+    monkeypatch.setattr(bot, "SHOPEE_BASE", BASE)
+    monkeypatch.setattr(bot, "cache", bot.TTLCache(max_itens=100, ttl_padrao=60))
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setitem(ratelimit.LIMITES, "shopee.test", 100000.0)
+    monkeypatch.setattr(http, "_clients", {BASE: [httpx.AsyncClient(base_url=BASE, transport=httpx.MockTransport(upstream))]})
+    return paginas
+
+
+def _bulk(query: str):
+    async def chamar():
+        r = await bot.app.test_client().get(f"/proxy/bulk?platform=shopee&{query}")
+        return r.status_code, await r.get_data(as_text=True)
+
+    return asyncio.run(chamar())
+
+
+@pytest.mark.parametrize("query", ["q=fone&offset=3&limit=5", "q=fone&offset=7"])
+def test_offset_desalinhado_recusado(shopee, query):
+    status, corpo = _bulk(query)
+    assert status == 400
+    assert "múltiplo de limit" in json.loads(corpo)["error"]
+    assert shopee == []
+
+
+def test_offset_alinhado_vira_pagina(shopee):
+    status, corpo = _bulk("q=fone&q=mouse&offset=10&limit=5")
+    assert status == 200
+    linhas = [json.loads(l) for l in corpo.splitlines()]
+    assert sorted(l["q"] for l in linhas) == ["fone", "mouse"]
+    assert all(l["status"] == 200 for l in linhas)
+    assert shopee == [(3, 5), (3, 5)]
+
+
+@pytest.mark.parametrize("corpo,erro", [
+    (["fone", "mouse"], "objeto JSON"),
+    ({"platform": ["ml"], "terms": ["fone"]}, "plataforma inválida"),
+    ({"platform": "shopee", "terms": 5}, "terms precisa ser"),
+    ({"platform": "shopee", "terms": {"q": "fone"}}, "terms precisa ser"),
+    ({"platform": "shopee", "terms": ["fone", 7]}, "terms precisa ser"),
+])
+def test_corpo_invalido_vira_400(shopee, corpo, erro):
+    async def chamar():
+        r = await bot.app.test_client().post("/proxy/bulk", json=corpo)
+        return r.status_code, await r.get_json()
+
+    status, resposta = asyncio.run(chamar())
+    assert status == 400
+    assert erro in resposta["error"]
+    assert shopee == []
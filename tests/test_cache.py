@@ -0,0 +1,153 @@
+"""
+TTLCache (utils/cache.py) em memória: estados do get_swr (fresca, stale,
+stale-error), fim da graça, uma única revalidação em segundo plano por chave
+e coalescência de misses simultâneos.
+"""
+import asyncio
+
+import pytest
+
+from utils.cache import TTLCache, HIT, MISS, STALE, STALE_ERROR
+
+CHAVE = ("ml", "fone", 5, 0)
+
+
+def _envelhecer(cache: TTLCache, chave, segundos: float):
+    """Recua o instante em que a entrada foi guardada (sem esperar de verdade)."""
+    guardado_em, valor = cache._dados[chave]
+    cache._dados[chave] = (guardado_em - segundos, valor)
+
+
+class _Upstream:
+    """fetch falso: conta as chamadas e devolve versões numeradas (ou levanta)."""
+
+    def __init__(self, atraso: float = 0.0):
+        self.atraso = atraso
+        self.chamadas = 0
+        self.falhar = False
+
+    async def __call__(self):
+        self.chamadas += 1
+        await asyncio.sleep(self.atraso)
+        if self.falhar:
+            raise RuntimeError("upstream fora")
+        return {"versao": self.chamadas}
+
+
+def test_fresca_stale_e_revalidacao_unica():
+    cache = TTLCache(ttl_padrao=10, swr=30)
+    upstream = _Upstream(atraso=0.2)
+
+    async def cenario():
+        primeira = await cache.get_swr(CHAVE, upstream)
+        fresca = await cache.get_swr(CHAVE, upstream)
+        _envelhecer(cache, CHAVE, 15)
+        # vários pedidos dentro da janela stale: todos servidos na hora, uma só revalidação
+        stale = [await cache.get_swr(CHAVE, upstream) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert upstream.chamadas == 2  # a revalidação ainda está em voo
+        stale.append(await cache.get_swr(CHAVE, upstream))
+        await asyncio.sleep(0.3)
+        return primeira, fresca, stale, await cache.get_swr(CHAVE, upstream)
+
+    primeira, fresca, stale, revalidada = asyncio.run(cenario())
+    assert primeira == ({"versao": 1}, MISS, 0.0)
+    assert fresca[:2] == ({"versao": 1}, HIT)
+    assert all(valor == {"versao": 1} and estado == STALE and idade >= 15 for valor, estado, idade in stale)
+    assert revalidada[:2] == ({"versao": 2}, HIT)
+    assert upstream.chamadas == 2
+    assert cache.stats()["stale"] == 6
+
+
+def test_stale_error_ate_o_fim_da_graca():
+    cache = TTLCache(ttl_padrao=10, swr=5, grace=60)
+    upstream = _Upstream()
+
+    async def cenario():
+        await cache.get_swr(CHAVE, upstream)
+        upstream.falhar = True
+        _envelhecer(cache, CHAVE, 30)  # passou do swr, ainda na graça
+        com_erro = await cache.get_swr(CHAVE, upstream)
+        # resposta não cacheável também cai na última boa
+        upstream.falhar = False
+        nao_cacheavel = await cache.get_swr(CHAVE, upstream, cacheavel=lambda v: False)
+
+        upstream.falhar = True
+        _envelhecer(cache, CHAVE, 45)  # 75 s: a graça acabou
+        with pytest.raises(RuntimeError):
+            await cache.get_swr(CHAVE, upstream)
+        return com_erro, nao_cacheavel
+
+    com_erro, nao_cacheavel = asyncio.run(cenario())
+    assert com_erro[:2] == ({"versao": 1}, STALE_ERROR) and com_erro[2] >= 30
+    assert nao_cacheavel[:2] == ({"versao": 1}, STALE_ERROR)
+    assert CHAVE not in cache._dados
+    assert upstream.chamadas == 4
+    assert cache.stats()["stale_error"] == 2
+
+
+def test_sem_graca_o_erro_sobe():
+    cache = TTLCache(ttl_padrao=10)
+    upstream = _Upstream()
+
+    async def cenario():
+        await cache.get_swr(CHAVE, upstream)
+        _envelhecer(cache, CHAVE, 11)
+        upstream.falhar = True
+        await cache.get_swr(CHAVE, upstream)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cenario())
+
+
+def test_revalidacao_unica_por_chave():
+    cache = TTLCache(ttl_padrao=10, swr=30)
+    lento = _Upstream(atraso=0.1)
+    outra = ("ml", "mouse", 5, 0)
+
+    async def cenario():
+        await asyncio.gather(cache.get_swr(CHAVE, lento), cache.get_swr(outra, lento))
+        _envelhecer(cache, CHAVE, 15)
+        _envelhecer(cache, outra, 15)
+        estados = await asyncio.gather(*(cache.get_swr(c, lento) for c in (CHAVE, outra) * 4))
+        await asyncio.sleep(0.2)
+        return estados
+
+    estados = asyncio.run(cenario())
+    assert {e for _, e, _ in estados} == {STALE}
+    assert lento.chamadas == 4  # duas buscas iniciais + uma revalidação por chave
+
+
+def test_misses_simultaneos_buscam_uma_vez():
+    cache = TTLCache(ttl_padrao=60)
+    upstream = _Upstream(atraso=0.1)
+
+    async def cenario():
+        quem_desiste = asyncio.ensure_future(cache.get_or_fetch(CHAVE, upstream))
+        outros = [asyncio.ensure_future(cache.get_swr(CHAVE, upstream)) for _ in range(4)]
+        await asyncio.sleep(0.02)
+        quem_desiste.cancel()  # o cliente que iniciou a busca desconectou
+        return await asyncio.gather(*outros)
+
+    respostas = asyncio.run(cenario())
+    assert upstream.chamadas == 1
+    assert [v for v, _, _ in respostas] == [{"versao": 1}] * 4
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4
+    assert cache.get(CHAVE) == {"versao": 1}
+
+
+def test_erro_compartilhado_e_nada_guardado():
+    cache = TTLCache(ttl_padrao=60)
+    upstream = _Upstream(atraso=0.05)
+    upstream.falhar = True
+
+    async def cenario():
+        resultados = await asyncio.gather(*(cache.get_or_fetch(CHAVE, upstream) for _ in range(3)),
+                                          return_exceptions=True)
+        upstream.falhar = False
+        return resultados, await cache.get_or_fetch(CHAVE, upstream)
+
+    resultados, depois = asyncio.run(cenario())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    assert depois == {"versao": 2}
+    assert upstream.chamadas == 2
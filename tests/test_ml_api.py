@@ -0,0 +1,97 @@
+"""
+Busca do Mercado Livre (ml_api.py): páginas com offset/limit e o cursor por
+categoria, para que os ciclos não busquem sempre a primeira página.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import ml_api
+from utils import http, ratelimit
+from utils import store as store_mod
+
+BASE = "http://ml.test"
+TOTAL = 120  # resultados da busca: páginas em 0, 50 e 100 (esta com 20)
+
+
+class Tokens:
+    async def get_token(self):
+        return "APP_USR-teste"
+
+
+@pytest.fixture
+def busca(monkeypatch, tmp_path):
+    pedidos = []
+    falhar = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        pedidos.append((request.url.params["q"], offset))
+        if falhar:
+            return httpx.Response(400, json={"message": "bad request"})
+        resultados = [
+            {"id": f"MLB{i}", "title": f"Item {i}", "price": 10.0, "currency_id": "BRL",
+             "permalink": f"https://produto.mercadolivre.com.br/MLB{i}"}
+            for i in range(offset, min(offset + limit, TOTAL))
+        ]
+        return httpx.Response(200, json={"paging": {"total": TOTAL}, "results": resultados})
+
+    monkeypatch.setattr(ml_api, "ML_BASE", BASE)
+    monkeypatch.setattr(ml_api, "tokens", Tokens())
+    monkeypatch.setattr(ml_api, "_cursores", {})
+    monkeypatch.setattr(store_mod, "_store", store_mod.OfferStore(str(tmp_path / "offers.db")))
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setitem(ratelimit.LIMITES, "ml.test", 100000.0)
+    monkeypatch.setattr(http, "_clients", {BASE: [httpx.AsyncClient(base_url=BASE, transport=httpx.MockTransport(upstream))]})
+    return pedidos, falhar
+
+
+def _buscar(categoria: str = "informatica"):
+    return asyncio.run(ml_api.buscar_ofertas_mercadolivre(categoria))
+
+
+def _ids(ofertas):
+    return [o.item_id for o in ofertas]
+
+
+def test_cursor_avanca_por_categoria(busca):
+    pedidos, _ = busca
+    assert _ids(_buscar()) == [f"MLB{i}" for i in range(50)]
+    assert _ids(_buscar()) == [f"MLB{i}" for i in range(50, 100)]
+    # a outra categoria tem o próprio cursor
+    assert len(_buscar("smartphones")) == 50
+    # última página (curta): o cursor volta para o início
+    assert _ids(_buscar()) == [f"MLB{i}" for i in range(100, TOTAL)]
+    assert ml_api._cursores == {"informatica": 0, "smartphones": 50}
+    assert pedidos == [("informatica", 0), ("informatica", 50), ("smartphones", 0), ("informatica", 100)]
+
+
+def test_pula_paginas_ja_postadas(busca):
+    pedidos, _ = busca
+    store = store_mod.get_store()
+    _buscar()
+    for i in range(50):
+        asyncio.run(store.marcar_postado("MERCADOLIVRE", f"MLB{i}"))
+    ml_api._cursores.clear()
+
+    assert _ids(_buscar())[0] == "MLB50"
+    assert pedidos[-2:] == [("informatica", 0), ("informatica", 50)]
+
+    # tudo postado: no máximo PAGINAS_BUSCA páginas por ciclo, dando a volta
+    _buscar()
+    for i in range(TOTAL):
+        asyncio.run(store.marcar_postado("MERCADOLIVRE", f"MLB{i}"))
+    del pedidos[:]
+    assert _buscar() == []
+    assert [o for _, o in pedidos] == [0, 50, 100, 0, 50]  # PAGINAS_BUSCA = 5
+    assert ml_api._cursores["informatica"] == 100
+
+
+def test_erro_mantem_o_cursor(busca):
+    pedidos, falhar = busca
+    _buscar()
+    falhar.append(True)
+    assert _buscar() == []
+    assert ml_api._cursores["informatica"] == 50
+    assert pedidos[-1] == ("informatica", 50)
@@ -0,0 +1,80 @@
+"""
+utils.parsing.ler_itens (json.loads abaixo do limite, streaming acima) contra
+json.loads + a mesma projeção, com as respostas gravadas em tools/fixtures/
+chegando em pedaços variados.
+"""
+import os
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from utils import parsing
+from utils.parsing import ler_itens, projetar_ml, projetar_amazon
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "fixtures")
+CASOS = [
+    ("ml_search.json", "results.item", projetar_ml),
+    ("paapi_searchitems.json", "SearchResult.Items.item", projetar_amazon),
+    ("paapi_getitems.json", "ItemsResult.Items.item", projetar_amazon),
+]
+
+
+class _Pedacos(httpx.AsyncByteStream):
+    def __init__(self, corpo: bytes, tamanho: int):
+        self.corpo = corpo
+        self.tamanho = tamanho
+        self.fechado = False
+
+    async def __aiter__(self):
+        for i in range(0, len(self.corpo), self.tamanho):
+            yield self.corpo[i:i + self.tamanho]
+
+    async def aclose(self):
+        self.fechado = True
+
+
+def _esperado(corpo: bytes, prefixo: str, projetar) -> list:
+    dados = json.loads(corpo)
+    for chave in prefixo.split(".")[:-1]:
+        dados = dados[chave]
+    return [o for o in map(projetar, dados) if o is not None]
+
+
+@pytest.mark.parametrize("nome,prefixo,projetar", CASOS)
+@pytest.mark.parametrize("tamanho", [1, 7, 4096, 1 << 20])
+@pytest.mark.parametrize("modo", ["stream", "inteiro", "sem_ijson"])
+def test_igual_ao_json_loads(nome, prefixo, projetar, tamanho, modo, monkeypatch):
+    if modo == "sem_ijson":
+        monkeypatch.setattr(parsing, "ijson", None)
+    # "stream" passa do limite no meio da leitura (ou já no primeiro pedaço)
+    monkeypatch.setattr(parsing, "STREAM_ACIMA", 1024 if modo == "stream" else 1 << 30)
+    with open(os.path.join(FIXTURES, nome), "rb") as f:
+        corpo = f.read()
+    stream = _Pedacos(corpo, tamanho)
+    ofertas = asyncio.run(ler_itens(httpx.Response(200, stream=stream), prefixo, projetar))
+    assert ofertas and ofertas == _esperado(corpo, prefixo, projetar)
+    assert stream.fechado
+
+
+def test_sem_itens_no_prefixo():
+    stream = _Pedacos(b'{"results": []}', 4)
+    assert asyncio.run(ler_itens(httpx.Response(200, stream=stream), "results.item", projetar_ml)) == []
+    assert stream.fechado
+
+
+def test_content_length_grande_vai_direto_para_o_stream(monkeypatch):
+    with open(os.path.join(FIXTURES, "ml_search.json"), "rb") as f:
+        corpo = f.read()
+    monkeypatch.setattr(parsing, "STREAM_ACIMA", len(corpo) - 1)
+
+    class _SemJson:
+        @staticmethod
+        def loads(_):
+            raise AssertionError("corpo grande não deveria ir para o json.loads")
+
+    monkeypatch.setattr(parsing, "json", _SemJson)
+    resp = httpx.Response(200, headers={"Content-Length": str(len(corpo))}, stream=_Pedacos(corpo, 4096))
+    ofertas = asyncio.run(ler_itens(resp, "results.item", projetar_ml))
+    assert ofertas == _esperado(corpo, "results.item", projetar_ml)
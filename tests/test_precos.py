@@ -0,0 +1,87 @@
+"""
+Propriedades da normalização de preços da Shopee (utils/precos.py).
+"""
+from decimal import Decimal
+
+from hypothesis import given, strategies as st
+
+from utils import precos
+from utils.offer import para_centavos
+
+CENTAVOS = st.integers(min_value=0, max_value=10**12)
+CAMPOS_LEGADOS = st.sampled_from(["price", "price_min", "price_max", "price_before_discount"])
+CAMPOS_V2 = st.sampled_from(["current_price", "original_price"])
+
+# valores como chegam no JSON: float, inteiro ou texto decimal
+VALOR_V2 = st.one_of(
+    st.floats(min_value=0, max_value=1e9, allow_nan=False, allow_infinity=False),
+    st.integers(min_value=0, max_value=10**9),
+    st.decimals(min_value=0, max_value=10**9, places=3, allow_nan=False).map(str),
+)
+LIXO = st.one_of(st.none(), st.text(max_size=5), st.just(float("nan")), st.just([1]))
+
+
+def _item(campo, valor):
+    if campo in precos.CAMPOS_PRICE_INFO:
+        return {"price_info": [{campo: valor}]}
+    return {campo: valor}
+
+
+ITENS = st.lists(
+    st.one_of(
+        st.builds(_item, CAMPOS_V2, st.one_of(VALOR_V2, LIXO)),
+        st.builds(_item, CAMPOS_LEGADOS, st.one_of(st.integers(min_value=0, max_value=10**15), LIXO)),
+        st.just({}),
+        st.just({"price_info": []}),
+    ),
+    max_size=50,
+)
+
+
+@given(CENTAVOS, CAMPOS_LEGADOS)
+def test_legado_ida_e_volta(c, campo):
+    assert precos.centavos(campo, c * 1000) == c
+
+
+@given(CENTAVOS, CAMPOS_V2)
+def test_v2_ida_e_volta(c, campo):
+    texto = str(Decimal(c) / 100)
+    assert precos.centavos(campo, texto) == c
+    assert precos.centavos(campo, float(texto)) == c
+
+
+@given(CENTAVOS, CAMPOS_V2)
+def test_unidade_vem_do_campo_nao_do_tamanho(c, campo):
+    # o mesmo número nunca muda de unidade por ser grande ou "redondo"
+    assert precos.centavos(campo, c) == c * 100
+    assert precos.centavos("price", c) == (c * 100 + 50_000) // 100_000
+
+
+@given(VALOR_V2)
+def test_mesmo_arredondamento_do_offer(valor):
+    # um preço em moeda cheia vira os mesmos centavos aqui e em Offer
+    assert precos.centavos("current_price", valor) == para_centavos(valor if not isinstance(valor, str) else Decimal(valor))
+
+
+@given(st.integers(min_value=0, max_value=10**9))
+def test_meio_centavo_arredonda_para_cima(c):
+    meio = str(Decimal(c) / 100 + Decimal("0.005"))
+    assert precos.centavos("current_price", meio) == c + 1
+    assert precos.centavos("price", c * 1000 + 500) == c + 1
+
+
+def test_exemplos():
+    assert precos.centavos("current_price", 0.125) == 13
+    assert precos.centavos("current_price", 12.5) == 1250
+    assert precos.centavos("price", 1_250_000) == 1250
+    assert precos.centavos("price_min", 123_450_000) == 123450
+    assert precos.centavos(None, None) == precos.SEM_PRECO
+    assert precos.centavos("current_price", "abc") == precos.SEM_PRECO
+
+
+@given(ITENS)
+def test_pagina_igual_item_a_item(itens):
+    pagina = precos.normalizar_pagina(itens)
+    assert len(pagina) == len(itens)
+    assert list(pagina) == [precos.centavos(*precos.extrair(i)) for i in itens]
+
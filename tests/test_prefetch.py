@@ -0,0 +1,63 @@
+"""
+Prefetcher (utils/prefetch.py): cada worker segue o offset da sua categoria
+e passa direto pelas páginas que só têm itens já postados.
+"""
+import asyncio
+
+import pytest
+
+from utils import prefetch
+from utils import store as store_mod
+from utils.offer import Offer
+from utils.prefetch import Prefetcher
+
+POR_PAGINA = 2
+PAGINAS = 3
+
+
+def _oferta(i: int) -> Offer:
+    return Offer(fonte="TESTE", titulo=f"Item {i}", link=f"https://x/{i}", preco_centavos=100, item_id=str(i))
+
+
+@pytest.fixture
+def loja(monkeypatch, tmp_path):
+    store = store_mod.OfferStore(str(tmp_path / "offers.db"))
+    monkeypatch.setattr(store_mod, "_store", store)
+    monkeypatch.setattr(prefetch, "ESPERA_VAZIO", 0.05)
+    # a primeira página inteira já foi postada
+    async def postar():
+        await store.registrar("TESTE", [_oferta(i) for i in range(POR_PAGINA)])
+        for i in range(POR_PAGINA):
+            await store.marcar_postado("TESTE", str(i))
+
+    asyncio.run(postar())
+    return store
+
+
+def test_worker_segue_as_paginas(loja):
+    pedidos = []
+
+    async def busca(categoria, offset):
+        pedidos.append((categoria, offset))
+        proximo = offset + POR_PAGINA
+        ofertas = [_oferta(i) for i in range(offset, proximo)]
+        await loja.registrar("TESTE", ofertas)  # como as fontes de verdade
+        return ofertas, proximo if proximo < POR_PAGINA * PAGINAS else None
+
+    async def cenario():
+        p = Prefetcher({"TESTE": (["a"], busca)}, tamanho=10)
+        p.iniciar()
+        try:
+            itens = [await p.proxima(timeout=2) for _ in range(POR_PAGINA * (PAGINAS - 1))]
+            # a fila não se repete depois de dar a volta
+            await asyncio.sleep(0.1)
+            return itens, p.filas[("TESTE", "a")].qsize()
+        finally:
+            await p.parar()
+
+    itens, restantes = asyncio.run(cenario())
+    assert [o.item_id for o, _ in itens] == ["2", "3", "4", "5"]
+    assert restantes == 0
+    assert pedidos[:3] == [("a", 0), ("a", 2), ("a", 4)]
+    # no fim da busca recomeça do início
+    assert pedidos[3] == ("a", 0)
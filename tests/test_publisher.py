@@ -0,0 +1,166 @@
+"""
+Publicador (utils/publisher.py) contra a Bot API falsa (tools/telegram_stub.py),
+servida em processo pelo ASGITransport do httpx: 429 de um chat não segura
+os outros, 5xx volta para a fila, digest dividido no limite de texto e
+resposta fora do formato não deixa a fila presa.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from utils import http, publisher, ratelimit
+from utils.offer import Offer
+from utils.publisher import Publicador, LIMITE_TEXTO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+import telegram_stub  # noqa: E402
+
+BASE = "http://telegram.test"
+TOKEN = "123:teste"
+
+
+class _Gravador(httpx.ASGITransport):
+    """ASGITransport que guarda (método da Bot API, payload) de cada chamada."""
+
+    def __init__(self, app):
+        super().__init__(app=app)
+        self.pedidos = []
+
+    async def handle_async_request(self, request):
+        if "/bot" in request.url.path:
+            self.pedidos.append((request.url.path.rsplit("/", 1)[-1], json.loads(request.content)))
+        return await super().handle_async_request(request)
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setitem(ratelimit.LIMITES, "telegram.test", 100000.0)
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.05)
+
+    def subir(**config):
+        transporte = _Gravador(telegram_stub.criar_app(**config))
+        monkeypatch.setattr(http, "_clients", {BASE: [httpx.AsyncClient(base_url=BASE, transport=transporte)]})
+        return transporte
+
+    return subir
+
+
+def _ofertas(n: int, titulo: str = "Produto", imagem: bool = False):
+    return [
+        Offer(fonte="MERCADOLIVRE", titulo=f"{titulo} {i}", link=f"https://produto.mercadolivre.com.br/MLB{i}",
+              preco_centavos=9990 + i, imagem=f"https://img/{i}.jpg" if imagem else None, item_id=f"MLB{i}")
+        for i in range(n)
+    ]
+
+
+async def _stub(transporte, metodo: str, path: str, **kwargs) -> dict:
+    async with httpx.AsyncClient(base_url=BASE, transport=transporte) as c:
+        return (await c.request(metodo, path, **kwargs)).json()
+
+
+def test_429_de_um_chat_nao_segura_os_outros(telegram):
+    stub = telegram(chat_rps=1, rajada=1, global_rps=0)
+
+    async def cenario():
+        pub = Publicador(token=TOKEN, base=BASE, modo=publisher.INDIVIDUAL, chat_rate=10)
+        try:
+            inicio = time.monotonic()
+            lotado = pub.publicar("A", _ofertas(2))
+            await asyncio.sleep(0.05)  # o segundo envio do chat A leva 429 (retry_after 1)
+            livre = pub.publicar("B", _ofertas(1))
+            await asyncio.wait_for(livre[0], 0.5)
+            b_pronto = time.monotonic() - inicio
+            assert not lotado[1].done()
+            await pub.drenar(5)
+            return b_pronto, time.monotonic() - inicio, [f.result() for f in lotado + livre], await _stub(stub, "GET", "/_stub/stats")
+        finally:
+            await pub.parar(1)
+            await http.fechar_clientes()
+
+    b_pronto, total, ids, stats = asyncio.run(cenario())
+    assert b_pronto < 0.5
+    assert total >= 0.9  # o chat A respeitou o retry_after
+    assert all(ids) and len(set(ids)) == 3
+    assert stats["chamadas"]["429"] >= 1
+    assert stats["por_chat"] == {"A": 2, "B": 1}
+
+
+def test_5xx_volta_para_a_fila(telegram):
+    stub = telegram(chat_rps=0, global_rps=0, erros=1.0)
+
+    async def cenario():
+        pub = Publicador(token=TOKEN, base=BASE, modo=publisher.INDIVIDUAL, chat_rate=100)
+        try:
+            futuros = pub.publicar("A", _ofertas(2))
+            while (await _stub(stub, "GET", "/_stub/stats"))["chamadas"].get("5xx", 0) < 2:
+                await asyncio.sleep(0.01)
+            await _stub(stub, "POST", "/_stub/config", json={"erros": 0})  # o upstream volta
+            await pub.drenar(5)
+            return [f.result() for f in futuros], await _stub(stub, "GET", "/_stub/stats")
+        finally:
+            await pub.parar(1)
+            await http.fechar_clientes()
+
+    ids, stats = asyncio.run(cenario())
+    assert all(ids)
+    assert stats["por_chat"] == {"A": 2}
+
+
+def test_digest_dividido_no_limite_de_texto(telegram):
+    gravador = telegram(chat_rps=0, global_rps=0)
+    ofertas = _ofertas(10, titulo="Produto com título bem comprido " * 12)
+
+    async def cenario():
+        pub = Publicador(token=TOKEN, base=BASE, modo=publisher.DIGEST, janela=0.2, chat_rate=100)
+        try:
+            futuros = pub.publicar("A", ofertas)
+            await pub.drenar(5)
+            return [f.result() for f in futuros]
+        finally:
+            await pub.parar(1)
+            await http.fechar_clientes()
+
+    ids = asyncio.run(cenario())
+    textos = [p["text"] for metodo, p in gravador.pedidos if metodo == "sendMessage"]
+    assert len(textos) > 1
+    assert all(len(t) <= LIMITE_TEXTO for t in textos)
+    # nada cortado: cada oferta aparece inteira em exatamente uma mensagem
+    for o in ofertas:
+        assert sum(o.titulo in t for t in textos) == 1
+    assert all(ids)
+
+
+def test_resposta_fora_do_formato_nao_prende_a_fila(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setitem(ratelimit.LIMITES, "telegram.test", 100000.0)
+    respostas = iter([
+        httpx.Response(200, text="<html>proxy</html>"),
+        httpx.Response(200, json={"ok": True, "result": [{"message_id": 7}]}),  # faltou um
+        httpx.Response(200, json=["inesperado"]),
+    ])
+    monkeypatch.setattr(http, "_clients", {BASE: [httpx.AsyncClient(
+        base_url=BASE, transport=httpx.MockTransport(lambda request: next(respostas)))]})
+
+    async def cenario():
+        pub = Publicador(token=TOKEN, base=BASE, modo=publisher.ALBUM, janela=0.05, chat_rate=100)
+        try:
+            lotes = []
+            for ofertas in (_ofertas(1), _ofertas(2, imagem=True), _ofertas(1)):
+                lotes.append(pub.publicar("A", ofertas))
+                await asyncio.sleep(0.2)
+            await pub.drenar(2)
+            return [[f.result() for f in lote] for lote in lotes]
+        finally:
+            await pub.parar(1)
+            await http.fechar_clientes()
+
+    resultados = asyncio.run(cenario())
+    assert resultados[0] == [None]
+    assert resultados[1] == [7, None]
+    assert resultados[2] == [None]
@@ -0,0 +1,116 @@
+"""
+Simulação do rate limit (utils/ratelimit.py + utils/http.enviar) contra um
+stub que aplica uma cota por janela e responde 429 com Retry-After acima
+dela, como os upstreams fazem.
+"""
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from utils import http, ratelimit
+
+BASE = "http://cota.test"
+HOST = "cota.test"
+COTA = 10  # requisições por janela
+JANELA = 0.5  # s, ou seja 20 req/s
+DURACAO = 4.0
+CLIENTES = 8
+
+
+class Cota:
+    """Upstream com cota fixa por janela; acima dela, 429 + Retry-After."""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.janela = -1
+        self.usados = 0
+        self.aceitas = []  # instantes (s desde o início) das respostas 200
+        self.recusadas = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        agora = time.monotonic() - self.inicio
+        janela = int(agora / JANELA)
+        if janela != self.janela:
+            self.janela, self.usados = janela, 0
+        self.usados += 1
+        if self.usados > COTA:
+            self.recusadas += 1
+            resto = (janela + 1) * JANELA - agora
+            return httpx.Response(429, headers={"Retry-After": f"{resto:.3f}"})
+        self.aceitas.append(agora)
+        await asyncio.sleep(0.005)
+        return httpx.Response(200, json={"ok": True})
+
+
+@pytest.fixture
+def cota(monkeypatch):
+    # o bucket começa no dobro da cota: só o 429 ensina o ritmo certo
+    monkeypatch.setitem(ratelimit.LIMITES, HOST, 2 * COTA / JANELA)
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setattr(http, "_clients", {})
+    stub = Cota()
+    http._clients[BASE] = [httpx.AsyncClient(base_url=BASE, transport=httpx.MockTransport(stub))]
+    return stub
+
+
+async def _carga(stub: Cota):
+    fim = stub.inicio + DURACAO
+    status = []
+
+    async def cliente():
+        while time.monotonic() < fim:
+            resp = await http.enviar(BASE, "GET", "/", tentativas=3)
+            status.append(resp.status_code)
+
+    try:
+        await asyncio.gather(*(cliente() for _ in range(CLIENTES)))
+    finally:
+        await http.fechar_clientes()
+    return status
+
+
+def test_vazao_converge_para_a_cota(cota):
+    status = asyncio.run(_carga(cota))
+    limite = COTA / JANELA
+    janelas = DURACAO / JANELA
+
+    # nenhuma chamada de quem usa enviar termina em 429 (o retry absorve)
+    assert status.count(429) == 0
+    # vazão sustentada perto da cota (sem colapsar no rate mínimo depois dos 429)
+    segunda_metade = [t for t in cota.aceitas if DURACAO / 2 <= t < DURACAO]
+    vazao = len(segunda_metade) / (DURACAO / 2)
+    assert vazao <= limite * 1.05
+    assert vazao >= limite * 0.5
+    # 429 limitados: em média bem menos de um punhado por janela
+    assert cota.recusadas <= 3 * janelas
+
+
+def test_429_sem_pausa_do_host_espera_antes_de_repetir(monkeypatch):
+    monkeypatch.setitem(ratelimit.LIMITES, HOST, 1000.0)
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    instantes = []
+
+    def stub(request: httpx.Request) -> httpx.Response:
+        instantes.append(time.monotonic())
+        if request.url.path == "/limitado" and len(instantes) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.3"})
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(http, "_clients", {BASE: [httpx.AsyncClient(base_url=BASE, transport=httpx.MockTransport(stub))]})
+
+    async def cenario():
+        try:
+            repetida = asyncio.ensure_future(http.enviar(BASE, "GET", "/limitado", tentativas=2, pausa_host=False))
+            await asyncio.sleep(0.05)
+            # o host não foi pausado: outra rota passa na hora
+            outra = await http.enviar(BASE, "GET", "/outra")
+            return (await repetida).status_code, outra.status_code
+        finally:
+            await http.fechar_clientes()
+
+    assert asyncio.run(cenario()) == (200, 200)
+    primeira, outra, repetida = instantes
+    assert outra - primeira < 0.2
+    assert repetida - primeira >= 0.3
@@ -0,0 +1,112 @@
+"""
+RedisBackend (utils/shared.py) contra o tools/redis_standin.py, e dois
+TTLCache (um por "worker") dividindo o mesmo estado: um miss simultâneo nos
+dois vira uma única chamada ao upstream.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+
+import pytest
+
+from utils.cache import TTLCache, MISS, HIT
+from utils.shared import RedisBackend, SQLiteBackend
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+import redis_standin  # noqa: E402
+
+pytest.importorskip("redis")
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _com_redis(cenario, workers: int = 1):
+    """Sobe o stand-in no loop atual e roda `cenario(*backends)`, um backend por worker."""
+    redis_standin._dados.clear()
+    porta = _porta_livre()
+    servidor = await redis_standin.iniciar(porta=porta)
+    backends = [RedisBackend(f"redis://127.0.0.1:{porta}/0") for _ in range(workers)]
+    try:
+        return await cenario(*backends)
+    finally:
+        for be in backends:
+            await be._r.aclose()
+        servidor.close()
+        await servidor.wait_closed()
+
+
+def test_kv_lease_e_cota():
+    async def cenario(be):
+        assert await be.get("x") is None
+        await be.set("x", {"a": 1}, 60)
+        guardado_em, valor = await be.get("x")
+        assert valor == {"a": 1} and guardado_em <= time.time()
+        await be.set("curto", 1, 0.05)
+        await asyncio.sleep(0.1)
+        assert await be.get("curto") is None
+
+        assert await be.lease("tarefa", 60)
+        assert not await be.lease("tarefa", 60)
+        await be.liberar("tarefa")
+        assert await be.lease("tarefa", 60)
+        assert await be.lease("rapida", 0.05)
+        await asyncio.sleep(0.1)
+        assert await be.lease("rapida", 60)  # a reserva vencida não segura ninguém
+
+        return [await be.reservar("host", 3) for _ in range(4)]
+
+    esperas = asyncio.run(_com_redis(cenario))
+    # 3 vagas por janela de 1 s; a quarta só passa se a janela virou no meio
+    assert esperas[:3] == [0.0, 0.0, 0.0]
+    assert 0.0 <= esperas[3] <= 1.0
+
+
+def test_cota_somada_entre_workers():
+    async def cenario(a, b):
+        await asyncio.sleep(1 - time.time() % 1)  # começo de uma janela nova
+        return [await be.reservar("host", 4) for be in (a, b, a, b, a, b)]
+
+    esperas = asyncio.run(_com_redis(cenario, workers=2))
+    # a cota é do host, não de cada worker: só 4 das 6 passam na mesma janela
+    assert esperas[:4] == [0.0] * 4
+    assert all(0.0 < e <= 1.0 for e in esperas[4:])
+
+
+async def _miss_simultaneo(a, b):
+    chamadas = 0
+
+    async def fetch():
+        nonlocal chamadas
+        chamadas += 1
+        await asyncio.sleep(0.2)
+        return {"resultados": [1, 2, 3]}
+
+    caches = [TTLCache(ttl_padrao=60, backend=be) for be in (a, b)]
+    chave = ("ml", "fone", 5, 0)
+    # três chamadores em cada worker, todos no mesmo instante
+    respostas = await asyncio.gather(*(c.get_swr(chave, fetch) for c in caches for _ in range(3)))
+    depois = [await c.get_swr(chave, fetch) for c in caches]
+    return chamadas, respostas, depois
+
+
+def test_dois_caches_no_redis_buscam_uma_vez():
+    chamadas, respostas, depois = asyncio.run(_com_redis(_miss_simultaneo, workers=2))
+    assert chamadas == 1
+    assert all(valor == {"resultados": [1, 2, 3]} for valor, _, _ in respostas)
+    assert {estado for _, estado, _ in respostas} == {MISS}
+    assert [estado for _, estado, _ in depois] == [HIT, HIT]
+
+
+def test_dois_caches_no_sqlite_buscam_uma_vez(tmp_path):
+    caminho = str(tmp_path / "shared.db")
+    a, b = SQLiteBackend(caminho), SQLiteBackend(caminho)
+    chamadas, respostas, depois = asyncio.run(_miss_simultaneo(a, b))
+    assert chamadas == 1
+    assert all(valor == {"resultados": [1, 2, 3]} for valor, _, _ in respostas)
+    assert [estado for _, estado, _ in depois] == [HIT, HIT]
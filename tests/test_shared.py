@@ -0,0 +1,70 @@
+"""
+SQLiteBackend (utils/shared.py): semântica de kv/lease/cota e o event loop
+livre enquanto outro processo segura o lock de escrita do arquivo.
+"""
+import time
+import sqlite3
+import asyncio
+
+from utils.shared import SQLiteBackend
+
+TIQUE = 0.005
+
+
+def test_kv_lease_e_cota(tmp_path):
+    be = SQLiteBackend(str(tmp_path / "shared.db"))
+
+    async def cenario():
+        assert await be.get("x") is None
+        await be.set("x", {"a": 1}, 60)
+        guardado_em, valor = await be.get("x")
+        assert valor == {"a": 1} and guardado_em <= time.time()
+        await be.set("velho", 1, -1)
+        assert await be.get("velho") is None
+
+        assert await be.lease("tarefa", 60)
+        assert not await be.lease("tarefa", 60)
+        await be.liberar("tarefa")
+        assert await be.lease("tarefa", 60)
+
+        esperas = [await be.reservar("host", 3) for _ in range(4)]
+        return esperas
+
+    esperas = asyncio.run(cenario())
+    # 3 vagas por janela de 1 s; a quarta só passa se a janela virou no meio
+    assert esperas[:3] == [0.0, 0.0, 0.0]
+    assert 0.0 <= esperas[3] <= 1.0
+
+
+def test_lock_do_arquivo_nao_trava_o_loop(tmp_path):
+    caminho = str(tmp_path / "shared.db")
+    be = SQLiteBackend(caminho)
+    outro = sqlite3.connect(caminho, isolation_level=None)
+
+    async def cenario():
+        pior = 0.0
+        parar = asyncio.Event()
+
+        async def sonda():
+            nonlocal pior
+            while not parar.is_set():
+                antes = time.perf_counter()
+                await asyncio.sleep(TIQUE)
+                pior = max(pior, time.perf_counter() - antes - TIQUE)
+
+        # "outro worker" segura o lock de escrita por 0,5 s
+        outro.execute("BEGIN IMMEDIATE")
+        asyncio.get_running_loop().call_later(0.5, outro.execute, "COMMIT")
+        tarefa_sonda = asyncio.ensure_future(sonda())
+        inicio = time.perf_counter()
+        ganhou = await be.lease("renovacao", 30)
+        espera = time.perf_counter() - inicio
+        parar.set()
+        await tarefa_sonda
+        return ganhou, espera, pior
+
+    ganhou, espera, pior = asyncio.run(cenario())
+    outro.close()
+    assert ganhou
+    assert espera >= 0.4  # esperou o lock de verdade
+    assert pior < 0.1
@@ -0,0 +1,166 @@
+"""
+SigV4Signer contra o algoritmo inline original do providers/amazon_api.py
+(antes do cache da chave e dos templates) e contra os exemplos da
+documentação da AWS; e o momento da assinatura nas chamadas à PA-API.
+"""
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+
+from providers import amazon_api
+from utils import http, ratelimit
+from utils.sigv4 import SigV4Signer, signing_key
+
+ACCESS_KEY = "AKIDEXAMPLE"
+SECRET_KEY = "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY"
+HOST = "webservices.amazon.com.br"
+SERVICE = "ProductAdvertisingAPI"
+
+
+def _assinar_original(payload: str, t: time.struct_time, operation: str, region: str) -> dict:
+    """Cópia do SigV4 inline do commit base (só os parâmetros viraram argumentos)."""
+    def _sign(key, msg):
+        return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+    def _get_signature_key(key, dateStamp, regionName, serviceName):
+        kDate = _sign(("AWS4" + key).encode("utf-8"), dateStamp)
+        kRegion = _sign(kDate, regionName)
+        kService = _sign(kRegion, serviceName)
+        kSigning = _sign(kService, "aws4_request")
+        return kSigning
+
+    method = "POST"
+    service = SERVICE
+    content_type = "application/json; charset=UTF-8"
+    amz_target = f"com.amazon.paapi5.v1.ProductAdvertisingAPIv1.{operation}"
+
+    amz_date = time.strftime("%Y%m%dT%H%M%SZ", t)
+    datestamp = time.strftime("%Y%m%d", t)
+
+    canonical_uri = f"/paapi5/{operation.lower()}"
+    canonical_querystring = ""
+    canonical_headers = f"content-encoding:amz-1.0\ncontent-type:{content_type}\nhost:{HOST}\nx-amz-date:{amz_date}\nx-amz-target:{amz_target}\n"
+    signed_headers = "content-encoding;content-type;host;x-amz-date;x-amz-target"
+    payload_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    canonical_request = "\n".join([method, canonical_uri, canonical_querystring, canonical_headers, signed_headers, payload_hash])
+
+    algorithm = "AWS4-HMAC-SHA256"
+    credential_scope = f"{datestamp}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([algorithm, amz_date, credential_scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
+
+    key = _get_signature_key(SECRET_KEY, datestamp, region, service)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    return {
+        "Content-Encoding": "amz-1.0",
+        "Content-Type": content_type,
+        "X-Amz-Date": amz_date,
+        "X-Amz-Target": amz_target,
+        "Authorization": f"{algorithm} Credential={ACCESS_KEY}/{credential_scope}, SignedHeaders={signed_headers}, Signature={signature}",
+        "Host": HOST
+    }
+
+
+def _signer(operation: str, region: str) -> SigV4Signer:
+    return SigV4Signer(
+        ACCESS_KEY, SECRET_KEY, HOST, region, SERVICE,
+        uri=f"/paapi5/{operation.lower()}",
+        target=f"com.amazon.paapi5.v1.ProductAdvertisingAPIv1.{operation}",
+    )
+
+
+PAYLOADS = [
+    "",
+    json.dumps({"Keywords": "eletrônicos ofertas", "ItemCount": 2, "PartnerTag": "tag-20"}),
+    json.dumps({"ItemIds": [f"B0{i:08d}" for i in range(10)], "Resources": ["ItemInfo.Title"]}, ensure_ascii=False),
+    "ç" * 5000,
+]
+INSTANTES = [
+    time.gmtime(0),
+    time.strptime("20240229T235959Z", "%Y%m%dT%H%M%SZ"),
+    time.strptime("20261018T000000Z", "%Y%m%dT%H%M%SZ"),
+]
+
+
+@pytest.mark.parametrize("operation", ["SearchItems", "GetItems"])
+@pytest.mark.parametrize("region", ["us-east-1", "eu-west-1"])
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("t", INSTANTES)
+def test_igual_ao_algoritmo_original(operation, region, payload, t):
+    assert _signer(operation, region).sign(payload, t) == _assinar_original(payload, t, operation, region)
+
+
+def test_virada_do_dia_troca_a_chave():
+    signer = _signer("SearchItems", "us-east-1")
+    antes = time.strptime("20261018T235959Z", "%Y%m%dT%H%M%SZ")
+    depois = time.strptime("20261019T000000Z", "%Y%m%dT%H%M%SZ")
+    for t in (antes, depois, antes):
+        assert signer.sign("{}", t) == _assinar_original("{}", t, "SearchItems", "us-east-1")
+
+
+def test_chave_derivada_exemplo_aws():
+    # "Examples of how to derive a signing key for Signature Version 4"
+    chave = signing_key(SECRET_KEY, "20120215", "us-east-1", "iam")
+    assert chave.hex() == "f4780e2d9f65fa895f9c67b32ce1baf0b0d8a43505a000a1a9e090d414db404d"
+
+
+def test_assinatura_exemplo_aws():
+    # exemplo IAM ListUsers da documentação do SigV4 (canonical request -> assinatura)
+    canonical_request = (
+        "GET\n/\nAction=ListUsers&Version=2010-05-08\n"
+        "content-type:application/x-www-form-urlencoded; charset=utf-8\n"
+        "host:iam.amazonaws.com\nx-amz-date:20150830T123600Z\n\n"
+        "content-type;host;x-amz-date\n"
+        "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    )
+    hash_cr = hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+    assert hash_cr == "f536975d06c0309214f805bb90ccff089219ecd68b2577efef23edd43b7e1a59"
+    string_to_sign = f"AWS4-HMAC-SHA256\n20150830T123600Z\n20150830/us-east-1/iam/aws4_request\n{hash_cr}"
+    chave = signing_key(SECRET_KEY, "20150830", "us-east-1", "iam")
+    assinatura = hmac.new(chave, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    assert assinatura == "5d672d79c15b13162d9279b0855cfba6789a8edb4c82c400e06b5924a6f2b5d7"
+
+
+def test_paapi_assina_na_hora_do_envio(monkeypatch):
+    base = "http://paapi.test"
+    assinadas = []  # instante de cada assinatura
+    recebidas = []  # (instante, X-Amz-Date) de cada requisição no upstream
+    original = SigV4Signer.sign
+
+    def espiar(self, payload, t=None):
+        assinadas.append(time.monotonic())
+        return original(self, payload, t)
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        recebidas.append((time.monotonic(), request.headers["X-Amz-Date"]))
+        await asyncio.sleep(0.2)
+        if len(recebidas) == 1:
+            return httpx.Response(500, json={"message": "erro"})  # força um retry
+        return httpx.Response(200, json={"ItemsResult": {"Items": []}})
+
+    monkeypatch.setattr(SigV4Signer, "sign", espiar)
+    for nome, valor in {"ACCESS_KEY": "AKID", "SECRET_KEY": "s", "ASSOC_TAG": "tag-20", "BASE": base,
+                        "CONCURRENCY": 1, "_semaforo": None, "_signers": {}}.items():
+        monkeypatch.setattr(amazon_api, nome, valor)
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setitem(ratelimit.LIMITES, "paapi.test", 100000.0)
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(http, "_clients", {base: [httpx.AsyncClient(base_url=base, transport=httpx.MockTransport(upstream))]})
+
+    async def cenario():
+        try:
+            # com AMAZON_CONCURRENCY=1 o segundo lote espera o primeiro (e o retry dele)
+            return await asyncio.gather(*(amazon_api.buscar_precos_amazon([f"B0{i}"]) for i in range(2)))
+        finally:
+            await http.fechar_clientes()
+
+    assert asyncio.run(cenario()) == [[], []]
+    # uma assinatura por envio, inclusive no retry, feita logo antes de enviar
+    assert len(assinadas) == len(recebidas) == 3
+    for assinada, (recebida, _) in zip(assinadas, recebidas):
+        assert 0 <= recebida - assinada < 0.1
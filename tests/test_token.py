@@ -0,0 +1,78 @@
+"""
+TokenManager (mercadolivre_token.py) sem SHARED_STATE: dois processos que
+dividem o TOKEN_FILE não podem gastar o mesmo refresh token de uso único.
+"""
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import mercadolivre_token
+from utils import http, shared
+
+BASE = "http://ml.test"
+
+
+class OAuth:
+    """/oauth/token do ML: cada refresh token vale uma vez só."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.gerados = 0
+        self.usados = set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.chamadas += 1
+        refresh = dict(httpx.QueryParams(request.content.decode()))["refresh_token"]
+        await asyncio.sleep(0.05)
+        if refresh in self.usados:
+            return httpx.Response(400, json={"error": "invalid_grant"})
+        self.usados.add(refresh)
+        self.gerados += 1
+        return httpx.Response(200, json={
+            "access_token": f"APP_USR-{self.gerados}",
+            "refresh_token": f"TG-{self.gerados}",
+            "expires_in": 21600,
+        })
+
+
+@pytest.fixture
+def oauth(monkeypatch):
+    monkeypatch.setattr(shared, "_backend", None)
+    monkeypatch.setattr(shared, "_iniciado", True)
+    monkeypatch.setattr(mercadolivre_token, "ML_BASE", BASE)
+    monkeypatch.setattr(mercadolivre_token, "CLIENT_ID", "id")
+    monkeypatch.setattr(mercadolivre_token, "CLIENT_SECRET", "segredo")
+    # _renovar exporta o par novo no ambiente
+    monkeypatch.setenv("ML_ACCESS_TOKEN", "")
+    monkeypatch.setenv("ML_REFRESH_TOKEN", "")
+    monkeypatch.setattr(http, "_clients", {})
+    stub = OAuth()
+    http._clients[BASE] = [httpx.AsyncClient(base_url=BASE, transport=httpx.MockTransport(stub))]
+    return stub
+
+
+def _gerente(path: str) -> mercadolivre_token.TokenManager:
+    gerente = mercadolivre_token.TokenManager(path=path)
+    gerente.access_token = "APP_USR-0"
+    gerente.refresh_token = "TG-0"
+    gerente.expira_em = time.time() - 1
+    return gerente
+
+
+def test_processos_com_o_mesmo_arquivo_renovam_uma_vez(oauth, tmp_path):
+    caminho = str(tmp_path / "ml_token.json")
+    # um TokenManager por "processo": cada um com o seu _renovando
+    a, b = _gerente(caminho), _gerente(caminho)
+
+    async def cenario():
+        try:
+            return await asyncio.gather(a.renovar(), b.renovar())
+        finally:
+            await http.fechar_clientes()
+
+    assert asyncio.run(cenario()) == ["APP_USR-1", "APP_USR-1"]
+    assert oauth.chamadas == 1
+    assert b.refresh_token == a.refresh_token == "TG-1"
+    assert mercadolivre_token.TokenManager(path=caminho).access_token == "APP_USR-1"
@@ -0,0 +1,112 @@
+"""
+PriceTracker (utils/tracker.py): mínimo da janela circular, limite de
+itens com reaproveitamento de slot e os ids esquecidos (fora do pool ou
+sem preço em rodadas seguidas).
+"""
+import asyncio
+
+import pytest
+
+from utils import tracker as tracker_mod
+from utils.offer import Offer
+from utils.tracker import PriceTracker, DIA
+
+# preços servidos pelo reprecificador falso: item_id -> centavos (ausente = anúncio sumiu)
+PRECOS = {}
+FALHAR = False
+
+
+async def _precos(ids):
+    if FALHAR:
+        raise RuntimeError("upstream fora")
+    return [
+        Offer(fonte="TESTE", titulo=i, link=f"https://x/{i}", preco_centavos=PRECOS[i], item_id=i)
+        for i in ids if i in PRECOS
+    ]
+
+
+@pytest.fixture
+def reprecificador(monkeypatch):
+    monkeypatch.setattr(tracker_mod, "REPRECIFICADORES", {"TESTE": f"{__name__}:_precos"})
+    monkeypatch.setattr(f"{__name__}.FALHAR", False)
+    PRECOS.clear()
+    yield
+    PRECOS.clear()
+
+
+def test_minimo_da_janela_circular():
+    t = PriceTracker(dias=3, limiar=0.05)
+    t.vigiar("ML", ["a"])
+
+    assert t.observar("ML", "a", 1000, 0 * DIA) is None  # primeira vira referência
+    queda = t.observar("ML", "a", 800, 1 * DIA)
+    assert queda.anterior == 1000 and queda.minimo == 1000 and queda.oferta
+    alta = t.observar("ML", "a", 900, 2 * DIA)
+    assert alta.minimo == 800 and not alta.oferta
+    assert t.serie("ML", "a") == [1000, 800, 900]
+
+    t.observar("ML", "a", 950, 3 * DIA)  # sai o dia 0; o mínimo (dia 1) fica
+    assert t.minimo("ML", "a") == 800
+    t.observar("ML", "a", 990, 4 * DIA)  # sai o dia do mínimo: recalcula
+    assert t.minimo("ML", "a") == 900
+    assert t.serie("ML", "a") == [900, 950, 990]
+
+    t.observar("ML", "a", 970, 4 * DIA + 60)  # mesmo dia: fica o menor
+    assert t.serie("ML", "a") == [900, 950, 970]
+
+    t.observar("ML", "a", 1200, 20 * DIA)  # pulo maior que a janela esvazia tudo
+    assert t.serie("ML", "a") == [None, None, 1200]
+    assert t.minimo("ML", "a") == 1200
+
+
+def test_limite_de_itens_e_slot_reaproveitado():
+    t = PriceTracker(max_itens=2, dias=3)
+    assert t.vigiar("ML", ["a", "b", "c"]) == 2
+    assert t.vigiar("ML", ["c"]) == 0
+    assert len(t) == 2
+    t.observar("ML", "a", 1000, 0)
+
+    t.esquecer("ML", "a")
+    assert t.vigiar("ML", ["c"]) == 1
+    assert sorted(t.ids("ML")) == ["b", "c"]
+    # o slot que era do "a" volta limpo
+    assert t.minimo("ML", "c") is None and t.serie("ML", "c") == []
+    assert t.minimo("ML", "a") is None
+
+
+def test_sincronizar_esquece_quem_saiu_do_pool():
+    t = PriceTracker(max_itens=3)
+    t.vigiar("ML", ["a", "b"])
+    t.vigiar("SHOPEE", ["a"])
+    assert t.sincronizar("ML", ["b", "d"]) == (1, 1)
+    assert sorted(t.ids("ML")) == ["b", "d"]
+    assert t.ids("SHOPEE") == ["a"]
+
+
+def test_esquece_quem_fica_sem_preco(reprecificador, monkeypatch):
+    t = PriceTracker(max_faltas=2)
+    t.vigiar("TESTE", ["a", "b", "c"])
+    PRECOS.update({"a": 1000, "b": None})  # "c" não volta mais
+
+    asyncio.run(t.reprecificar())
+    assert sorted(t.ids("TESTE")) == ["a", "b", "c"]
+    assert t.encerrados == {}
+
+    # falha do upstream não conta como falta
+    monkeypatch.setattr(f"{__name__}.FALHAR", True)
+    asyncio.run(t.reprecificar())
+    assert sorted(t.ids("TESTE")) == ["a", "b", "c"]
+
+    monkeypatch.setattr(f"{__name__}.FALHAR", False)
+    asyncio.run(t.reprecificar())
+    assert t.ids("TESTE") == ["a"]
+    assert sorted(t.encerrados["TESTE"]) == ["b", "c"]
+
+    # voltou a ter preço antes do limite: a contagem zera
+    t.vigiar("TESTE", ["b"])
+    asyncio.run(t.reprecificar())
+    PRECOS["b"] = 500
+    asyncio.run(t.reprecificar())
+    PRECOS["b"] = None
+    asyncio.run(t.reprecificar())
+    assert sorted(t.ids("TESTE")) == ["a", "b"]
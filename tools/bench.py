@@ -0,0 +1,314 @@
+"""
+Benchmarks repetíveis contra o upstream falso (tools/mock_upstream.py).
+
+    python tools/bench.py                          # todos os casos
+    python tools/bench.py --casos proxy_ml_miss ciclo_completo
+    python tools/bench.py --saida bench-antes.json
+    python tools/bench.py --comparar bench-antes.json
+
+Sobe o mock num subprocesso, aponta todas as bases de URL para ele e mede
+cada caso com um número fixo de operações (semente fixa no mock): req/s,
+latência p50/p95/p99 e memória (pico e retido por operação, via
+tracemalloc numa passada separada). --saida grava JSON; --comparar mostra a
+variação em relação a uma execução anterior.
+
+Os casos parse_* decodificam as respostas gravadas em tools/fixtures/ (busca
+do ML e SearchItems da PA-API, repetidas até --itens-parse itens e entregues
+em pedaços de 64 KiB) com utils.parsing.ler_itens (_stream) e com
+resp.json() mais a mesma projeção (_json): com --concorrencia 1 o p50 é o
+tempo de decodificação e o pico KiB a memória de uma resposta (com mais
+concorrência o streaming cede o loop a cada pedaço e a latência mede o
+revezamento, não o parse). Com --itens-parse 50 (uma página normal, abaixo
+de PARSE_STREAM_BYTES) o ler_itens também usa json.loads e os dois empatam;
+com 1000 ele passa ao ijson, que é mais lento e gasta cerca de 1/3 da memória.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ambiente(base: str, pasta: str):
+    """Credenciais falsas e todas as bases apontando para o mock (antes dos imports)."""
+    os.environ.update({
+        "ML_API_BASE": base,
+        "SHOPEE_PARTNER_BASE": base,
+        "SHOPEE_AFFILIATE_BASE": base,
+        "AMAZON_BASE": base,
+        "RATE_LIMITS": "127.0.0.1=100000",
+        "HEDGE_REQUESTS": "0",
+        "SHARED_STATE": "",
+        "OFFER_DB": os.path.join(pasta, "offers.db"),
+        "ML_TOKEN_FILE": os.path.join(pasta, "ml_token.json"),
+        "ML_ACCESS_TOKEN": "APP_USR-bench",
+        "SHOPEE_APP_ID": "1", "SHOPEE_APP_SECRET": "bench",
+        "SHOPEE_PARTNER_ID": "1", "SHOPEE_PARTNER_KEY": "bench", "SHOPEE_PARTNER_SECRET": "bench",
+        "SHOPEE_SHOP_ID": "1", "SHOPEE_ACCESS_TOKEN": "bench",
+        "AMAZON_ACCESS_KEY": "AKIDBENCH", "AMAZON_SECRET_KEY": "bench", "AMAZON_ASSOCIATE_TAG": "bench-20",
+    })
+
+
+class _Pedacos(httpx.AsyncByteStream):
+    """Corpo entregue em pedaços, como chega da rede."""
+
+    def __init__(self, corpo: bytes, tamanho: int = 64 * 1024):
+        self.corpo = corpo
+        self.tamanho = tamanho
+
+    async def __aiter__(self):
+        for i in range(0, len(self.corpo), self.tamanho):
+            yield self.corpo[i:i + self.tamanho]
+
+
+def _corpo_fixture(nome: str, caminho: tuple, itens: int) -> bytes:
+    # resposta gravada com a lista em `caminho` repetida até `itens` itens
+    with open(os.path.join(RAIZ, "tools", "fixtures", nome), encoding="utf-8") as f:
+        dados = json.load(f)
+    pai = dados
+    for chave in caminho[:-1]:
+        pai = pai[chave]
+    modelos = pai[caminho[-1]]
+    pai[caminho[-1]] = [modelos[i % len(modelos)] for i in range(itens)]
+    return json.dumps(dados).encode("utf-8")
+
+
+def _casos(itens_parse: int = 1000):
+    """nome -> fábrica de operação: op(i) é uma coroutine que faz uma unidade de trabalho."""
+    import bot
+    import ml_api
+    import shopee_api
+    from providers import amazon_api, aggregator
+    from providers import shopee_api as shopee_openapi
+    from utils.text import formatar_digest
+    from utils.parsing import ler_itens, projetar_ml, projetar_amazon
+
+    cliente = bot.app.test_client()
+
+    async def proxy_ml_miss(i):
+        r = await cliente.get(f"/proxy/ml?q=termo {i}")
+        await r.get_data()
+
+    async def proxy_ml_hit(i):
+        r = await cliente.get("/proxy/ml?q=termo quente")
+        await r.get_data()
+
+    async def proxy_shopee_miss(i):
+        r = await cliente.get(f"/proxy/shopee?q=termo {i}")
+        await r.get_data()
+
+    async def proxy_bulk(i):
+        termos = ",".join(f"lote {i} {j}" for j in range(10))
+        r = await cliente.get(f"/proxy/bulk?q={termos}&limit=20")
+        await r.get_data()
+
+    async def ml_buscar_ofertas(i):
+        await ml_api.buscar_ofertas_mercadolivre(f"categoria {i}")
+
+    async def shopee_v2_pagina(i):
+        shopee_api._detalhes._dados.clear()
+        ids, _ = await shopee_api._listar_pagina((i * 50) % 150)
+        await shopee_api._resolver_itens(ids)
+
+    async def shopee_openapi_lista(i):
+        await shopee_openapi.buscar_ofertas_shopee(["x"], max_itens=10)
+
+    async def amazon_search(i):
+        await amazon_api.buscar_ofertas_amazon(list(amazon_api.KEYWORDS), max_itens=10)
+
+    async def amazon_getitems(i):
+        await amazon_api.buscar_precos_amazon([f"B0BENCH{i:03d}{j:02d}" for j in range(20)])
+
+    async def ciclo_completo(i):
+        ofertas = await aggregator.buscar_ofertas(["eletronicos", "ferramentas"], max_itens=5)
+        formatar_digest(ofertas)
+
+    # decodificação das respostas gravadas (sem rede): streaming x resp.json()
+    corpo_ml = _corpo_fixture("ml_search.json", ("results",), itens_parse)
+    corpo_paapi = _corpo_fixture("paapi_searchitems.json", ("SearchResult", "Items"), itens_parse)
+
+    def _resposta(corpo: bytes) -> httpx.Response:
+        return httpx.Response(200, stream=_Pedacos(corpo))
+
+    async def _via_json(corpo: bytes, caminho: tuple, projetar):
+        # o caminho antigo: documento inteiro em dicts, depois a projeção
+        resp = _resposta(corpo)
+        await resp.aread()
+        dados = resp.json()
+        for chave in caminho:
+            dados = dados[chave]
+        return [o for o in map(projetar, dados) if o is not None]
+
+    async def parse_ml_stream(i):
+        await ler_itens(_resposta(corpo_ml), "results.item", projetar_ml)
+
+    async def parse_ml_json(i):
+        await _via_json(corpo_ml, ("results",), projetar_ml)
+
+    async def parse_paapi_stream(i):
+        await ler_itens(_resposta(corpo_paapi), "SearchResult.Items.item", projetar_amazon)
+
+    async def parse_paapi_json(i):
+        await _via_json(corpo_paapi, ("SearchResult", "Items"), projetar_amazon)
+
+    return {f.__name__: f for f in (
+        proxy_ml_miss, proxy_ml_hit, proxy_shopee_miss, proxy_bulk,
+        ml_buscar_ofertas, shopee_v2_pagina, shopee_openapi_lista,
+        amazon_search, amazon_getitems, ciclo_completo,
+        parse_ml_stream, parse_ml_json, parse_paapi_stream, parse_paapi_json,
+    )}
+
+
+def _quantil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000 if ordenadas else 0.0
+
+
+async def medir(op, iteracoes: int, concorrencia: int, amostras_mem: int, inicio: int) -> dict:
+    # aquecimento (conexões, caches de módulo)
+    for i in range(min(5, iteracoes)):
+        await op(inicio - 1 - i)
+
+    latencias = []
+    fila = iter(range(inicio, inicio + iteracoes))
+
+    async def trabalhador():
+        for i in fila:
+            t = time.perf_counter()
+            await op(i)
+            latencias.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    total = time.perf_counter() - t0
+    latencias.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for i in range(amostras_mem):
+        await op(inicio + iteracoes + i)
+    gc.collect()
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": iteracoes,
+        "ops_s": iteracoes / total,
+        "p50_ms": _quantil(latencias, 0.50),
+        "p95_ms": _quantil(latencias, 0.95),
+        "p99_ms": _quantil(latencias, 0.99),
+        "pico_kib": (pico - base) / 1024,
+        "retido_kib_op": (atual - base) / 1024 / max(1, amostras_mem),
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _imprimir(resultados: dict, anterior: dict = None):
+    print(f"{'caso':<22} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'pico KiB':>9} {'ret KiB/op':>10}")
+    for nome, r in resultados.items():
+        linha = (f"{nome:<22} {r['ops_s']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                 f"{r['p99_ms']:>8.2f} {r['pico_kib']:>9.1f} {r['retido_kib_op']:>10.2f}")
+        antes = (anterior or {}).get(nome)
+        if antes:
+            dv = (r["ops_s"] / antes["ops_s"] - 1) * 100 if antes["ops_s"] else 0.0
+            dp = (r["p95_ms"] / antes["p95_ms"] - 1) * 100 if antes["p95_ms"] else 0.0
+            linha += f"   ops/s {dv:+.1f}%  p95 {dp:+.1f}%"
+        print(linha)
+
+
+async def _rodar(args, casos) -> dict:
+    resultados = {}
+    for n, nome in enumerate(args.casos or casos):
+        # cada caso usa uma faixa própria de índices (termos/ids não se repetem entre casos)
+        resultados[nome] = await medir(casos[nome], args.iteracoes, args.concorrencia,
+                                       args.amostras_mem, inicio=(n + 1) * 1_000_000)
+    from utils.http import fechar_clientes
+    await fechar_clientes()
+    return resultados
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks do proxy e dos provedores contra o upstream falso")
+    ap.add_argument("--casos", nargs="*")
+    ap.add_argument("--iteracoes", type=int, default=200)
+    ap.add_argument("--concorrencia", type=int, default=8)
+    ap.add_argument("--amostras-mem", type=int, default=20)
+    ap.add_argument("--latencia", type=float, default=0.0, help="latência do mock em ms")
+    ap.add_argument("--itens-parse", type=int, default=1000, help="itens por resposta nos casos parse_*")
+    ap.add_argument("--saida", help="grava os resultados em JSON")
+    ap.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = ap.parse_args()
+
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "tools", "mock_upstream.py"),
+         "--porta", str(porta), "--latencia", str(args.latencia)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/_mock/stats", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            _ambiente(base, pasta)
+            sys.path.insert(0, RAIZ)
+            casos = _casos(args.itens_parse)
+            logging.disable(logging.WARNING)
+            desconhecidos = set(args.casos or ()) - set(casos)
+            if desconhecidos:
+                ap.error(f"casos desconhecidos: {', '.join(sorted(desconhecidos))}")
+            resultados = asyncio.run(_rodar(args, casos))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)["casos"]
+    print(f"commit={_commit()} python={platform.python_version()} cpus={os.cpu_count()} "
+          f"iterações={args.iteracoes} concorrência={args.concorrencia} latência mock={args.latencia:.0f}ms")
+    _imprimir(resultados, anterior)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+                "parametros": {k: getattr(args, k) for k in ("iteracoes", "concorrencia", "amostras_mem", "latencia", "itens_parse")},
+                "casos": resultados,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Conversão de preços de uma página grande da Shopee (utils/precos.py).
+
+    python tools/bench_precos.py
+    python tools/bench_precos.py --itens 10000 --rodadas 20
+
+Gera páginas de --itens itens (price_info.current_price da v2, `price`
+legado em 1/100000 e uma mistura dos dois, com alguns itens sem preço) e
+mede, em ms por página (mediana de --rodadas):
+- heurística antiga por tamanho do número (antes de utils/precos.py);
+- precos.normalizar_pagina (decodificação pelo campo, item a item).
+Também conta quantos preços a heurística antiga errava em cada página.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _heuristica_antiga(raw):
+    # shopee_api._preco_centavos antes da decodificação por campo
+    from utils.offer import para_centavos
+
+    if raw is None:
+        return None
+    try:
+        v = float(raw)
+        if v > 1e6:
+            v = v / 1_000_000.0
+        elif v > 1e3 and v % 100 == 0:
+            v = v / 100.0
+        return para_centavos(v)
+    except Exception:
+        return None
+
+
+def _paginas(n: int, semente: int = 42):
+    sorteio = random.Random(semente)
+
+    def v2():
+        return {"price_info": [{"current_price": sorteio.randrange(100, 10_000_000) / 100}]}
+
+    def legado():
+        return {"price": sorteio.randrange(100, 10_000_000) * 1000}
+
+    def misto():
+        r = sorteio.random()
+        return {} if r < 0.05 else v2() if r < 0.5 else legado()
+
+    return {"v2": [v2() for _ in range(n)], "legado": [legado() for _ in range(n)], "misto": [misto() for _ in range(n)]}
+
+
+def _ms(f, rodadas: int) -> float:
+    tempos = []
+    for _ in range(rodadas):
+        t = time.perf_counter()
+        f()
+        tempos.append(time.perf_counter() - t)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Conversão de preços de uma página grande da Shopee")
+    ap.add_argument("--itens", type=int, default=10_000)
+    ap.add_argument("--rodadas", type=int, default=20)
+    args = ap.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    from utils import precos
+
+    print(f"{args.itens} itens por página, mediana de {args.rodadas} rodadas (ms)")
+    print(f"{'página':<8} {'antiga':>8} {'por campo':>10} {'erros da antiga':>16}")
+    for nome, itens in _paginas(args.itens).items():
+        def antiga():
+            return [_heuristica_antiga(precos.extrair(i)[1]) for i in itens]
+
+        certos = precos.normalizar_pagina(itens)
+        erros = sum(1 for a, c in zip(antiga(), certos) if (a if a is not None else precos.SEM_PRECO) != c)
+        print(f"{nome:<8} {_ms(antiga, args.rodadas):>8.2f} "
+              f"{_ms(lambda: precos.normalizar_pagina(itens), args.rodadas):>10.2f} {erros:>16}")
+
+
+if __name__ == "__main__":
+    main()
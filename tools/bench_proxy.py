@@ -0,0 +1,156 @@
+"""
+Carga HTTP no proxy: servidor Flask original x app ASGI atual (server.py),
+os dois contra o tools/mock_upstream.py.
+
+    python tools/bench_proxy.py
+    python tools/bench_proxy.py --rota shopee --conexoes 128 --segundos 10 --latencia 100
+
+"antes" é o tools/flask_proxy_baseline.py (cópia do bot.py original: Flask
+dev server, requests sem pool); "depois" é o server.py com 1 worker (o
+mesmo número de processos). Cada servidor recebe --conexoes clientes
+keep-alive por --segundos em /proxy/<rota>; por padrão cada requisição usa
+um termo novo, então o cache do proxy não ajuda (--termos N repete N
+termos e mostra o efeito do cache). Imprime req/s, p50/p99, erros e
+quantas chamadas chegaram ao upstream.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALVOS = {
+    "flask": [sys.executable, os.path.join(RAIZ, "tools", "flask_proxy_baseline.py")],
+    "asgi": [sys.executable, os.path.join(RAIZ, "server.py")],
+}
+UPSTREAM = {"ml": "/sites/MLB/search", "shopee": "/api/v1/offer/product_offer"}
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar(url: str, prazo: float = 30):
+    fim = time.monotonic() + prazo
+    while time.monotonic() < fim:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu")
+
+
+async def _carga(base: str, rota: str, conexoes: int, segundos: float, termos: int):
+    latencias = []
+    erros = 0
+    contador = 0
+    # um cliente (uma conexão keep-alive) por usuário simulado: num pool único
+    # o httpcore varre todas as conexões a cada requisição e o gerador de
+    # carga vira o gargalo. Criados antes do cronômetro (cada um carrega o
+    # contexto TLS).
+    limites = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    clientes = [httpx.AsyncClient(base_url=base, limits=limites, timeout=30) for _ in range(conexoes)]
+    fim = time.monotonic() + segundos
+
+    async def cliente(c: httpx.AsyncClient):
+        nonlocal erros, contador
+        while time.monotonic() < fim:
+            contador += 1
+            termo = f"bench {contador % termos if termos else contador}"
+            inicio = time.perf_counter()
+            try:
+                r = await c.get(f"/proxy/{rota}", params={"q": termo})
+                r.raise_for_status()
+            except httpx.HTTPError:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    try:
+        await asyncio.gather(*(cliente(c) for c in clientes))
+    finally:
+        for c in clientes:
+            await c.aclose()
+
+    latencias.sort()
+    n = len(latencias)
+    return {
+        "rps": n / segundos,
+        "p50": latencias[n // 2] * 1000 if n else 0,
+        "p99": latencias[int(n * 0.99)] * 1000 if n else 0,
+        "erros": erros,
+    }
+
+
+def rodar(alvo: str, mock: str, args) -> dict:
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    env = dict(
+        os.environ,
+        PORT=str(porta),
+        WEB_CONCURRENCY="1",
+        DRAIN_DELAY="0",
+        ML_API_BASE=mock,
+        SHOPEE_AFFILIATE_BASE=mock,
+        SHOPEE_APP_ID="bench",
+        SHOPEE_APP_SECRET="bench",
+        RATE_LIMITS="127.0.0.1=100000",
+        SHARED_STATE="",
+    )
+    proc = subprocess.Popen(ALVOS[alvo], cwd=RAIZ, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _esperar(f"{base}/")
+        httpx.post(f"{mock}/_mock/config", json={})  # zera as contagens
+        resultado = asyncio.run(_carga(base, args.rota, args.conexoes, args.segundos, args.termos))
+        resultado["upstream"] = httpx.get(f"{mock}/_mock/stats").json().get(UPSTREAM[args.rota], 0)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+    return resultado
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Carga HTTP: proxy Flask original x ASGI")
+    ap.add_argument("--rota", choices=sorted(UPSTREAM), default="ml")
+    ap.add_argument("--conexoes", type=int, default=64)
+    ap.add_argument("--segundos", type=float, default=10)
+    ap.add_argument("--latencia", type=float, default=50.0, help="latência do mock em ms")
+    ap.add_argument("--termos", type=int, default=0, help="termos distintos (0 = um por requisição)")
+    args = ap.parse_args()
+
+    porta = _porta_livre()
+    mock = f"http://127.0.0.1:{porta}"
+    upstream = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "tools", "mock_upstream.py"),
+         "--porta", str(porta), "--latencia", str(args.latencia)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _esperar(f"{mock}/_mock/stats")
+        print(f"rota=/proxy/{args.rota} conexões={args.conexoes} duração={args.segundos:.0f}s "
+              f"latência do upstream={args.latencia:.0f}ms termos={args.termos or 'únicos'}")
+        print(f"{'servidor':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6} {'upstream':>9}")
+        base = None
+        for alvo in ALVOS:
+            r = rodar(alvo, mock, args)
+            base = base or r["rps"] or 1
+            print(f"{alvo:<8} {r['rps']:>9.0f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['erros']:>6} "
+                  f"{r['upstream']:>9}  ({r['rps'] / base:.2f}x)")
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
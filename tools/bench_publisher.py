@@ -0,0 +1,159 @@
+"""
+Vazão e latência de fila do publicador (utils/publisher.py) contra a Bot API
+falsa (tools/telegram_stub.py).
+
+    python tools/bench_publisher.py
+    python tools/bench_publisher.py --chats 50 --ofertas 10 --modos digest album --erros 0.05
+
+Sobe o stub com os limites do Telegram (--stub-chat-rps por chat,
+--stub-global-rps no bot) e, em cada modo, enfileira --ofertas ofertas em
+cada um dos --chats de uma vez e espera a fila esvaziar. Mostra envios/s
+(chamadas à Bot API aceitas), ofertas/s, latência de fila (enfileirar -> confirmado)
+p50/p95/p99/máx e quantos 429/5xx o stub devolveu.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _quantil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000 if ordenadas else 0.0
+
+
+def _ofertas(chat: int, n: int, com_imagem: float):
+    from utils.offer import Offer
+
+    return [
+        Offer(
+            fonte="MERCADOLIVRE",
+            titulo=f"Produto {chat}-{i} com um título de tamanho normal",
+            link=f"https://produto.mercadolivre.com.br/MLB-{chat:04d}{i:05d}",
+            preco_centavos=9990 + i * 100,
+            imagem=f"https://http2.mlstatic.com/D_{chat}_{i}-O.jpg" if (i * 37) % 100 < com_imagem * 100 else None,
+            item_id=f"MLB{chat:04d}{i:05d}",
+        )
+        for i in range(n)
+    ]
+
+
+async def medir(base: str, modo: str, args) -> dict:
+    from utils.publisher import Publicador
+
+    async with httpx.AsyncClient(base_url=base) as c:
+        await c.post("/_stub/config", json={"erros": args.erros})
+
+    pub = Publicador(token="123:bench", base=base, modo=modo, janela=args.janela,
+                     max_lote=args.lote, chat_rate=args.chat_rate)
+    latencias = []
+
+    def _medir(inicio):
+        def concluido(futuro):
+            if not futuro.exception():
+                latencias.append(time.monotonic() - inicio)
+        return concluido
+
+    t0 = time.perf_counter()
+    futuros = []
+    for chat in range(args.chats):
+        inicio = time.monotonic()
+        for f in pub.publicar(-1000 - chat, _ofertas(chat, args.ofertas, args.imagens)):
+            f.add_done_callback(_medir(inicio))
+            futuros.append(f)
+    await pub.drenar()
+    total = time.perf_counter() - t0
+    await pub.parar()
+
+    async with httpx.AsyncClient(base_url=base) as c:
+        stats = (await c.get("/_stub/stats")).json()["chamadas"]
+    envios = sum(stats.get(m, 0) for m in ("sendMessage", "sendPhoto", "sendMediaGroup"))
+    rejeitados = stats.get("429", 0) + stats.get("5xx", 0)
+    latencias.sort()
+    return {
+        "envios": envios - rejeitados,
+        "envios_s": (envios - rejeitados) / total,
+        "ofertas_s": len(latencias) / total,
+        "falhas": sum(1 for f in futuros if f.exception()),
+        "p50_ms": _quantil(latencias, 0.50),
+        "p95_ms": _quantil(latencias, 0.95),
+        "p99_ms": _quantil(latencias, 0.99),
+        "max_ms": latencias[-1] * 1000 if latencias else 0.0,
+        "r429": stats.get("429", 0),
+        "r5xx": stats.get("5xx", 0),
+        "total_s": total,
+    }
+
+
+async def _rodar(base: str, args):
+    from utils.http import fechar_clientes
+
+    for modo in args.modos:
+        r = await medir(base, modo, args)
+        print(f"{modo:<11} {r['envios']:>6} {r['envios_s']:>8.1f} {r['ofertas_s']:>9.1f} {r['p50_ms']:>8.0f} "
+              f"{r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {r['max_ms']:>8.0f} {r['r429']:>5} {r['r5xx']:>5} {r['falhas']:>6}")
+    await fechar_clientes()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do publicador contra a Bot API falsa")
+    ap.add_argument("--modos", nargs="*", default=["individual", "digest", "album"])
+    ap.add_argument("--chats", type=int, default=20)
+    ap.add_argument("--ofertas", type=int, default=20, help="ofertas por chat")
+    ap.add_argument("--imagens", type=float, default=0.8, help="fração de ofertas com imagem")
+    ap.add_argument("--janela", type=float, default=0.5, help="PUBLISH_BATCH_WINDOW")
+    ap.add_argument("--lote", type=int, default=10, help="PUBLISH_BATCH_MAX")
+    ap.add_argument("--chat-rate", type=float, default=1.0, help="PUBLISH_CHAT_RATE")
+    ap.add_argument("--global-rate", type=float, default=30.0, help="limite do host no RATE_LIMITS")
+    ap.add_argument("--stub-chat-rps", type=float, default=1.0)
+    ap.add_argument("--stub-global-rps", type=float, default=30.0)
+    ap.add_argument("--latencia", type=float, default=40.0, help="latência do stub em ms")
+    ap.add_argument("--erros", type=float, default=0.0, help="fração de 5xx no stub")
+    args = ap.parse_args()
+
+    os.environ["RATE_LIMITS"] = f"127.0.0.1={args.global_rate}"
+    os.environ["SHARED_STATE"] = ""
+    sys.path.insert(0, RAIZ)
+    logging.disable(logging.WARNING)
+
+    print(f"chats={args.chats} ofertas/chat={args.ofertas} imagens={args.imagens:.0%} janela={args.janela}s "
+          f"lote={args.lote} chat_rate={args.chat_rate}/s global={args.global_rate}/s "
+          f"stub: chat={args.stub_chat_rps}/s global={args.stub_global_rps}/s latência={args.latencia:.0f}ms erros={args.erros:.0%}")
+    print(f"{'modo':<11} {'envios':>6} {'envios/s':>8} {'ofertas/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'máx ms':>8} {'429':>5} {'5xx':>5} {'falhas':>6}")
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "tools", "telegram_stub.py"), "--porta", str(porta),
+         "--chat-rps", str(args.stub_chat_rps), "--global-rps", str(args.stub_global_rps),
+         "--latencia", str(args.latencia)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/_stub/stats", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        asyncio.run(_rodar(base, args))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Assinaturas SigV4 por segundo: algoritmo inline original x SigV4Signer.
+
+    python tools/bench_sigv4.py
+    python tools/bench_sigv4.py --segundos 2 --tamanhos 200 2000 20000
+
+Para cada tamanho de payload mede, com o mesmo instante fixo, o algoritmo
+original (cópia em tests/test_sigv4.py, que também garante que as saídas são
+idênticas), SigV4Signer.sign (com o cronômetro de métricas) e o _sign cru.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _por_segundo(f, segundos: float) -> float:
+    n = 0
+    inicio = time.perf_counter()
+    fim = inicio + segundos
+    while True:
+        for _ in range(200):
+            f()
+        n += 200
+        agora = time.perf_counter()
+        if agora >= fim:
+            return n / (agora - inicio)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Assinaturas SigV4 por segundo")
+    ap.add_argument("--segundos", type=float, default=1.0, help="duração de cada medida")
+    ap.add_argument("--tamanhos", type=int, nargs="*", default=[200, 2000, 20000], help="bytes de payload")
+    args = ap.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    from tests.test_sigv4 import _assinar_original, _signer
+
+    t = time.strptime("20261018T120000Z", "%Y%m%dT%H%M%SZ")
+    signer = _signer("SearchItems", "us-east-1")
+    print(f"{'payload':>8} {'original/s':>11} {'sign/s':>10} {'_sign/s':>10} {'ganho':>6}")
+    for tamanho in args.tamanhos:
+        payload = json.dumps({"Keywords": "x" * max(0, tamanho - 16)})
+        assert signer.sign(payload, t) == _assinar_original(payload, t, "SearchItems", "us-east-1")
+        original = _por_segundo(lambda: _assinar_original(payload, t, "SearchItems", "us-east-1"), args.segundos)
+        novo = _por_segundo(lambda: signer.sign(payload, t), args.segundos)
+        cru = _por_segundo(lambda: signer._sign(payload, t), args.segundos)
+        print(f"{len(payload):>8} {original:>11.0f} {novo:>10.0f} {cru:>10.0f} {novo / original:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Tempo de partida: custo de import e tempo até a primeira resposta.
+
+    python tools/bench_startup.py --rodadas 5
+
+Mede, cada um num processo Python novo (mediana de N rodadas):
+- import de bot, providers.aggregator e de cada provedor;
+- server.py do Popen até o primeiro 200 em /healthz (1 worker);
+- primeira busca de cada provedor contra tools/mock_upstream.py
+  (import preguiçoso + cliente + assinatura + resposta).
+Também lista os módulos mais caros de `python -X importtime -c "import bot"`.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = ["bot", "providers.aggregator", "ml_api", "shopee_api", "providers.shopee_api", "providers.amazon_api"]
+
+PRIMEIRA_BUSCA = """
+import sys, time, asyncio, tempfile, logging
+sys.path[:0] = [{raiz!r}, {tools!r}]
+import bench
+bench._ambiente({base!r}, tempfile.mkdtemp())
+logging.disable(logging.WARNING)
+inicio = time.perf_counter()
+from providers import aggregator
+asyncio.run(aggregator.buscar_ofertas(["eletronicos"], 2, fontes=[{fonte!r}]))
+print(time.perf_counter() - inicio)
+"""
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _tempo_import(modulo: str) -> float:
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def _primeira_resposta() -> float:
+    porta = _porta_livre()
+    env = dict(os.environ, PORT=str(porta), WEB_CONCURRENCY="1", DRAIN_DELAY="0")
+    inicio = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "server.py"], cwd=RAIZ, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{porta}/healthz", timeout=1).status_code == 200:
+                    return time.perf_counter() - inicio
+            except httpx.TransportError:
+                time.sleep(0.005)
+            if proc.poll() is not None:
+                raise RuntimeError("server.py saiu antes de responder")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _primeira_busca(base: str, fonte: str) -> float:
+    codigo = PRIMEIRA_BUSCA.format(raiz=RAIZ, tools=os.path.join(RAIZ, "tools"), base=base, fonte=fonte)
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def _mais_caros(n: int = 10):
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import bot"],
+                           cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+    linhas = []
+    for linha in saida.splitlines()[1:]:
+        proprio, _acumulado, nome = linha.removeprefix("import time:").split("|", 2)
+        linhas.append((int(proprio), nome.strip()))
+    return sorted(linhas, reverse=True)[:n]
+
+
+def _mediana(f, rodadas: int) -> float:
+    return statistics.median(f() for _ in range(rodadas)) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rodadas", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"mediana de {args.rodadas} rodadas (ms)")
+    for modulo in IMPORTS:
+        print(f"  import {modulo:<24} {_mediana(lambda: _tempo_import(modulo), args.rodadas):8.1f}")
+    print(f"  server.py -> 1º /healthz      {_mediana(_primeira_resposta, args.rodadas):8.1f}")
+
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    mock = subprocess.Popen([sys.executable, os.path.join(RAIZ, "tools", "mock_upstream.py"), "--porta", str(porta)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/_mock/stats", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        for fonte in ("MERCADOLIVRE", "SHOPEE", "SHOPEE_OPENAPI", "AMAZON"):
+            ms = _mediana(lambda: _primeira_busca(base, fonte), args.rodadas)
+            print(f"  1ª busca {fonte:<22} {ms:8.1f}")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    print("módulos mais caros em `import bot` (tempo próprio, µs):")
+    for proprio, nome in _mais_caros():
+        print(f"  {proprio:>8}  {nome}")
+
+
+if __name__ == "__main__":
+    main()
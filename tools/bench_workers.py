@@ -0,0 +1,113 @@
+"""
+Benchmark de throughput do server.py por número de workers.
+
+    python tools/bench_workers.py --workers 1 2 4 --segundos 10 --conexoes 64
+
+Para cada valor sobe o servidor numa porta livre (WEB_CONCURRENCY=n),
+espera o /readyz, martela ROTA com N conexões keep-alive por alguns
+segundos e imprime req/s e latências p50/p99. No fim manda SIGTERM e
+confere que o servidor drenou e saiu.
+"""
+import os
+import sys
+import time
+import socket
+import signal
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _esperar_pronto(base: str, prazo: float = 30):
+    fim = time.monotonic() + prazo
+    async with httpx.AsyncClient(base_url=base) as c:
+        while time.monotonic() < fim:
+            try:
+                if (await c.get("/readyz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("servidor não ficou pronto")
+
+
+async def _carga(base: str, rota: str, conexoes: int, segundos: float):
+    latencias = []
+    erros = 0
+    fim = time.monotonic() + segundos
+    limites = httpx.Limits(max_connections=conexoes, max_keepalive_connections=conexoes)
+
+    async with httpx.AsyncClient(base_url=base, limits=limites, timeout=10) as c:
+        async def cliente():
+            nonlocal erros
+            while time.monotonic() < fim:
+                inicio = time.perf_counter()
+                try:
+                    r = await c.get(rota)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    erros += 1
+                    continue
+                latencias.append(time.perf_counter() - inicio)
+
+        await asyncio.gather(*(cliente() for _ in range(conexoes)))
+
+    latencias.sort()
+    n = len(latencias)
+    return {
+        "rps": n / segundos,
+        "p50": latencias[n // 2] * 1000 if n else 0,
+        "p99": latencias[int(n * 0.99)] * 1000 if n else 0,
+        "erros": erros,
+    }
+
+
+def rodar(workers: int, rota: str, conexoes: int, segundos: float) -> dict:
+    porta = _porta_livre()
+    env = dict(os.environ, PORT=str(porta), WEB_CONCURRENCY=str(workers), DRAIN_DELAY="0")
+    proc = subprocess.Popen([sys.executable, "server.py"], cwd=RAIZ, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{porta}"
+    try:
+        asyncio.run(_esperar_pronto(base))
+        resultado = asyncio.run(_carga(base, rota, conexoes, segundos))
+    finally:
+        inicio = time.monotonic()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+        resultado_saida = (proc.returncode, time.monotonic() - inicio)
+    resultado["saida"] = resultado_saida
+    return resultado
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--rota", default="/")
+    ap.add_argument("--conexoes", type=int, default=64)
+    ap.add_argument("--segundos", type=float, default=10)
+    args = ap.parse_args()
+
+    print(f"rota={args.rota} conexões={args.conexoes} duração={args.segundos:.0f}s (cpus={os.cpu_count()})")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6} {'saída':>10}")
+    base = None
+    for n in args.workers:
+        r = rodar(n, args.rota, args.conexoes, args.segundos)
+        base = base or r["rps"]
+        codigo, duracao = r["saida"]
+        print(f"{n:>7} {r['rps']:>9.0f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['erros']:>6} "
+              f"{codigo:>3} {duracao:>5.1f}s  ({r['rps'] / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
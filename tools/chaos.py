@@ -0,0 +1,186 @@
+"""
+Caos contra o upstream falso: exercita o circuit breaker e os hedged GETs de
+utils/http.py trocando latência e erros do tools/mock_upstream.py em fases.
+
+    python tools/chaos.py
+    python tools/chaos.py --segundos 5 --conexoes 16 --prazo 0.5
+
+Cada fase roda --segundos com --conexoes clientes fazendo a busca do ML
+(GET /sites/MLB/search com stream=True e hedge=True, como ml_api faz), cada
+chamada sob um prazo de --prazo s (como o asyncio.wait_for do agregador):
+  normal      latência base
+  cauda       10% das respostas 20x mais lentas (os hedges cortam o p99)
+  queda       100% de 5xx (o circuito abre e as chamadas falham rápido)
+  travado     toda resposta passa do prazo (sondas do meio-aberto canceladas)
+  recuperado  latência base de novo (o circuito precisa voltar a fechar)
+Mostra, por fase: chamadas, ok, 5xx, prazos estourados, recusas do circuito,
+hedges, p50/p99 das respostas ok, estado final do circuito e conexões no
+pool (abertas/ocupadas depois de as requisições em voo terminarem). Sai com código 1 se o circuito não fechar ou nada der certo na última
+fase, ou se sobrarem conexões presas no pool.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _quantil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000 if ordenadas else 0.0
+
+
+def _fases(latencia: float, prazo: float):
+    base = {"latencia": latencia, "jitter": latencia / 4, "erros": 0.0, "lentas": 0.0, "lenta": 0.0}
+    return [
+        ("normal", base),
+        ("cauda", {**base, "lentas": 0.1, "lenta": latencia * 20}),
+        ("queda", {**base, "erros": 1.0}),
+        ("travado", {**base, "latencia": prazo * 1000 * 3}),
+        ("recuperado", base),
+    ]
+
+
+async def _fase(base: str, config: dict, args) -> dict:
+    from utils import breaker, metrics
+    from utils.http import enviar
+
+    async with httpx.AsyncClient(base_url=base) as c:
+        await c.post("/_mock/config", json=config)
+
+    host = "127.0.0.1"
+    hedges_antes = metrics.contador("upstream_hedges_total", host=host)
+    r = {"chamadas": 0, "ok": 0, "5xx": 0, "prazo": 0, "circuito": 0, "erro": 0}
+    latencias = []
+    fim = time.monotonic() + args.segundos
+
+    async def chamada(i: int):
+        resp = await enviar(base, "GET", "/sites/MLB/search", params={"q": f"caos {i}", "limit": 5},
+                            stream=True, hedge=True)
+        try:
+            await resp.aread()
+            return resp.status_code
+        finally:
+            await resp.aclose()
+
+    async def cliente(n: int):
+        i = 0
+        while time.monotonic() < fim:
+            i += 1
+            r["chamadas"] += 1
+            t = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(chamada(n * 1_000_000 + i), args.prazo)
+            except asyncio.TimeoutError:
+                r["prazo"] += 1
+                continue
+            except breaker.CircuitoAberto:
+                r["circuito"] += 1
+                await asyncio.sleep(0.01)  # falha rápida; não gira em falso
+                continue
+            except httpx.HTTPError:
+                r["erro"] += 1
+                continue
+            if status == 200:
+                r["ok"] += 1
+                latencias.append(time.perf_counter() - t)
+            elif status >= 500:
+                r["5xx"] += 1
+
+    await asyncio.gather(*(cliente(n) for n in range(args.conexoes)))
+    latencias.sort()
+    r["hedges"] = metrics.contador("upstream_hedges_total", host=host) - hedges_antes
+    r["p50_ms"] = _quantil(latencias, 0.50)
+    r["p99_ms"] = _quantil(latencias, 0.99)
+    r["circuito_estado"] = breaker.disjuntor(host).estado
+    return r
+
+
+def _conexoes(base: str):
+    from utils import http
+
+    # pools do httpcore (um por shard): conexões abertas e quantas estão ocupadas
+    conexoes = [c for client in http._clients.get(base, []) for c in client._transport._pool.connections]
+    return len(conexoes), sum(1 for c in conexoes if not c.is_idle())
+
+
+async def _rodar(base: str, args) -> bool:
+    from utils.http import fechar_clientes
+
+    print(f"{'fase':<11} {'chamadas':>8} {'ok':>6} {'5xx':>5} {'prazo':>6} {'circuito':>8} {'hedges':>6} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'estado':>11} {'conexões':>9}")
+    saudavel = True
+    for nome, config in _fases(args.latencia, args.prazo):
+        r = await _fase(base, config, args)
+        # hedges perdedores ainda em voo terminam sozinhos; o que continuar
+        # ocupado depois da resposta mais lenta possível ficou preso no pool
+        limite = time.monotonic() + args.prazo * 3 + 1
+        while True:
+            abertas, ocupadas = _conexoes(base)
+            if not ocupadas or time.monotonic() > limite:
+                break
+            await asyncio.sleep(0.05)
+        print(f"{nome:<11} {r['chamadas']:>8} {r['ok']:>6} {r['5xx']:>5} {r['prazo']:>6} {r['circuito']:>8} "
+              f"{r['hedges']:>6} {r['p50_ms']:>7.0f} {r['p99_ms']:>7.0f} {r['circuito_estado']:>11} "
+              f"{abertas:>4}/{ocupadas:<4}")
+        if ocupadas:
+            saudavel = False
+    if r["ok"] == 0 or r["circuito_estado"] != "fechado":
+        saudavel = False
+    await fechar_clientes()
+    return saudavel
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Caos no upstream falso: circuit breaker e hedged GETs")
+    ap.add_argument("--segundos", type=float, default=4.0, help="duração de cada fase")
+    ap.add_argument("--conexoes", type=int, default=8)
+    ap.add_argument("--latencia", type=float, default=20.0, help="latência base do mock em ms")
+    ap.add_argument("--prazo", type=float, default=0.5, help="prazo de cada chamada em s")
+    ap.add_argument("--aberto", type=float, default=1.0, help="BREAKER_OPEN_SECONDS")
+    args = ap.parse_args()
+
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    os.environ.update({
+        "HEDGE_REQUESTS": "1",
+        "BREAKER_OPEN_SECONDS": str(args.aberto),
+        "RATE_LIMITS": "127.0.0.1=100000",
+        "SHARED_STATE": "",
+    })
+    sys.path.insert(0, RAIZ)
+    logging.disable(logging.WARNING)
+
+    mock = subprocess.Popen([sys.executable, os.path.join(RAIZ, "tools", "mock_upstream.py"), "--porta", str(porta)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/_mock/stats", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        print(f"fases de {args.segundos:.0f}s, {args.conexoes} clientes, prazo {args.prazo}s, "
+              f"circuito aberto por {args.aberto}s, latência base {args.latencia:.0f}ms")
+        saudavel = asyncio.run(_rodar(base, args))
+    finally:
+        mock.terminate()
+        mock.wait()
+    print("✅ circuito recuperado e pool limpo" if saudavel else "❌ circuito preso ou conexões vazando")
+    sys.exit(0 if saudavel else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Upstream falso para testes e benchmarks sem credenciais: responde às rotas
+do Mercado Livre, da Shopee (afiliados e OpenAPI v2) e da PA-API 5 a partir
+das respostas gravadas em tools/fixtures/, expandidas até o tamanho pedido
+(ids e preços variam de forma determinística).
+
+    python tools/mock_upstream.py --porta 9100 --latencia 30 --jitter 10 --erros 0.02 --rps 50
+
+e aponte o bot para ele:
+
+    ML_API_BASE=http://127.0.0.1:9100 SHOPEE_PARTNER_BASE=http://127.0.0.1:9100 \\
+    SHOPEE_AFFILIATE_BASE=http://127.0.0.1:9100 AMAZON_BASE=http://127.0.0.1:9100 \\
+    RATE_LIMITS=127.0.0.1=1000 python bot.py
+
+Latência (ms, com jitter e uma fração --lentas de respostas com --lenta ms
+a mais), taxa de erros 5xx e limite de req/s (acima dele responde 429 com
+Retry-After) valem para todas as rotas e podem ser trocados
+em execução com POST /_mock/config. GET /_mock/stats conta as chamadas.
+"""
+import os
+import copy
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+from quart import Quart, request, jsonify
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SHOPEE_TOTAL = 150  # itens na "loja" da OpenAPI v2
+
+
+def _fixture(nome: str) -> dict:
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _variar(preco, i: int):
+    # ±10% determinístico por posição
+    if preco is None:
+        return None
+    fator = 1 + ((i * 37) % 21 - 10) / 100
+    return round(preco * fator, 2) if isinstance(preco, float) else int(preco * fator)
+
+
+def criar_app(latencia: float = 0.0, jitter: float = 0.0, erros: float = 0.0,
+              rps: float = 0.0, seed: int = 42, lentas: float = 0.0, lenta: float = 0.0) -> Quart:
+    app = Quart(__name__)
+    config = {"latencia": latencia, "jitter": jitter, "erros": erros, "rps": rps, "lentas": lentas, "lenta": lenta}
+    sorteio = random.Random(seed)
+    chamadas = Counter()
+    janela = {"inicio": 0, "usados": 0}
+
+    ml = _fixture("ml_search.json")
+    oauth = _fixture("ml_oauth_token.json")
+    afiliados = _fixture("shopee_affiliate_product_offer.json")
+    v2_info = _fixture("shopee_v2_get_item_base_info.json")
+    paapi = _fixture("paapi_searchitems.json")
+
+    @app.before_request
+    async def _simular():
+        if request.path.startswith("/_mock/"):
+            return None
+        chamadas[request.path] += 1
+        if config["rps"]:
+            agora = int(time.monotonic())
+            if janela["inicio"] != agora:
+                janela["inicio"], janela["usados"] = agora, 0
+            janela["usados"] += 1
+            if janela["usados"] > config["rps"]:
+                chamadas["429"] += 1
+                return jsonify({"message": "too many requests"}), 429, {"Retry-After": "1"}
+        atraso = config["latencia"] + sorteio.uniform(-config["jitter"], config["jitter"])
+        if config["lentas"] and sorteio.random() < config["lentas"]:
+            chamadas["lentas"] += 1
+            atraso += config["lenta"]
+        if atraso > 0:
+            await asyncio.sleep(atraso / 1000)
+        if config["erros"] and sorteio.random() < config["erros"]:
+            chamadas["5xx"] += 1
+            return jsonify({"message": "mock upstream error"}), 503
+        return None
+
+    # ---------- Mercado Livre ----------
+    def _ml_item(i: int) -> dict:
+        item = copy.deepcopy(ml["results"][i % len(ml["results"])])
+        item["id"] = f"MLB{9_000_000_000 + i}"
+        item["permalink"] = f"{item['permalink'].split('?')[0]}?mock={item['id']}"
+        item["price"] = _variar(item["price"], i)
+        return item
+
+    @app.route("/sites/<site>/search")
+    async def ml_search(site):
+        limit = min(int(request.args.get("limit", 50)), 50)
+        offset = int(request.args.get("offset", 0))
+        corpo = {k: v for k, v in ml.items() if k != "results"}
+        corpo["query"] = request.args.get("q", "")
+        corpo["paging"] = {**ml["paging"], "offset": offset, "limit": limit}
+        corpo["results"] = [_ml_item(offset + i) for i in range(limit)]
+        return jsonify(corpo)
+
+    @app.route("/items")
+    async def ml_multiget():
+        ids = [i for i in request.args.get("ids", "").split(",") if i]
+        corpo = []
+        for item_id in ids[:20]:
+            try:
+                i = int(item_id.removeprefix("MLB")) - 9_000_000_000
+            except ValueError:
+                corpo.append({"code": 404, "body": {"message": "not_found", "id": item_id}})
+                continue
+            corpo.append({"code": 200, "body": _ml_item(i)})
+        return jsonify(corpo)
+
+    @app.route("/oauth/token", methods=["POST"])
+    async def ml_oauth():
+        n = chamadas["/oauth/token"]
+        return jsonify({**oauth, "access_token": f"{oauth['access_token']}-{n}", "refresh_token": f"{oauth['refresh_token']}-{n}"})
+
+    # ---------- Shopee afiliados ----------
+    @app.route("/api/v1/offer/product_offer", methods=["POST"])
+    async def shopee_afiliados():
+        dados = await request.get_json(silent=True) or {}
+        tamanho = int(dados.get("page_size", 10))
+        pagina = int(dados.get("page", 1))
+        modelos = afiliados["data"]["productOfferV2"]["nodes"]
+        nos = []
+        for i in range((pagina - 1) * tamanho, pagina * tamanho):
+            no = copy.deepcopy(modelos[i % len(modelos)])
+            no["itemId"] = 22_000_000_000 + i
+            no["priceMin"] = f"{_variar(float(no['priceMin']), i):.2f}"
+            nos.append(no)
+        return jsonify({"data": {"productOfferV2": {
+            "nodes": nos, "pageInfo": {"page": pagina, "limit": tamanho, "hasNextPage": True},
+        }}})
+
+    # ---------- Shopee OpenAPI v2 ----------
+    @app.route("/api/v2/product/get_item_list", methods=["GET", "POST"])
+    async def shopee_item_list():
+        dados = await request.get_json(silent=True) or {}
+        tamanho = int(request.args.get("page_size") or dados.get("page_size") or 50)
+        offset = int(request.args.get("offset") or 0)
+        if "page_no" in dados:
+            offset = (int(dados["page_no"]) - 1) * tamanho
+        fim = min(offset + tamanho, SHOPEE_TOTAL)
+        itens = [{"item_id": 800_000 + i, "item_status": "NORMAL", "update_time": 1_760_000_000}
+                 for i in range(offset, fim)]
+        resposta = {"item": itens, "total_count": SHOPEE_TOTAL, "has_next_page": fim < SHOPEE_TOTAL, "next_offset": fim}
+        # providers/shopee_api.py lê item_list
+        resposta["item_list"] = [{**it, "item_name": f"Produto mock {it['item_id']}"} for it in itens]
+        return jsonify({"error": "", "message": "", "request_id": "mock", "response": resposta})
+
+    @app.route("/api/v2/product/get_item_base_info")
+    async def shopee_item_info():
+        ids = [int(i) for i in request.args.get("item_id_list", "").split(",") if i]
+        modelos = v2_info["response"]["item_list"]
+        itens = []
+        for item_id in ids[:50]:
+            i = item_id - 800_000
+            item = copy.deepcopy(modelos[i % len(modelos)])
+            item["item_id"] = item_id
+            for info in item.get("price_info") or []:
+                info["current_price"] = _variar(info.get("current_price"), i)
+            if "price" in item:
+                item["price"] = _variar(item["price"], i)
+            itens.append(item)
+        return jsonify({"error": "", "message": "", "request_id": "mock", "response": {"item_list": itens}})
+
+    # ---------- Amazon PA-API 5 ----------
+    def _paapi_item(i: int, asin: str = None) -> dict:
+        modelos = paapi["SearchResult"]["Items"]
+        item = copy.deepcopy(modelos[i % len(modelos)])
+        item["ASIN"] = asin or f"B0MOCK{i:04d}"
+        item["DetailPageURL"] = f"https://www.amazon.com.br/dp/{item['ASIN']}?tag=mock-20"
+        preco = item["Offers"]["Listings"][0]["Price"]
+        preco["Amount"] = _variar(preco["Amount"], i)
+        return item
+
+    @app.route("/paapi5/searchitems", methods=["POST"])
+    async def paapi_search():
+        dados = json.loads(await request.get_data(as_text=True) or "{}")
+        n = min(int(dados.get("ItemCount", 10)), 10)
+        base = sum(map(ord, dados.get("Keywords", ""))) % 1000
+        itens = [_paapi_item(base + i) for i in range(n)]
+        return jsonify({"SearchResult": {"Items": itens, "TotalResultCount": len(itens)}})
+
+    @app.route("/paapi5/getitems", methods=["POST"])
+    async def paapi_getitems():
+        dados = json.loads(await request.get_data(as_text=True) or "{}")
+        asins = dados.get("ItemIds", [])[:10]
+        return jsonify({"ItemsResult": {"Items": [_paapi_item(sum(map(ord, a)), a) for a in asins]}})
+
+    # ---------- controle ----------
+    @app.route("/_mock/stats")
+    async def stats():
+        return jsonify(dict(chamadas))
+
+    @app.route("/_mock/config", methods=["GET", "POST"])
+    async def configurar():
+        if request.method == "POST":
+            dados = await request.get_json(silent=True) or {}
+            config.update({k: float(v) for k, v in dados.items() if k in config})
+            chamadas.clear()
+        return jsonify(config)
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Upstream falso (ML, Shopee, PA-API) a partir de fixtures")
+    ap.add_argument("--porta", type=int, default=int(os.getenv("MOCK_PORT", 9100)))
+    ap.add_argument("--latencia", type=float, default=float(os.getenv("MOCK_LATENCY_MS", 0)), help="ms")
+    ap.add_argument("--jitter", type=float, default=float(os.getenv("MOCK_JITTER_MS", 0)), help="ms")
+    ap.add_argument("--erros", type=float, default=float(os.getenv("MOCK_ERROR_RATE", 0)), help="fração de 5xx")
+    ap.add_argument("--rps", type=float, default=float(os.getenv("MOCK_RPS", 0)), help="acima disso, 429")
+    ap.add_argument("--lentas", type=float, default=0.0, help="fração de respostas na cauda lenta")
+    ap.add_argument("--lenta", type=float, default=0.0, help="ms extras das respostas lentas")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{args.porta}"]
+    config.errorlog = None
+    app = criar_app(args.latencia, args.jitter, args.erros, args.rps, args.seed, args.lentas, args.lenta)
+    asyncio.run(serve(app, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Servidor RESP mínimo que substitui o Redis em testes e benchmarks do
+estado compartilhado (SHARED_STATE=redis://127.0.0.1:6390/0). Implementa
+só o que utils/shared.py usa: GET, SET [NX] [PX|EX], DEL, INCR[BY], PEXPIRE,
+além de PING/SELECT/CLIENT/HELLO que o cliente manda ao conectar.
+
+    python tools/redis_standin.py --porta 6390
+"""
+import time
+import asyncio
+import argparse
+
+_dados = {}  # chave -> (valor, expira_em ou None)
+
+
+def _vivo(chave):
+    item = _dados.get(chave)
+    if item is None:
+        return None
+    valor, expira_em = item
+    if expira_em is not None and time.monotonic() >= expira_em:
+        del _dados[chave]
+        return None
+    return valor
+
+
+def _bulk(valor) -> bytes:
+    if valor is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+
+def executar(args: list) -> bytes:
+    cmd = args[0].upper()
+    if cmd == b"PING":
+        return b"+PONG\r\n"
+    if cmd in (b"SELECT", b"CLIENT"):
+        return b"+OK\r\n"
+    if cmd == b"HELLO":
+        # só RESP2: mesma resposta do Redis para HELLO 2
+        if len(args) > 1 and args[1] != b"2":
+            return b"-NOPROTO unsupported protocol version\r\n"
+        campos = [b"server", b"redis", b"version", b"7.0.0", b"proto", b"2"]
+        return b"*%d\r\n" % len(campos) + b"".join(_bulk(c) for c in campos)
+    if cmd == b"GET":
+        return _bulk(_vivo(args[1]))
+    if cmd == b"SET":
+        chave, valor = args[1], args[2]
+        opcoes = [a.upper() for a in args[3:]]
+        expira_em = None
+        if b"PX" in opcoes:
+            expira_em = time.monotonic() + int(args[3 + opcoes.index(b"PX") + 1]) / 1000
+        elif b"EX" in opcoes:
+            expira_em = time.monotonic() + int(args[3 + opcoes.index(b"EX") + 1])
+        if b"NX" in opcoes and _vivo(chave) is not None:
+            return b"$-1\r\n"
+        _dados[chave] = (valor, expira_em)
+        return b"+OK\r\n"
+    if cmd == b"DEL":
+        n = sum(1 for k in args[1:] if _vivo(k) is not None and _dados.pop(k, None))
+        return b":%d\r\n" % n
+    if cmd in (b"INCR", b"INCRBY"):
+        chave = args[1]
+        atual = int(_vivo(chave) or 0) + (int(args[2]) if cmd == b"INCRBY" else 1)
+        expira_em = _dados.get(chave, (None, None))[1]
+        _dados[chave] = (str(atual).encode(), expira_em)
+        return b":%d\r\n" % atual
+    if cmd == b"PEXPIRE":
+        if _vivo(args[1]) is None:
+            return b":0\r\n"
+        _dados[args[1]] = (_dados[args[1]][0], time.monotonic() + int(args[2]) / 1000)
+        return b":1\r\n"
+    return b"-ERR unknown command '%s'\r\n" % cmd
+
+
+async def _ler_comando(reader) -> list:
+    linha = await reader.readline()
+    if not linha:
+        return None
+    if not linha.startswith(b"*"):
+        return linha.split()  # inline (ex.: redis-cli/telnet)
+    args = []
+    for _ in range(int(linha[1:])):
+        tamanho = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(tamanho + 2))[:-2])
+    return args
+
+
+async def _conexao(reader, writer):
+    try:
+        while True:
+            args = await _ler_comando(reader)
+            if args is None:
+                break
+            if args:
+                writer.write(executar(args))
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def iniciar(host: str = "127.0.0.1", porta: int = 6390):
+    return await asyncio.start_server(_conexao, host, porta)
+
+
+async def _main(porta: int):
+    servidor = await iniciar(porta=porta)
+    print(f"stand-in Redis em 127.0.0.1:{porta}")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stand-in do Redis para testes do estado compartilhado")
+    ap.add_argument("--porta", type=int, default=6390)
+    asyncio.run(_main(ap.parse_args().porta))
@@ -0,0 +1,152 @@
+"""
+Bot API do Telegram falsa para testar utils/publisher.py sem token de verdade.
+
+    python tools/telegram_stub.py --porta 9200 --chat-rps 1 --global-rps 30 --latencia 40
+
+e aponte o publicador para ela:
+
+    TELEGRAM_API_BASE=http://127.0.0.1:9200 TELEGRAM_TOKEN=123:stub RATE_LIMITS=127.0.0.1=30
+
+Responde sendMessage, sendPhoto e sendMediaGroup como a API real
+({"ok": true, "result": ...}). Cada chat tem um token bucket (--chat-rps,
+rajada de --rajada) e o bot outro (--global-rps, rajada de 1 s); acima deles a
+resposta é 429 com "parameters": {"retry_after": N}, como o Telegram faz.
+--erros sorteia 5xx. GET /_stub/stats conta envios, 429, 5xx e mensagens
+por chat; POST /_stub/config troca os parâmetros e zera as contagens.
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+from quart import Quart, request, jsonify
+
+
+def criar_app(chat_rps: float = 1.0, rajada: float = 3.0, global_rps: float = 30.0,
+              latencia: float = 0.0, erros: float = 0.0, seed: int = 42) -> Quart:
+    app = Quart(__name__)
+    config = {"chat_rps": chat_rps, "rajada": rajada, "global_rps": global_rps, "latencia": latencia, "erros": erros}
+    sorteio = random.Random(seed)
+    chamadas = Counter()
+    por_chat = Counter()
+    tokens = {}  # chat (ou "*" para o bot) -> (tokens, último)
+    proximo_id = iter(range(1, 1 << 62))
+
+    def _saldo(chave: str, rate: float, rajada: float, agora: float) -> float:
+        saldo, ultimo = tokens.get(chave, (rajada, agora))
+        return min(rajada, saldo + (agora - ultimo) * rate)
+
+    def _limitado(chat: str):
+        """Segundos até o chat (ou o bot) poder mandar de novo; 0 se pode agora."""
+        agora = time.monotonic()
+        limites = [(c, r, b) for c, r, b in (
+            ("*", config["global_rps"], config["global_rps"]),
+            (chat, config["chat_rps"], config["rajada"]),
+        ) if r]
+        saldos = [_saldo(c, r, b, agora) for c, r, b in limites]
+        for (c, r, _), saldo in zip(limites, saldos):
+            if saldo < 1:
+                tokens[c] = (saldo, agora)
+                return max(1, round((1 - saldo) / r))
+        for (c, _, _), saldo in zip(limites, saldos):
+            tokens[c] = (saldo - 1, agora)
+        return 0
+
+    def _mensagem(chat: str, **extra) -> dict:
+        return {"message_id": next(proximo_id), "date": int(time.time()), "chat": {"id": chat}, **extra}
+
+    async def _processar(metodo: str):
+        """Aplica limites, latência e erros; devolve (resposta de erro ou None, corpo, chat)."""
+        dados = await request.get_json(silent=True) or dict(await request.form)
+        chat = str(dados.get("chat_id", ""))
+        if not chat:
+            return (jsonify({"ok": False, "error_code": 400, "description": "Bad Request: chat_id is empty"}), 400), None, None
+        chamadas[metodo] += 1
+        espera = _limitado(chat)
+        if espera:
+            chamadas["429"] += 1
+            return (jsonify({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {espera}",
+                "parameters": {"retry_after": espera},
+            }), 429), None, None
+        atraso = config["latencia"]
+        if atraso > 0:
+            await asyncio.sleep(atraso / 1000)
+        if config["erros"] and sorteio.random() < config["erros"]:
+            chamadas["5xx"] += 1
+            return (jsonify({"ok": False, "error_code": 502, "description": "Bad Gateway"}), 502), None, None
+        return None, dados, chat
+
+    @app.route("/bot<token>/sendMessage", methods=["POST"])
+    async def send_message(token):
+        erro, dados, chat = await _processar("sendMessage")
+        if erro:
+            return erro
+        por_chat[chat] += 1
+        return jsonify({"ok": True, "result": _mensagem(chat, text=dados.get("text", ""))})
+
+    @app.route("/bot<token>/sendPhoto", methods=["POST"])
+    async def send_photo(token):
+        erro, dados, chat = await _processar("sendPhoto")
+        if erro:
+            return erro
+        por_chat[chat] += 1
+        return jsonify({"ok": True, "result": _mensagem(chat, caption=dados.get("caption", ""))})
+
+    @app.route("/bot<token>/sendMediaGroup", methods=["POST"])
+    async def send_media_group(token):
+        erro, dados, chat = await _processar("sendMediaGroup")
+        if erro:
+            return erro
+        media = dados.get("media") or []
+        if not 2 <= len(media) <= 10:
+            return jsonify({"ok": False, "error_code": 400, "description": "Bad Request: wrong number of media"}), 400
+        por_chat[chat] += 1
+        grupo = str(next(proximo_id))
+        return jsonify({"ok": True, "result": [
+            _mensagem(chat, media_group_id=grupo, caption=m.get("caption", "")) for m in media
+        ]})
+
+    @app.route("/_stub/stats")
+    async def stats():
+        return jsonify({"chamadas": dict(chamadas), "por_chat": dict(por_chat)})
+
+    @app.route("/_stub/config", methods=["GET", "POST"])
+    async def configurar():
+        if request.method == "POST":
+            dados = await request.get_json(silent=True) or {}
+            config.update({k: float(v) for k, v in dados.items() if k in config})
+            chamadas.clear()
+            por_chat.clear()
+            tokens.clear()
+        return jsonify(config)
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bot API do Telegram falsa (sendMessage, sendPhoto, sendMediaGroup)")
+    ap.add_argument("--porta", type=int, default=int(os.getenv("STUB_PORT", 9200)))
+    ap.add_argument("--chat-rps", type=float, default=1.0, help="mensagens/s por chat (0 = sem limite)")
+    ap.add_argument("--rajada", type=float, default=3.0, help="rajada permitida por chat")
+    ap.add_argument("--global-rps", type=float, default=30.0, help="mensagens/s do bot (0 = sem limite)")
+    ap.add_argument("--latencia", type=float, default=0.0, help="ms")
+    ap.add_argument("--erros", type=float, default=0.0, help="fração de 5xx")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{args.porta}"]
+    config.errorlog = None
+    app = criar_app(args.chat_rps, args.rajada, args.global_rps, args.latencia, args.erros, args.seed)
+    asyncio.run(serve(app, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import time
+
+FALHAS_LIMITE = int(os.getenv("BREAKER_FAILURES", "5"))
+TEMPO_ABERTO = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAberto(Exception):
+    """O upstream está com o circuito aberto: falha rápido sem chamar."""
+
+    def __init__(self, host: str):
+        super().__init__(f"circuito aberto para {host}")
+        self.host = host
+
+
+class CircuitBreaker:
+    """
+    Abre depois de FALHAS_LIMITE falhas seguidas (erro de transporte ou 5xx).
+    Aberto: recusa tudo por TEMPO_ABERTO segundos. Depois passa a meio-aberto
+    e deixa uma única requisição de sonda passar; se ela funcionar, fecha.
+    """
+
+    def __init__(self, falhas_limite: int = FALHAS_LIMITE, tempo_aberto: float = TEMPO_ABERTO):
+        self.falhas_limite = falhas_limite
+        self.tempo_aberto = tempo_aberto
+        self.estado = FECHADO
+        self.falhas = 0
+        self._aberto_em = 0.0
+        self._sondando = False
+
+    def permitir(self) -> bool:
+        if self.estado == FECHADO:
+            return True
+        if self.estado == ABERTO:
+            if time.monotonic() - self._aberto_em < self.tempo_aberto:
+                return False
+            self.estado = MEIO_ABERTO
+            self._sondando = False
+        # meio-aberto: uma sonda por vez
+        if self._sondando:
+            return False
+        self._sondando = True
+        return True
+
+    def sucesso(self):
+        self.estado = FECHADO
+        self.falhas = 0
+        self._sondando = False
+
+    def liberar(self):
+        """A sonda saiu sem resultado (cancelada): libera a vaga sem mudar o estado."""
+        self._sondando = False
+
+    def falha(self):
+        self.falhas += 1
+        self._sondando = False
+        if self.estado == MEIO_ABERTO or self.falhas >= self.falhas_limite:
+            self.estado = ABERTO
+            self._aberto_em = time.monotonic()
+
+
+_disjuntores = {}
+
+
+def disjuntor(host: str) -> CircuitBreaker:
+    d = _disjuntores.get(host)
+    if d is None:
+        d = _disjuntores[host] = CircuitBreaker()
+    return d
+
+
+def estados() -> dict:
+    return {host: d.estado for host, d in _disjuntores.items()}
@@ -0,0 +1,207 @@
+import json
+import time
+import asyncio
+from collections import OrderedDict
+
+
+# estados devolvidos por get_swr (vão no cabeçalho X-Cache)
+HIT = "HIT"
+MISS = "MISS"
+STALE = "STALE"
+STALE_ERROR = "STALE-ERROR"
+
+# com backend compartilhado: quanto tempo um worker espera o outro buscar a mesma chave
+LEASE = 10.0
+
+
+class TTLCache:
+    """
+    Cache em memória com limite de tamanho (LRU), TTL por plataforma e
+    coalescência de requisições: chamadas simultâneas para a mesma chave
+    compartilham um único fetch no upstream.
+
+    Com `swr` > 0, uma entrada vencida há menos de `swr` segundos é servida
+    na hora e revalidada em segundo plano (stale-while-revalidate). Com
+    `grace` > 0, se o upstream falhar, a última resposta boa é servida por
+    até `grace` segundos depois de vencer (serve-stale-on-error).
+
+    Com `backend` (utils.shared) as respostas também ficam no estado
+    compartilhado e a busca de uma chave é reservada por um único worker;
+    os outros esperam o resultado em vez de ir ao upstream. Os valores
+    precisam ser serializáveis em JSON (tuplas voltam como listas).
+    """
+
+    def __init__(self, max_itens: int = 512, ttls: dict = None, ttl_padrao: float = 60.0,
+                 swr: float = 0.0, grace: float = 0.0, backend=None):
+        self.max_itens = max_itens
+        self.ttls = ttls or {}
+        self.ttl_padrao = ttl_padrao
+        self.swr = swr
+        self.grace = grace
+        self.backend = backend
+        self._dados = OrderedDict()  # chave -> (guardado_em, valor)
+        self._em_voo = {}  # chave -> asyncio.Task da busca
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.stale_error = 0
+
+    def _ttl(self, chave) -> float:
+        return self.ttls.get(chave[0], self.ttl_padrao)
+
+    def _entrada(self, chave):
+        """Devolve (idade, valor) enquanto a entrada puder ser usada (fresca ou stale)."""
+        entrada = self._dados.get(chave)
+        if entrada is None:
+            return None
+        guardado_em, valor = entrada
+        idade = time.monotonic() - guardado_em
+        if idade > self._ttl(chave) + max(self.swr, self.grace):
+            del self._dados[chave]
+            return None
+        self._dados.move_to_end(chave)
+        return idade, valor
+
+    def get(self, chave):
+        entrada = self._entrada(chave)
+        if entrada is None or entrada[0] > self._ttl(chave):
+            return None
+        return entrada[1]
+
+    def set(self, chave, valor):
+        self._guardar(chave, time.monotonic(), valor)
+
+    def _guardar(self, chave, guardado_em: float, valor):
+        self._dados[chave] = (guardado_em, valor)
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_itens:
+            self._dados.popitem(last=False)
+
+    def _vida(self, chave) -> float:
+        return self._ttl(chave) + max(self.swr, self.grace)
+
+    async def _do_backend(self, chave, depois_de: float = 0.0):
+        """Copia para a memória a entrada compartilhada guardada depois de `depois_de` (epoch)."""
+        remoto = await self.backend.get(json.dumps(chave))
+        if remoto is None or remoto[0] <= depois_de:
+            return None
+        guardado_em, valor = remoto
+        local = self._dados.get(chave)
+        guardado_local = time.monotonic() - (time.time() - guardado_em)
+        if local is None or local[0] < guardado_local:
+            self._guardar(chave, guardado_local, valor)
+        return valor
+
+    async def _fetch_compartilhado(self, chave, fetch, cacheavel):
+        """Só um worker busca a chave; os outros aguardam o valor no backend."""
+        texto = json.dumps(chave)
+        inicio = time.time()
+        reservado = await self.backend.lease(texto, LEASE)
+        prazo = time.monotonic() + LEASE
+        while not reservado and time.monotonic() < prazo:
+            await asyncio.sleep(0.05)
+            valor = await self._do_backend(chave, depois_de=inicio - self._ttl(chave))
+            if valor is not None:
+                return valor
+            # quem tinha a reserva desistiu (erro/resposta não cacheável)
+            reservado = await self.backend.lease(texto, LEASE)
+        try:
+            valor = await fetch()
+            if cacheavel(valor):
+                await self.backend.set(texto, valor, self._vida(chave))
+            return valor
+        finally:
+            if reservado:
+                await self.backend.liberar(texto)
+
+    async def _executar(self, chave, fetch, cacheavel):
+        try:
+            if self.backend is not None:
+                valor = await self._fetch_compartilhado(chave, fetch, cacheavel)
+            else:
+                valor = await fetch()
+            if cacheavel(valor):
+                self.set(chave, valor)
+            return valor
+        finally:
+            self._em_voo.pop(chave, None)
+
+    async def _buscar(self, chave, fetch, cacheavel):
+        tarefa = self._em_voo.get(chave)
+        if tarefa is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # a busca roda numa tarefa própria: se quem a iniciou for cancelado
+            # (cliente desconectou), quem espera a mesma chave não é afetado
+            tarefa = asyncio.ensure_future(self._executar(chave, fetch, cacheavel))
+            # evita "exception was never retrieved" quando ninguém aguardava
+            tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._em_voo[chave] = tarefa
+        return await asyncio.shield(tarefa)
+
+    async def get_or_fetch(self, chave, fetch, cacheavel=lambda v: True):
+        """
+        Devolve o valor em cache ou executa `fetch()` (uma única vez por chave
+        em voo). Só guarda o resultado se `cacheavel(resultado)` for verdadeiro.
+        """
+        valor = self.get(chave)
+        if valor is not None:
+            self.hits += 1
+            return valor
+        return await self._buscar(chave, fetch, cacheavel)
+
+    def _revalidar(self, chave, fetch, cacheavel):
+        if chave in self._em_voo:
+            return
+        tarefa = asyncio.ensure_future(self._buscar(chave, fetch, cacheavel))
+        tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def get_swr(self, chave, fetch, cacheavel=lambda v: True):
+        """
+        Como get_or_fetch, mas devolve (valor, estado, idade) com estado em
+        HIT / MISS / STALE / STALE_ERROR (idade em segundos da resposta servida).
+        """
+        entrada = self._entrada(chave)
+        ttl = self._ttl(chave)
+        if self.backend is not None and (entrada is None or entrada[0] > ttl):
+            # outro worker pode ter buscado: confere o estado compartilhado
+            if await self._do_backend(chave) is not None:
+                entrada = self._entrada(chave)
+        if entrada is not None:
+            idade, valor = entrada
+            if idade <= ttl:
+                self.hits += 1
+                return valor, HIT, idade
+            if idade <= ttl + self.swr:
+                self.stale += 1
+                self._revalidar(chave, fetch, cacheavel)
+                return valor, STALE, idade
+
+        try:
+            valor = await self._buscar(chave, fetch, cacheavel)
+        except Exception:
+            if entrada is not None and entrada[0] <= ttl + self.grace:
+                self.stale_error += 1
+                return entrada[1], STALE_ERROR, entrada[0]
+            raise
+        if not cacheavel(valor) and entrada is not None and entrada[0] <= ttl + self.grace:
+            self.stale_error += 1
+            return entrada[1], STALE_ERROR, entrada[0]
+        return valor, MISS, 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale": self.stale,
+            "stale_error": self.stale_error,
+            "size": len(self._dados),
+            "max_size": self.max_itens,
+        }
+
+
+def normalizar_termo(termo: str) -> str:
+    return " ".join((termo or "").lower().split())
@@ -0,0 +1,205 @@
+import os
+import time
+import asyncio
+import logging
+
+import httpx
+
+from utils import ratelimit, metrics, breaker
+
+logger = logging.getLogger(__name__)
+
+# Cada host upstream tem POOL_SHARDS clientes keep-alive pequenos, usados em
+# rodízio e compartilhados por todo o processo: o pool do httpcore varre as
+# conexões (O(n²)) a cada requisição e resposta, e um pool único de 100
+# conexões gastava mais CPU nisso do que o resto do proxy sob carga.
+# keepalive == max_connections: com menos, o httpcore fecha conexões ociosas
+# assim que o pool passa do limite e reabre logo depois.
+POOL_SHARDS = max(1, int(os.getenv("HTTP_POOL_SHARDS", 8)))
+_POR_SHARD = max(1, 100 // POOL_SHARDS)
+LIMITS = httpx.Limits(max_connections=_POR_SHARD, max_keepalive_connections=_POR_SHARD, keepalive_expiry=30.0)
+TIMEOUT = httpx.Timeout(10.0)
+TENTATIVAS = 3
+
+# Hedged requests (GETs idempotentes): segunda tentativa depois do p95 do host
+HEDGE = os.getenv("HEDGE_REQUESTS", "0") == "1"
+HEDGE_ATRASO = float(os.getenv("HEDGE_DELAY", "1.0"))  # usado até haver amostras suficientes
+HEDGE_MIN_AMOSTRAS = 20
+
+_clients: dict = {}  # base_url -> lista de clientes (shards)
+_rodizio: dict = {}
+_ssl = None
+
+
+def _contexto_ssl():
+    # um contexto só para todos os shards (carregar os certificados custa ~40 ms)
+    global _ssl
+    if _ssl is None:
+        _ssl = httpx.create_ssl_context()
+    return _ssl
+
+
+def get_client(base_url: str) -> httpx.AsyncClient:
+    """
+    Devolve um dos pools de conexões do host, em rodízio (criados na
+    primeira chamada).
+    """
+    clients = _clients.get(base_url)
+    if clients is None or clients[0].is_closed:
+        clients = [
+            httpx.AsyncClient(base_url=base_url, timeout=TIMEOUT, limits=LIMITS, verify=_contexto_ssl())
+            for _ in range(POOL_SHARDS)
+        ]
+        _clients[base_url] = clients
+    i = _rodizio[base_url] = (_rodizio.get(base_url, -1) + 1) % len(clients)
+    return clients[i]
+
+
+async def _send(client, host: str, limite, method: str, path: str, stream: bool, kwargs: dict,
+                auth=httpx.USE_CLIENT_DEFAULT) -> httpx.Response:
+    await limite.acquire()
+    inicio = time.perf_counter()
+    try:
+        resp = await client.send(client.build_request(method, path, **kwargs), auth=auth, stream=stream)
+    except httpx.TransportError:
+        metrics.observar("upstream_request_seconds", time.perf_counter() - inicio, host=host, status="erro")
+        raise
+    metrics.observar("upstream_request_seconds", time.perf_counter() - inicio, host=host, status=resp.status_code)
+    return resp
+
+
+def _atraso_hedge(host: str) -> float:
+    # p95 das respostas 200 do host (com amostras suficientes)
+    h = metrics.histograma("upstream_request_seconds", host=host, status=200)
+    if h is not None and h.total >= HEDGE_MIN_AMOSTRAS:
+        return h.quantil(0.95)
+    return HEDGE_ATRASO
+
+
+def _descartar(tarefa: asyncio.Future):
+    # resposta que chegou mas não foi usada: devolve a conexão ao pool
+    if not tarefa.cancelled() and tarefa.exception() is None:
+        fechando = asyncio.ensure_future(tarefa.result().aclose())
+        _fechando.add(fechando)
+        fechando.add_done_callback(_fechando.discard)
+
+
+_fechando = set()
+
+
+async def _send_hedged(client, host: str, limite, method: str, path: str, stream: bool, kwargs: dict,
+                       auth=httpx.USE_CLIENT_DEFAULT):
+    """
+    Dispara a requisição e, se ela passar do p95 do host, dispara uma
+    segunda; fica com a primeira resposta que chegar e cancela a outra.
+    Se quem chamou for cancelado, as duas são canceladas e qualquer
+    resposta já recebida é fechada.
+    """
+    pendentes = {asyncio.ensure_future(_send(client, host, limite, method, path, stream, kwargs, auth))}
+    resposta = erro = None
+    try:
+        done, _ = await asyncio.wait(pendentes, timeout=_atraso_hedge(host))
+        if not done:
+            metrics.contar("upstream_hedges_total", host=host)
+            pendentes.add(asyncio.ensure_future(_send(client, host, limite, method, path, stream, kwargs, auth)))
+        while pendentes:
+            done, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+            respostas = [t.result() for t in done if t.exception() is None]
+            if respostas:
+                for sobra in respostas[1:]:
+                    await sobra.aclose()
+                resposta = respostas[0]
+                return resposta
+            erro = next(iter(done)).exception()
+        raise erro
+    finally:
+        for t in pendentes:
+            # Com resposta em mãos a perdedora termina sozinha (limitada pelo
+            # TIMEOUT): cancelada logo depois de receber uma conexão nova, o
+            # httpcore deixa essa conexão presa no pool. Se quem chamou foi
+            # cancelado, cancela tudo.
+            if resposta is None:
+                t.cancel()
+            t.add_done_callback(_descartar)
+
+
+async def enviar(base_url: str, method: str, path: str, tentativas: int = TENTATIVAS,
+                 stream: bool = False, hedge: bool = False, pausa_host: bool = True,
+                 **kwargs) -> httpx.Response:
+    """
+    Faz a requisição respeitando o token bucket e o circuit breaker do host.
+    Em 429/5xx ou erro de transporte, espera (Retry-After ou backoff com
+    jitter) e tenta de novo. Devolve a última resposta; relança o erro de
+    transporte da última tentativa. Com o circuito aberto levanta
+    CircuitoAberto sem chamar o upstream.
+    Com `stream=True` o corpo não é lido: quem chamou deve fechar a resposta.
+    Com `hedge=True` (só para GETs idempotentes, e se HEDGE_REQUESTS=1)
+    dispara uma segunda tentativa quando a primeira passa do p95.
+    Com `pausa_host=False` um 429 não pausa o host inteiro (limites por
+    destino, como os por chat do Telegram, ficam com quem chamou).
+    `auth` (httpx.Auth) roda a cada envio, depois da espera no token bucket:
+    assinaturas com prazo saem frescas em cada tentativa.
+    """
+    client = get_client(base_url)
+    host = client.base_url.host
+    limite = ratelimit.bucket(host)
+    disjuntor = breaker.disjuntor(host)
+    send = _send_hedged if hedge and HEDGE and method == "GET" else _send
+    auth = kwargs.pop("auth", httpx.USE_CLIENT_DEFAULT)
+
+    for tentativa in range(tentativas):
+        if not disjuntor.permitir():
+            metrics.contar("upstream_breaker_rejected_total", host=host)
+            raise breaker.CircuitoAberto(host)
+        ultima = tentativa == tentativas - 1
+        try:
+            resp = await send(client, host, limite, method, path, stream, kwargs, auth)
+        except httpx.TransportError as e:
+            disjuntor.falha()
+            if ultima:
+                raise
+            metrics.contar("upstream_retries_total", host=host, motivo="transporte")
+            espera = ratelimit.backoff(tentativa)
+            logger.warning(f"⚠️ {host}: {e!r}. Nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
+            continue
+        except Exception:
+            disjuntor.falha()
+            raise
+        except BaseException:
+            # cancelado (prazo do agregador, cliente desconectado): sem
+            # resultado, mas a sonda do meio-aberto não pode ficar presa
+            disjuntor.liberar()
+            raise
+
+        if resp.status_code >= 500:
+            disjuntor.falha()
+        else:
+            disjuntor.sucesso()
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            if not ultima:
+                await resp.aclose()
+            espera = ratelimit.backoff(tentativa, ratelimit.retry_after(resp.headers.get("Retry-After")))
+            if resp.status_code == 429 and pausa_host:
+                # a pausa vale para todas as requisições do host (acquire espera)
+                limite.throttled(espera)
+            if ultima:
+                return resp
+            logger.warning(f"⚠️ {host} HTTP {resp.status_code}. Nova tentativa em {espera:.1f}s")
+            metrics.contar("upstream_retries_total", host=host, motivo=str(resp.status_code))
+            if resp.status_code != 429 or not pausa_host:
+                # 429 com pausa_host: a espera fica no acquire do bucket
+                await asyncio.sleep(espera)
+            continue
+
+        limite.sucesso()
+        return resp
+
+
+async def fechar_clientes():
+    """Fecha todos os pools abertos (chamar no shutdown do app)."""
+    clients = [c for shards in _clients.values() for c in shards]
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
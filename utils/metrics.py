@@ -0,0 +1,141 @@
+"""
+Instrumentação leve (contadores e histogramas em memória) com saída no
+formato texto do Prometheus. Custo por observação: um perf_counter, um
+bisect e algumas somas — dá para deixar ligado em produção.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)  # último = +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(BUCKETS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q: float):
+        """Estimativa pelo limite superior do bucket (None sem amostras)."""
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for limite, n in zip(BUCKETS, self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return BUCKETS[-1]
+
+
+_histogramas = {}  # (nome, labels) -> Histograma
+_contadores = {}   # (nome, labels) -> int
+_gauges = {}       # (nome, labels) -> float
+_descricoes = {}
+
+
+def _chave(nome: str, labels: dict):
+    return nome, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def descrever(nome: str, texto: str):
+    _descricoes[nome] = texto
+
+
+def observar(nome: str, valor: float, **labels):
+    chave = _chave(nome, labels)
+    h = _histogramas.get(chave)
+    if h is None:
+        h = _histogramas[chave] = Histograma()
+    h.observar(valor)
+
+
+def contar(nome: str, n: int = 1, **labels):
+    chave = _chave(nome, labels)
+    _contadores[chave] = _contadores.get(chave, 0) + n
+
+
+def definir(nome: str, valor: float, **labels):
+    _gauges[_chave(nome, labels)] = valor
+
+
+@contextmanager
+def cronometro(nome: str, **labels):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **labels)
+
+
+def histograma(nome: str, **labels):
+    return _histogramas.get(_chave(nome, labels))
+
+
+def contador(nome: str, **labels) -> int:
+    return _contadores.get(_chave(nome, labels), 0)
+
+
+def _labels(pares, extra=()) -> str:
+    todos = [*pares, *extra]
+    if not todos:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in todos) + "}"
+
+
+def render() -> str:
+    linhas = []
+    vistos = set()
+
+    def cabecalho(nome, tipo):
+        if nome not in vistos:
+            vistos.add(nome)
+            if nome in _descricoes:
+                linhas.append(f"# HELP {nome} {_descricoes[nome]}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+    for (nome, pares), valor in sorted(_contadores.items()):
+        cabecalho(nome, "counter")
+        linhas.append(f"{nome}{_labels(pares)} {valor}")
+
+    for (nome, pares), valor in sorted(_gauges.items()):
+        cabecalho(nome, "gauge")
+        linhas.append(f"{nome}{_labels(pares)} {valor}")
+
+    for (nome, pares), h in sorted(_histogramas.items()):
+        cabecalho(nome, "histogram")
+        acumulado = 0
+        for limite, n in zip(BUCKETS, h.contagens):
+            acumulado += n
+            linhas.append(f"{nome}_bucket{_labels(pares, [('le', limite)])} {acumulado}")
+        linhas.append(f"{nome}_bucket{_labels(pares, [('le', '+Inf')])} {h.total}")
+        linhas.append(f"{nome}_sum{_labels(pares)} {h.soma}")
+        linhas.append(f"{nome}_count{_labels(pares)} {h.total}")
+
+    return "\n".join(linhas) + "\n"
+
+
+descrever("upstream_request_seconds", "Latência de cada tentativa de chamada ao upstream.")
+descrever("upstream_retries_total", "Novas tentativas por host e motivo.")
+descrever("upstream_hedges_total", "Segundas tentativas disparadas por passar do p95.")
+descrever("upstream_breaker_rejected_total", "Chamadas recusadas com o circuito aberto.")
+descrever("sign_seconds", "Tempo gasto assinando requisições.")
+descrever("parse_seconds", "Tempo de decodificação das respostas em streaming.")
+descrever("format_seconds", "Tempo de renderização do HTML das ofertas.")
+descrever("ml_token_refresh_total", "Renovações do token OAuth do Mercado Livre por resultado.")
+descrever("ml_token_refresh_seconds", "Duração das renovações do token do Mercado Livre.")
+descrever("ml_fallback_total", "Fallbacks da busca no Mercado Livre (401 -> refresh, 403 -> público).")
+descrever("ml_fallback_seconds", "Tempo extra gasto em cada fallback do Mercado Livre.")
+descrever("tracker_reprice_seconds", "Duração de cada reprecificação em lote por plataforma.")
+descrever("tracker_changes_total", "Mudanças de preço significativas emitidas pelo tracker.")
+descrever("tracker_items", "Itens vigiados pelo tracker por plataforma.")
+descrever("tracker_rejected_total", "Ids recusados com o tracker no limite de itens.")
+descrever("tracker_forgotten_total", "Ids que o tracker deixou de vigiar (saíram do pool ou ficaram sem preço).")
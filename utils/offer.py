@@ -0,0 +1,106 @@
+import re
+import html
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional
+
+from utils import metrics
+
+# moeda -> (prefixo, separador de milhar, separador decimal)
+FORMATOS = {
+    "BRL": ("R$ ", ".", ","),
+    "USD": ("US$ ", ",", "."),
+    "EUR": ("€ ", ".", ","),
+}
+SEM_PRECO = "—"
+
+
+def para_centavos(valor) -> Optional[int]:
+    """
+    Converte 123.4, Decimal("123.40"), "1.234,50" ou "R$ 1.234,50" em
+    centavos inteiros. Devolve None se não houver preço.
+    """
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor * 100
+    if isinstance(valor, (float, Decimal)):
+        numero = Decimal(str(valor))
+    else:
+        texto = re.sub(r"[^\d,.]", "", str(valor))
+        if "," in texto:
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            return None
+    return int((numero * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def formatar_preco(centavos: Optional[int], moeda: str = "BRL") -> str:
+    if centavos is None:
+        return SEM_PRECO
+    prefixo, milhar, decimal = FORMATOS.get(moeda, (f"{moeda} ", ".", ","))
+    inteiro, resto = divmod(abs(centavos), 100)
+    sinal = "-" if centavos < 0 else ""
+    return f"{sinal}{prefixo}{inteiro:,}".replace(",", milhar) + f"{decimal}{resto:02d}"
+
+
+@dataclass(frozen=True, slots=True)
+class Offer:
+    """
+    Oferta normalizada, igual para todos os provedores. O preço fica em
+    centavos inteiros ao lado da moeda; a mensagem HTML do Telegram é
+    gerada uma única vez e guardada no próprio registro.
+    """
+    fonte: str
+    titulo: str
+    link: str
+    preco_centavos: Optional[int] = None
+    moeda: str = "BRL"
+    imagem: Optional[str] = None
+    item_id: Optional[str] = None
+    _html: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def preco(self) -> str:
+        return formatar_preco(self.preco_centavos, self.moeda)
+
+    @property
+    def chave(self) -> str:
+        return str(self.item_id or self.link)
+
+    def html(self) -> str:
+        texto = self._html
+        if texto is None:
+            inicio = time.perf_counter()
+            texto = (
+                f"🛒 <b>{html.escape(self.fonte)}</b>\n{html.escape(self.titulo)}\n"
+                f"💰 {self.preco}\n🔗 {html.escape(self.link)}"
+            )
+            object.__setattr__(self, "_html", texto)
+            metrics.observar("format_seconds", time.perf_counter() - inicio)
+        return texto
+
+    def as_dict(self) -> dict:
+        return {
+            "fonte": self.fonte,
+            "titulo": self.titulo,
+            "preco": self.preco,
+            "link": self.link,
+            "imagem": self.imagem,
+            "item_id": self.item_id,
+        }
+
+    @classmethod
+    def from_dict(cls, o: dict, fonte: str = "LOJA") -> "Offer":
+        return cls(
+            fonte=o.get("fonte") or fonte,
+            titulo=o.get("titulo") or "Oferta",
+            link=o.get("link") or "",
+            preco_centavos=para_centavos(o.get("preco")),
+            moeda=o.get("moeda") or "BRL",
+            imagem=o.get("imagem"),
+            item_id=None if o.get("item_id") is None else str(o["item_id"]),
+        )
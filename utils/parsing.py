@@ -0,0 +1,132 @@
+import os
+import json
+import time
+
+from utils import metrics
+from utils.offer import Offer, para_centavos
+
+try:
+    import ijson  # parser incremental (opcional)
+except ImportError:
+    ijson = None
+
+# corpos até este tamanho vão inteiros para o json.loads (mais rápido numa
+# página normal); acima disso o ijson decodifica à medida que os bytes chegam
+STREAM_ACIMA = int(os.getenv("PARSE_STREAM_BYTES", str(256 * 1024)))
+
+
+def _caminho(data, prefixo: str):
+    # para o json.loads: "results.item" -> data["results"]
+    for chave in prefixo.split(".")[:-1]:
+        data = (data or {}).get(chave) or {}
+    return data if isinstance(data, list) else []
+
+
+class _Leitor:
+    """Adapta resp.aiter_bytes() ao `async read(n)` que o ijson espera."""
+
+    def __init__(self, pedacos, lidos: bytes = b""):
+        self._pedacos = pedacos
+        self._buffer = lidos
+
+    async def read(self, n: int = -1) -> bytes:
+        while n < 0 or len(self._buffer) < n:
+            try:
+                self._buffer += await self._pedacos.__anext__()
+            except StopAsyncIteration:
+                break
+        if n < 0:
+            n = len(self._buffer)
+        saida, self._buffer = self._buffer[:n], self._buffer[n:]
+        return saida
+
+
+def _tamanho(resp) -> int:
+    # Content-Length é do corpo na rede (comprimido ou não): só serve para
+    # saber de antemão que a resposta é grande
+    try:
+        return int(resp.headers.get("content-length", 0))
+    except ValueError:
+        return 0
+
+
+async def ler_itens(resp, prefixo: str, projetar) -> list:
+    """
+    Decodifica o corpo da resposta (aberta com stream=True) mantendo só os
+    itens em `prefixo` projetados por `projetar(item) -> Offer | None`.
+    Corpos de até STREAM_ACIMA bytes são lidos inteiros e passam pelo
+    json.loads; maiores (pelo Content-Length ou ao passar do limite durante a
+    leitura) seguem pelo ijson à medida que os bytes chegam. Fecha a resposta
+    no final.
+    """
+    saida = []
+    inicio = time.perf_counter()
+    try:
+        pedacos = resp.aiter_bytes()
+        lidos, total = [], 0
+        grande = ijson is not None and _tamanho(resp) > STREAM_ACIMA
+        if not grande:
+            async for pedaco in pedacos:
+                lidos.append(pedaco)
+                total += len(pedaco)
+                if ijson is not None and total > STREAM_ACIMA:
+                    grande = True
+                    break
+
+        if not grande:
+            for item in _caminho(json.loads(b"".join(lidos)), prefixo):
+                registro = projetar(item)
+                if registro is not None:
+                    saida.append(registro)
+            return saida
+
+        # items_async roda o pipeline inteiro em C no backend yajl2_c
+        # (items_coro encadeia corrotinas Python e leva ~2x mais)
+        async for item in ijson.items_async(_Leitor(pedacos, b"".join(lidos)), prefixo, use_float=True):
+            registro = projetar(item)
+            if registro is not None:
+                saida.append(registro)
+        return saida
+    finally:
+        await resp.aclose()
+        metrics.observar("parse_seconds", time.perf_counter() - inicio, prefixo=prefixo)
+
+
+def projetar_ml(r: dict):
+    if not r.get("permalink"):
+        return None
+    return Offer(
+        fonte="MERCADOLIVRE",
+        titulo=r.get("title", "Produto sem título"),
+        link=r["permalink"],
+        preco_centavos=para_centavos(r.get("price")),
+        moeda=r.get("currency_id") or "BRL",
+        imagem=r.get("thumbnail"),
+        item_id=r.get("id") or r["permalink"],
+    )
+
+
+def projetar_amazon(it: dict):
+    url = it.get("DetailPageURL")
+    if not url:
+        return None
+    title = (((it.get("ItemInfo") or {}).get("Title") or {}).get("DisplayValue")) or "Produto Amazon"
+    price = {}
+    try:
+        price = it["Offers"]["Listings"][0]["Price"]
+    except Exception:
+        pass
+    img = None
+    try:
+        img = it["Images"]["Primary"]["Large"]["URL"]
+    except Exception:
+        pass
+    return Offer(
+        fonte="AMAZON",
+        titulo=title,
+        link=url,
+        preco_centavos=para_centavos(price.get("Amount", price.get("DisplayAmount"))),
+        moeda=price.get("Currency") or "BRL",
+        imagem=img,
+        item_id=it.get("ASIN"),
+    )
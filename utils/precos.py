@@ -0,0 +1,71 @@
+"""
+Normalização de preços da Shopee para centavos.
+
+A unidade é decidida pelo campo de onde o valor veio, nunca pelo tamanho
+do número:
+- `price_info[].current_price` / `original_price` (OpenAPI v2): moeda cheia (12.5 = R$ 12,50)
+- `price` / `price_min` / `price_max` / `price_before_discount` (formato legado
+  v1/web): inteiro em 1/100000 da moeda (1250000 = R$ 12,50)
+"""
+from decimal import Decimal, InvalidOperation
+
+from utils.offer import para_centavos
+
+SEM_PRECO = -1
+
+# campo -> quantas unidades do valor bruto equivalem a 1 (moeda cheia)
+ESCALAS = {
+    "current_price": 1,
+    "original_price": 1,
+    "price": 100_000,
+    "price_min": 100_000,
+    "price_max": 100_000,
+    "price_before_discount": 100_000,
+}
+
+# ordem de preferência: primeiro o price_info da v2, depois os campos legados
+CAMPOS_PRICE_INFO = ("current_price", "original_price")
+CAMPOS_ITEM = ("price", "price_min", "price_before_discount")
+
+
+def _moeda_cheia(valor) -> int:
+    # o arredondamento é o de utils.offer.para_centavos (meio centavo para
+    # cima sobre o valor decimal); texto só como decimal estrito ("12.50")
+    if isinstance(valor, str):
+        valor = Decimal(valor)
+    elif isinstance(valor, bool) or not isinstance(valor, (int, float, Decimal)):
+        raise TypeError(f"preço inválido: {valor!r}")
+    return para_centavos(valor)
+
+
+def extrair(info: dict):
+    """Devolve (campo, valor bruto) do primeiro campo de preço presente no item."""
+    price_info = (info.get("price_info") or [{}])[0]
+    for campo in CAMPOS_PRICE_INFO:
+        valor = price_info.get(campo)
+        if valor is not None:
+            return campo, valor
+    for campo in CAMPOS_ITEM:
+        valor = info.get(campo)
+        if valor is not None:
+            return campo, valor
+    return None, None
+
+
+def centavos(campo: str, valor) -> int:
+    """Converte um valor bruto em centavos conforme a escala do campo."""
+    if campo is None or valor is None:
+        return SEM_PRECO
+    escala = ESCALAS[campo]
+    try:
+        if escala == 1:
+            return _moeda_cheia(valor)
+        # inteiro em 1/escala: arredonda meio centavo para cima
+        return (int(valor) * 100 + escala // 2) // escala
+    except (TypeError, ValueError, InvalidOperation):
+        return SEM_PRECO
+
+
+def normalizar_pagina(itens) -> list:
+    """Centavos de cada item da página, na mesma ordem (SEM_PRECO quando não há preço)."""
+    return [centavos(*extrair(info)) for info in itens]
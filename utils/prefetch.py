@@ -0,0 +1,126 @@
+import os
+import asyncio
+import logging
+import itertools
+
+from utils.text import formatar_oferta
+from utils.store import get_store
+
+logger = logging.getLogger(__name__)
+
+FILA_TAMANHO = int(os.getenv("PREFETCH_QUEUE_SIZE", "5"))
+ESPERA_VAZIO = float(os.getenv("PREFETCH_IDLE", "60"))  # s antes de buscar de novo sem resultado
+
+
+class Prefetcher:
+    """
+    Pipeline produtor/consumidor: um worker por (fonte, categoria) mantém uma
+    fila limitada cheia de ofertas já resolvidas e formatadas. O publicador
+    só faz `await proxima()`; upstream lento fica escondido atrás da fila.
+    Cada worker guarda o offset da próxima página da sua categoria.
+    """
+
+    def __init__(self, fontes: dict, tamanho: int = FILA_TAMANHO):
+        # fontes: nome -> (categorias, coroutine busca(categoria, offset) -> (list[Offer], próximo offset))
+        # próximo None = fim da busca (recomeça do início)
+        self.fontes = fontes
+        self.filas = {
+            (fonte, cat): asyncio.Queue(maxsize=tamanho)
+            for fonte, (categorias, _) in fontes.items()
+            for cat in categorias
+        }
+        self._na_fila = set()  # (fonte, item_id) já enfileirados
+        self._tarefas = []
+        self._ordem = itertools.cycle(list(self.filas))
+        self._disponivel = asyncio.Event()
+
+    def iniciar(self):
+        for (fonte, cat), fila in self.filas.items():
+            busca = self.fontes[fonte][1]
+            self._tarefas.append(asyncio.create_task(self._worker(fonte, cat, busca, fila)))
+        logger.info(f"🚚 Prefetch iniciado ({len(self._tarefas)} filas).")
+
+    async def parar(self):
+        for t in self._tarefas:
+            t.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas.clear()
+
+    async def _worker(self, fonte: str, categoria: str, busca, fila: asyncio.Queue):
+        store = get_store()
+        offset = 0
+        while True:
+            # só volta ao upstream quando o publicador abriu espaço na fila
+            while fila.full():
+                await asyncio.sleep(1)
+            try:
+                ofertas, proximo = await busca(categoria, offset)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Prefetch {fonte}/{categoria}: {e}")
+                ofertas, proximo = [], offset
+
+            postados = await store.postados(fonte, (o.chave for o in ofertas))
+            novas = 0
+            for o in ofertas:
+                chave = (fonte, o.chave)
+                if o.chave in postados or chave in self._na_fila:
+                    continue
+                self._na_fila.add(chave)
+                # bloqueia quando a fila está cheia (backpressure)
+                await fila.put((o, formatar_oferta(o)))
+                self._disponivel.set()
+                novas += 1
+
+            # página sem novidade com mais páginas pela frente: segue direto;
+            # no fim da busca (ou em erro) espera antes de recomeçar
+            parado = proximo is None or proximo == offset
+            offset = proximo or 0
+            if not novas and parado:
+                await asyncio.sleep(ESPERA_VAZIO)
+
+    def _tirar(self):
+        for _ in range(len(self.filas)):
+            fila = self.filas[next(self._ordem)]
+            if not fila.empty():
+                return fila.get_nowait()
+        return None
+
+    async def proxima(self, timeout: float = None):
+        """
+        Devolve (oferta, texto_formatado) alternando entre as filas e marca o
+        item como postado. Espera até `timeout` se todas estiverem vazias.
+        """
+        item = self._tirar()
+        while item is None:
+            self._disponivel.clear()
+            await asyncio.wait_for(self._disponivel.wait(), timeout)
+            item = self._tirar()
+
+        oferta, texto = item
+        chave = oferta.fonte, oferta.chave
+        self._na_fila.discard(chave)
+        await get_store().marcar_postado(*chave)
+        return oferta, texto
+
+
+def pipeline_padrao() -> Prefetcher:
+    """Filas para as categorias de ml_api e o mapa de keywords da Amazon."""
+    import ml_api
+    from providers import registry
+
+    fontes = {"MERCADOLIVRE": (ml_api.CATEGORIAS, ml_api.buscar_pagina_mercadolivre)}
+
+    if registry.configurado("AMAZON"):
+        from providers import amazon_api
+
+        async def _amazon(categoria, offset):
+            # a busca da PA-API não é paginada aqui: sempre a primeira página
+            ofertas = await amazon_api.buscar_ofertas_amazon([categoria])
+            await get_store().registrar("AMAZON", ofertas)
+            return ofertas, None
+
+        fontes["AMAZON"] = (list(amazon_api.KEYWORDS), _amazon)
+
+    return Prefetcher(fontes)
@@ -0,0 +1,282 @@
+"""
+Fila assíncrona de publicação no Telegram (Bot API via HTTP).
+
+Cada chat tem a sua fila, um worker e um token bucket (PUBLISH_CHAT_RATE
+mensagens/s); o limite global do bot vem do bucket do host em
+utils.ratelimit. O worker junta as ofertas que chegarem em até
+PUBLISH_BATCH_WINDOW s (no máximo PUBLISH_BATCH_MAX) e manda:
+  individual -> uma mensagem (ou foto com legenda) por oferta
+  digest     -> uma mensagem com todas (utils.text.formatar_digest)
+  album      -> sendMediaGroup com as imagens (`imagem` do Offer); sem imagem cai no digest
+Falhas (429 com retry_after, 5xx, erro de rede) voltam para a fila depois
+da espera, sem segurar os envios seguintes. Qualquer outro erro no envio
+resolve as ofertas do lote com a exceção (drenar()/parar() não ficam presos).
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List
+
+import httpx
+
+from utils import metrics, ratelimit
+from utils.breaker import CircuitoAberto
+from utils.http import enviar
+from utils.offer import Offer
+from utils.text import formatar_digest
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
+API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+MODO = os.getenv("PUBLISH_MODE", "digest")
+JANELA = float(os.getenv("PUBLISH_BATCH_WINDOW", 2.0))
+MAX_LOTE = int(os.getenv("PUBLISH_BATCH_MAX", 10))  # sendMediaGroup aceita até 10
+# Telegram: ~1 msg/s por chat e 20 msg/min em grupos (use 0.33 para grupos)
+CHAT_RATE = float(os.getenv("PUBLISH_CHAT_RATE", 1.0))
+MAX_TENTATIVAS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", 5))
+
+LIMITE_TEXTO = 4096
+LIMITE_LEGENDA = 1024
+
+INDIVIDUAL = "individual"
+DIGEST = "digest"
+ALBUM = "album"
+
+
+class _Item:
+    __slots__ = ("oferta", "futuro", "enfileirado_em", "tentativas")
+
+    def __init__(self, oferta: Offer, futuro: asyncio.Future):
+        self.oferta = oferta
+        self.futuro = futuro
+        self.enfileirado_em = time.monotonic()
+        self.tentativas = 0
+
+
+class Publicador:
+    def __init__(self, token: str = TELEGRAM_TOKEN, base: str = API_BASE, modo: str = MODO,
+                 janela: float = JANELA, max_lote: int = MAX_LOTE, chat_rate: float = CHAT_RATE,
+                 max_tentativas: int = MAX_TENTATIVAS):
+        if modo not in (INDIVIDUAL, DIGEST, ALBUM):
+            raise ValueError(f"PUBLISH_MODE inválido: {modo}")
+        self.token = token
+        self.base = base
+        self.modo = modo
+        self.janela = janela if modo != INDIVIDUAL else 0.0
+        self.max_lote = max_lote if modo != INDIVIDUAL else 1
+        self.chat_rate = chat_rate
+        self.max_tentativas = max_tentativas
+        self._filas: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._buckets: Dict[str, ratelimit.TokenBucket] = {}
+        self._envios = set()
+        self._pendentes = 0
+        self._vazio = asyncio.Event()
+        self._vazio.set()
+
+    # ---------- entrada ----------
+    def publicar(self, chat_id, ofertas) -> List[asyncio.Future]:
+        """
+        Enfileira uma ou várias ofertas para o chat e volta na hora. Cada
+        futuro termina com o message_id enviado (ou a exceção da falha final).
+        """
+        if isinstance(ofertas, (Offer, dict)):
+            ofertas = [ofertas]
+        chat = str(chat_id)
+        fila = self._fila(chat)
+        loop = asyncio.get_running_loop()
+        futuros = []
+        for o in ofertas:
+            if not isinstance(o, Offer):
+                o = Offer.from_dict(o)
+            futuro = loop.create_future()
+            fila.put_nowait(_Item(o, futuro))
+            futuros.append(futuro)
+        self._pendentes += len(futuros)
+        self._vazio.clear()
+        metrics.definir("publisher_pending", self._pendentes)
+        return futuros
+
+    def _fila(self, chat: str) -> asyncio.Queue:
+        fila = self._filas.get(chat)
+        if fila is None:
+            fila = self._filas[chat] = asyncio.Queue()
+            self._buckets[chat] = ratelimit.TokenBucket(self.chat_rate)
+            self._workers[chat] = asyncio.create_task(self._worker(chat, fila))
+        return fila
+
+    async def drenar(self, timeout: float = None):
+        """Espera todas as ofertas enfileiradas serem enviadas (ou descartadas)."""
+        await asyncio.wait_for(self._vazio.wait(), timeout)
+
+    async def parar(self, timeout: float = 30.0):
+        try:
+            await self.drenar(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Publicador parado com {self._pendentes} ofertas pendentes.")
+        tarefas = [*self._workers.values(), *self._envios]
+        for t in tarefas:
+            t.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self._workers.clear()
+
+    # ---------- worker por chat ----------
+    async def _worker(self, chat: str, fila: asyncio.Queue):
+        bucket = self._buckets[chat]
+        while True:
+            lote = [await fila.get()]
+            prazo = time.monotonic() + self.janela
+            while len(lote) < self.max_lote:
+                if not fila.empty():
+                    lote.append(fila.get_nowait())
+                    continue
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            metodo, payload, lote = self._montar(chat, lote, fila)
+            await bucket.acquire()
+            # o envio roda à parte: retry/espera de um lote não segura o próximo
+            tarefa = asyncio.create_task(self._enviar(chat, metodo, payload, lote))
+            self._envios.add(tarefa)
+            tarefa.add_done_callback(self._envios.discard)
+
+    def _montar(self, chat: str, lote: List[_Item], fila: asyncio.Queue):
+        """Escolhe o método da Bot API; o que não couber no limite volta para a fila."""
+        if len(lote) == 1:
+            o = lote[0].oferta
+            texto = o.html()
+            if o.imagem and len(texto) <= LIMITE_LEGENDA:
+                return "sendPhoto", {"chat_id": chat, "photo": o.imagem, "caption": texto, "parse_mode": "HTML"}, lote
+            return "sendMessage", {"chat_id": chat, "text": texto[:LIMITE_TEXTO], "parse_mode": "HTML"}, lote
+
+        if self.modo == ALBUM:
+            com_imagem = [i for i in lote if i.oferta.imagem and len(i.oferta.html()) <= LIMITE_LEGENDA]
+            if len(com_imagem) >= 2:
+                for sobra in lote:
+                    if sobra not in com_imagem:
+                        fila.put_nowait(sobra)
+                media = [
+                    {"type": "photo", "media": i.oferta.imagem, "caption": i.oferta.html(), "parse_mode": "HTML"}
+                    for i in com_imagem
+                ]
+                return "sendMediaGroup", {"chat_id": chat, "media": media}, com_imagem
+
+        texto = formatar_digest([i.oferta for i in lote])
+        while len(texto) > LIMITE_TEXTO and len(lote) > 1:
+            fila.put_nowait(lote.pop())
+            texto = formatar_digest([i.oferta for i in lote])
+        return "sendMessage", {"chat_id": chat, "text": texto[:LIMITE_TEXTO], "parse_mode": "HTML"}, lote
+
+    # ---------- envio ----------
+    async def _enviar(self, chat: str, metodo: str, payload: dict, lote: List[_Item]):
+        try:
+            await self._enviar_lote(chat, metodo, payload, lote)
+        except Exception as e:
+            # erro fora dos previstos: sem repetir (o Telegram pode ter entregue),
+            # mas todo item do lote precisa terminar
+            logger.exception(f"❌ Telegram {metodo} ({chat}): {e!r}")
+            abertos = [i for i in lote if not i.futuro.done()]
+            metrics.contar("publisher_dropped_total", len(abertos), motivo="erro")
+            for item in abertos:
+                self._concluir(item, erro=e)
+
+    @staticmethod
+    def _message_ids(resp: httpx.Response, n: int) -> list:
+        """message_id de cada oferta do lote (None se a resposta não disser)."""
+        try:
+            resultado = resp.json().get("result")
+        except (ValueError, AttributeError):
+            resultado = None
+        if isinstance(resultado, list):
+            ids = [m.get("message_id") if isinstance(m, dict) else None for m in resultado]
+        elif isinstance(resultado, dict):
+            ids = [resultado.get("message_id")] * n
+        else:
+            ids = []
+        return (ids + [None] * n)[:n]
+
+    async def _enviar_lote(self, chat: str, metodo: str, payload: dict, lote: List[_Item]):
+        try:
+            resp = await enviar(self.base, "POST", f"/bot{self.token}/{metodo}", json=payload,
+                                tentativas=1, pausa_host=False)
+        except (httpx.TransportError, CircuitoAberto) as e:
+            logger.warning(f"⚠️ Telegram {metodo} ({chat}): {e!r}")
+            return self._reagendar(chat, lote, metodo, None)
+
+        if resp.status_code == 200:
+            ids = self._message_ids(resp, len(lote))
+            agora = time.monotonic()
+            for item, message_id in zip(lote, ids):
+                metrics.observar("publisher_queue_seconds", agora - item.enfileirado_em)
+                self._concluir(item, message_id)
+            metrics.contar("publisher_sent_total", metodo=metodo)
+            metrics.contar("publisher_offers_total", len(lote), metodo=metodo)
+            return
+
+        if resp.status_code == 429:
+            try:
+                espera = float(resp.json()["parameters"]["retry_after"])
+            except (ValueError, KeyError, TypeError):
+                espera = ratelimit.retry_after(resp.headers.get("Retry-After")) or 1.0
+            # a pausa vale para o chat inteiro; os outros chats seguem
+            self._buckets[chat].throttled(espera)
+            return self._reagendar(chat, lote, metodo, espera)
+        if resp.status_code >= 500:
+            return self._reagendar(chat, lote, metodo, None)
+
+        # 400/403 etc.: não adianta repetir
+        logger.error(f"❌ Telegram {metodo} ({chat}) HTTP {resp.status_code}: {resp.text[:200]}")
+        metrics.contar("publisher_dropped_total", len(lote), motivo=str(resp.status_code))
+        erro = RuntimeError(f"Telegram HTTP {resp.status_code}")
+        for item in lote:
+            self._concluir(item, erro=erro)
+
+    def _reagendar(self, chat: str, lote: List[_Item], metodo: str, espera):
+        loop = asyncio.get_running_loop()
+        fila = self._filas[chat]
+        for item in lote:
+            item.tentativas += 1
+            if item.tentativas >= self.max_tentativas:
+                metrics.contar("publisher_dropped_total", motivo="tentativas")
+                self._concluir(item, erro=RuntimeError(f"{metodo}: {item.tentativas} tentativas sem sucesso"))
+                continue
+            atraso = espera if espera is not None else ratelimit.backoff(item.tentativas)
+            metrics.contar("publisher_retries_total", metodo=metodo)
+            loop.call_later(atraso, fila.put_nowait, item)
+
+    def _concluir(self, item: _Item, message_id=None, erro: Exception = None):
+        if not item.futuro.done():
+            if erro is not None:
+                item.futuro.set_exception(erro)
+                item.futuro.exception()  # ninguém precisa aguardar o futuro
+            else:
+                item.futuro.set_result(message_id)
+        self._pendentes -= 1
+        metrics.definir("publisher_pending", self._pendentes)
+        if self._pendentes <= 0:
+            self._vazio.set()
+
+
+_publicador = None
+
+
+def get_publicador() -> Publicador:
+    global _publicador
+    if _publicador is None:
+        _publicador = Publicador()
+    return _publicador
+
+
+metrics.descrever("publisher_queue_seconds", "Tempo entre enfileirar a oferta e o Telegram confirmar o envio.")
+metrics.descrever("publisher_sent_total", "Chamadas à Bot API que deram certo, por método.")
+metrics.descrever("publisher_offers_total", "Ofertas entregues, por método.")
+metrics.descrever("publisher_retries_total", "Ofertas devolvidas à fila depois de 429/5xx/erro de rede.")
+metrics.descrever("publisher_dropped_total", "Ofertas descartadas (erro definitivo ou tentativas esgotadas).")
+metrics.descrever("publisher_pending", "Ofertas na fila ou em envio.")
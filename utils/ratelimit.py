@@ -0,0 +1,122 @@
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+
+from utils import shared
+
+# Requisições/s permitidas por host upstream (RATE_LIMITS="host=rate,host=rate" sobrescreve)
+LIMITES = {
+    "api.mercadolibre.com": 10.0,
+    "partner.shopeemobile.com": 5.0,
+    "open-api.affiliate.shopee.com.br": 5.0,
+    "webservices.amazon.com.br": 1.0,
+    "api.telegram.org": 30.0,  # limite global de envio do bot
+}
+LIMITE_PADRAO = 5.0
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+for _par in filter(None, os.getenv("RATE_LIMITS", "").split(",")):
+    _host, _, _rate = _par.partition("=")
+    LIMITES[_host.strip()] = float(_rate)
+
+
+class TokenBucket:
+    """
+    Token bucket com taxa adaptativa: cai pela metade a cada 429 e volta a
+    subir aos poucos a cada resposta boa, até o limite configurado.
+    Com estado compartilhado (utils.shared) cada token também consome a
+    cota global do host e a pausa de um 429 vale para todos os processos.
+    """
+
+    def __init__(self, rate: float, capacidade: float = None, rate_min: float = 0.1, host: str = None):
+        self.host = host
+        self.rate_max = rate
+        self.rate = rate
+        self.rate_min = min(rate_min, rate)
+        self.capacidade = capacidade or max(1.0, rate)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._pausa_ate = 0.0
+        self._lock = asyncio.Lock()
+
+    def _recarregar(self, agora: float):
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.rate)
+        self._ultimo = agora
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                if agora < self._pausa_ate:
+                    await asyncio.sleep(self._pausa_ate - agora)
+                    continue
+                self._recarregar(agora)
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    continue
+                espera = await self._cota_global()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                    continue
+                self._tokens -= 1
+                return
+
+    async def _cota_global(self) -> float:
+        be = shared.backend()
+        if be is None or self.host is None:
+            return 0.0
+        pausa = await be.get(f"pausa:{self.host}")
+        if pausa is not None and pausa[1] > time.time():
+            return pausa[1] - time.time()
+        return await be.reservar(self.host, self.rate)
+
+    def sucesso(self):
+        if self.rate < self.rate_max:
+            self.rate = min(self.rate_max, self.rate + self.rate_max * 0.05)
+
+    def throttled(self, pausa: float):
+        """Upstream pediu para desacelerar: reduz a taxa e pausa todo mundo."""
+        self._recarregar(time.monotonic())
+        self.rate = max(self.rate_min, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+        self._pausa_ate = max(self._pausa_ate, time.monotonic() + pausa)
+        be = shared.backend()
+        if be is not None and self.host is not None and pausa > 0:
+            tarefa = asyncio.ensure_future(be.set(f"pausa:{self.host}", time.time() + pausa, pausa))
+            tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+_buckets = {}
+
+
+def bucket(host: str) -> TokenBucket:
+    b = _buckets.get(host)
+    if b is None:
+        b = TokenBucket(LIMITES.get(host, LIMITE_PADRAO), host=host)
+        _buckets[host] = b
+    return b
+
+
+def retry_after(valor) -> float:
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff(tentativa: int, retry_after_s: float = None) -> float:
+    """Backoff exponencial com jitter completo; Retry-After tem prioridade."""
+    if retry_after_s is not None:
+        return min(BACKOFF_MAX, retry_after_s)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** tentativa)))
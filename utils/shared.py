@@ -0,0 +1,213 @@
+"""
+Estado compartilhado entre workers/réplicas do proxy: respostas em cache,
+cota por host (rate limit) e o token OAuth do Mercado Livre.
+
+SHARED_STATE escolhe o backend:
+  (vazio) / memory     -> nada compartilhado (cada processo por si)
+  sqlite[:///caminho]  -> arquivo SQLite local (vários workers na mesma máquina)
+  redis://host:porta/0 -> Redis (várias réplicas); precisa do pacote `redis`
+
+A cota usa janelas de 1 s por host com contador atômico (INCR no Redis,
+transação IMMEDIATE no SQLite): a soma de todos os processos respeita o
+limite configurado, então o volume no upstream não cresce com a escala.
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE = os.getenv("SHARED_STATE", "")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "data/shared.db")
+# a cada tantas escritas o SQLite apaga as entradas vencidas
+LIMPEZA_A_CADA = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    chave      TEXT PRIMARY KEY,
+    valor      TEXT NOT NULL,
+    guardado_em REAL NOT NULL,
+    expira_em  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cota (
+    host   TEXT PRIMARY KEY,
+    janela INTEGER NOT NULL,
+    usados INTEGER NOT NULL
+);
+"""
+
+
+def _limite_janela(rate: float) -> int:
+    return max(1, int(rate))
+
+
+class SQLiteBackend:
+    """
+    Backend local: um arquivo SQLite (WAL) visto por todos os workers.
+    As consultas rodam num thread próprio, uma por vez: a espera pelo lock
+    do arquivo (até 5 s quando outro worker está escrevendo) não trava o
+    event loop.
+    """
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-sqlite")
+        self._escritas = 0
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    async def _rodar(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+
+    def _transacao(self, funcao, *args):
+        # BEGIN IMMEDIATE: pega o lock de escrita já na leitura (lê e grava sem corrida entre workers)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = funcao(*args)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return resultado
+
+    async def get(self, chave: str):
+        """(guardado_em, valor) ainda válido, ou None."""
+        linha = await self._rodar(self._get, chave)
+        if linha is None:
+            return None
+        return linha[0], json.loads(linha[1])
+
+    def _get(self, chave: str):
+        return self._conn.execute(
+            "SELECT guardado_em, valor FROM kv WHERE chave = ? AND expira_em > ?",
+            (chave, time.time()),
+        ).fetchone()
+
+    async def set(self, chave: str, valor, ttl: float):
+        await self._rodar(self._set, chave, json.dumps(valor), ttl)
+
+    def _set(self, chave: str, bruto: str, ttl: float):
+        agora = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO kv (chave, valor, guardado_em, expira_em) VALUES (?, ?, ?, ?)",
+            (chave, bruto, agora, agora + ttl),
+        )
+        self._escritas += 1
+        if self._escritas % LIMPEZA_A_CADA == 0:
+            self._conn.execute("DELETE FROM kv WHERE expira_em <= ?", (agora,))
+
+    async def lease(self, chave: str, ttl: float) -> bool:
+        """Reserva exclusiva por `ttl` s (quem ganhar faz o trabalho)."""
+        return await self._rodar(self._transacao, self._lease, f"lease:{chave}", ttl)
+
+    def _lease(self, chave: str, ttl: float) -> bool:
+        agora = time.time()
+        ocupado = self._conn.execute(
+            "SELECT 1 FROM kv WHERE chave = ? AND expira_em > ?", (chave, agora)
+        ).fetchone()
+        if not ocupado:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (chave, valor, guardado_em, expira_em) VALUES (?, '1', ?, ?)",
+                (chave, agora, agora + ttl),
+            )
+        return not ocupado
+
+    async def liberar(self, chave: str):
+        await self._rodar(self._conn.execute, "DELETE FROM kv WHERE chave = ?", (f"lease:{chave}",))
+
+    async def reservar(self, host: str, rate: float) -> float:
+        """Consome uma vaga da cota do host; devolve quanto esperar (0 = liberado)."""
+        return await self._rodar(self._transacao, self._reservar, host, rate)
+
+    def _reservar(self, host: str, rate: float) -> float:
+        agora = time.time()
+        janela = int(agora)
+        linha = self._conn.execute("SELECT janela, usados FROM cota WHERE host = ?", (host,)).fetchone()
+        usados = linha[1] if linha and linha[0] == janela else 0
+        livre = usados < _limite_janela(rate)
+        if livre:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cota (host, janela, usados) VALUES (?, ?, ?)",
+                (host, janela, usados + 1),
+            )
+        return 0.0 if livre else janela + 1 - agora
+
+
+class RedisBackend:
+    """
+    Backend em rede (Redis). Só usa GET/SET NX PX/DEL/INCR/PEXPIRE, então
+    qualquer servidor que fale esse pedaço do protocolo serve nos testes.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STATE=redis:// requer o pacote `redis`") from e
+        self._r = redis.from_url(url, decode_responses=True, protocol=2)
+
+    async def get(self, chave: str):
+        bruto = await self._r.get(f"kv:{chave}")
+        if bruto is None:
+            return None
+        guardado_em, valor = json.loads(bruto)
+        return guardado_em, valor
+
+    async def set(self, chave: str, valor, ttl: float):
+        await self._r.set(f"kv:{chave}", json.dumps([time.time(), valor]), px=max(1, int(ttl * 1000)))
+
+    async def lease(self, chave: str, ttl: float) -> bool:
+        return bool(await self._r.set(f"lease:{chave}", "1", nx=True, px=max(1, int(ttl * 1000))))
+
+    async def liberar(self, chave: str):
+        await self._r.delete(f"lease:{chave}")
+
+    async def reservar(self, host: str, rate: float) -> float:
+        agora = time.time()
+        janela = int(agora)
+        chave = f"cota:{host}:{janela}"
+        usados = await self._r.incr(chave)
+        if usados == 1:
+            await self._r.pexpire(chave, 2000)
+        return 0.0 if usados <= _limite_janela(rate) else janela + 1 - agora
+
+
+_backend = None
+_iniciado = False
+
+
+def backend():
+    """Backend configurado em SHARED_STATE (None = só memória local)."""
+    global _backend, _iniciado
+    if not _iniciado:
+        _iniciado = True
+        _backend = criar(SHARED_STATE)
+    return _backend
+
+
+def criar(spec: str):
+    if not spec or spec == "memory":
+        return None
+    if spec.startswith("redis://") or spec.startswith("rediss://"):
+        logger.info("🔗 Estado compartilhado: Redis")
+        return RedisBackend(spec)
+    if spec == "sqlite" or spec.startswith("sqlite:"):
+        path = spec.partition(":///")[2] or SHARED_STATE_PATH
+        logger.info(f"🔗 Estado compartilhado: SQLite em {path}")
+        return SQLiteBackend(path)
+    raise ValueError(f"SHARED_STATE desconhecido: {spec}")
+
+
+def configurar(novo) -> Optional[object]:
+    """Troca o backend (testes/benchmarks); devolve o anterior."""
+    global _backend, _iniciado
+    anterior, _backend, _iniciado = _backend, novo, True
+    return anterior
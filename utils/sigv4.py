@@ -0,0 +1,83 @@
+import time
+import hmac
+import hashlib
+from functools import lru_cache
+
+from utils import metrics
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+SIGNED_HEADERS = "content-encoding;content-type;host;x-amz-date;x-amz-target"
+
+
+def _sign(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=16)
+def signing_key(secret_key: str, datestamp: str, region: str, service: str) -> bytes:
+    """
+    Chave derivada do SigV4 (4 HMACs encadeados). Só muda uma vez por dia
+    e região, então fica em cache.
+    """
+    k_date = _sign(("AWS4" + secret_key).encode("utf-8"), datestamp)
+    k_region = _sign(k_date, region)
+    k_service = _sign(k_region, service)
+    return _sign(k_service, "aws4_request")
+
+
+class SigV4Signer:
+    """
+    Assinador SigV4 para um endpoint JSON fixo (POST, sem querystring).
+    As partes constantes do canonical request são montadas uma única vez;
+    `sign(payload)` devolve os cabeçalhos prontos para o envio.
+    """
+
+    def __init__(self, access_key: str, secret_key: str, host: str, region: str,
+                 service: str, uri: str, target: str,
+                 content_type: str = "application/json; charset=UTF-8"):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.service = service
+        self.content_type = content_type
+        self.target = target
+        self.host = host
+        # método + uri + querystring vazia + cabeçalhos até x-amz-date
+        self._prefixo = (
+            f"POST\n{uri}\n\n"
+            f"content-encoding:amz-1.0\ncontent-type:{content_type}\nhost:{host}\nx-amz-date:"
+        )
+        self._sufixo = f"\nx-amz-target:{target}\n\n{SIGNED_HEADERS}\n"
+        self._escopo_sufixo = f"/{region}/{service}/aws4_request"
+
+    def sign(self, payload: str, t: time.struct_time = None) -> dict:
+        with metrics.cronometro("sign_seconds", servico=self.service):
+            return self._sign(payload, t)
+
+    def _sign(self, payload: str, t: time.struct_time = None) -> dict:
+        t = t or time.gmtime()
+        amz_date = time.strftime("%Y%m%dT%H%M%SZ", t)
+        datestamp = amz_date[:8]
+
+        payload_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        canonical_request = f"{self._prefixo}{amz_date}{self._sufixo}{payload_hash}"
+        credential_scope = datestamp + self._escopo_sufixo
+        string_to_sign = (
+            f"{ALGORITHM}\n{amz_date}\n{credential_scope}\n"
+            f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+        )
+
+        key = signing_key(self.secret_key, datestamp, self.region, self.service)
+        signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+        return {
+            "Content-Encoding": "amz-1.0",
+            "Content-Type": self.content_type,
+            "X-Amz-Date": amz_date,
+            "X-Amz-Target": self.target,
+            "Authorization": (
+                f"{ALGORITHM} Credential={self.access_key}/{credential_scope}, "
+                f"SignedHeaders={SIGNED_HEADERS}, Signature={signature}"
+            ),
+            "Host": self.host,
+        }
@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.offer import Offer
+
+DB_PATH = os.getenv("OFFER_DB", "data/offers.db")
+# Ofertas mais velhas que isso não são usadas sem nova busca (preço pode ter mudado)
+POOL_MAX_AGE = float(os.getenv("OFFER_POOL_MAX_AGE", 6 * 3600))
+# Intervalo mínimo para repostar um item (só se o preço cair)
+REPOST_COOLDOWN = float(os.getenv("OFFER_REPOST_COOLDOWN", 24 * 3600))
+
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    platform      TEXT NOT NULL,
+    item_id       TEXT NOT NULL,
+    titulo        TEXT,
+    link          TEXT,
+    imagem        TEXT,
+    preco         INTEGER,  -- centavos
+    moeda         TEXT,
+    preco_min     INTEGER,
+    preco_postado INTEGER,
+    atualizado_em REAL NOT NULL,
+    postado_em    REAL,
+    PRIMARY KEY (platform, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_offers_nao_postadas
+    ON offers (platform, atualizado_em) WHERE postado_em IS NULL;
+CREATE INDEX IF NOT EXISTS idx_offers_queda
+    ON offers (platform, postado_em) WHERE preco < preco_postado;
+CREATE TABLE IF NOT EXISTS price_history (
+    platform TEXT NOT NULL,
+    item_id  TEXT NOT NULL,
+    visto_em REAL NOT NULL,
+    preco    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_item
+    ON price_history (platform, item_id, visto_em);
+"""
+
+
+class OfferStore:
+    """
+    Base local (SQLite em modo WAL) das ofertas já vistas, com histórico de
+    preço e a data do último post. Serve de pool para os ciclos de publicação:
+    `proxima()` pega uma oferta não postada (ou cujo preço caiu) sem ir ao upstream.
+    As consultas rodam num thread próprio, uma por vez (como o SQLiteBackend
+    de utils/shared.py): commit e fsync não travam o event loop.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="offer-store")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        versao = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if versao < SCHEMA_VERSION:
+            # é só um cache local de ofertas: recria em vez de migrar
+            self._conn.executescript("DROP TABLE IF EXISTS offers; DROP TABLE IF EXISTS price_history;")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    async def _rodar(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+
+    async def registrar(self, platform: str, ofertas):
+        """Insere/atualiza ofertas (Offer) e grava o preço no histórico."""
+        await self._rodar(self._registrar, platform, list(ofertas))
+
+    def _registrar(self, platform: str, ofertas: list):
+        agora = time.time()
+        linhas = []
+        historico = []
+        for o in ofertas:
+            item_id = o.chave
+            if not item_id:
+                continue
+            preco = o.preco_centavos
+            linhas.append((
+                platform, item_id, o.titulo, o.link, o.imagem, preco, o.moeda, preco, agora,
+            ))
+            if preco is not None:
+                historico.append((platform, item_id, agora, preco))
+
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                """
+                INSERT INTO offers (platform, item_id, titulo, link, imagem, preco, moeda, preco_min, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (platform, item_id) DO UPDATE SET
+                    titulo = excluded.titulo,
+                    link = excluded.link,
+                    imagem = COALESCE(excluded.imagem, offers.imagem),
+                    preco = excluded.preco,
+                    moeda = excluded.moeda,
+                    preco_min = MIN(COALESCE(offers.preco_min, excluded.preco), COALESCE(excluded.preco, offers.preco_min)),
+                    atualizado_em = excluded.atualizado_em
+                """,
+                linhas,
+            )
+            self._conn.executemany(
+                "INSERT INTO price_history (platform, item_id, visto_em, preco) VALUES (?, ?, ?, ?)",
+                historico,
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def postados(self, platform: str, item_ids) -> set:
+        """Dos ids informados, devolve os que já foram postados."""
+        ids = [str(i) for i in item_ids]
+        if not ids:
+            return set()
+        return await self._rodar(self._postados, platform, ids)
+
+    def _postados(self, platform: str, ids: list) -> set:
+        marcadores = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT item_id FROM offers WHERE platform = ? AND postado_em IS NOT NULL AND item_id IN ({marcadores})",
+            [platform, *ids],
+        ).fetchall()
+        return {r["item_id"] for r in rows}
+
+    async def proxima(self, platform: str):
+        """
+        Reserva e devolve a próxima oferta a publicar: primeiro as nunca
+        postadas, depois as que baixaram de preço desde o último post.
+        Devolve None se o pool estiver vazio (hora de buscar no upstream).
+        """
+        return await self._rodar(self._proxima, platform)
+
+    def _proxima(self, platform: str):
+        agora = time.time()
+        row = self._conn.execute(
+            """
+            SELECT * FROM offers
+            WHERE platform = ? AND postado_em IS NULL AND atualizado_em >= ?
+            ORDER BY atualizado_em DESC LIMIT 1
+            """,
+            (platform, agora - POOL_MAX_AGE),
+        ).fetchone()
+        if row is None:
+            row = self._conn.execute(
+                """
+                SELECT * FROM offers
+                WHERE platform = ? AND preco < preco_postado AND postado_em <= ? AND atualizado_em >= ?
+                ORDER BY CAST(preco AS REAL) / preco_postado LIMIT 1
+                """,
+                (platform, agora - REPOST_COOLDOWN, agora - POOL_MAX_AGE),
+            ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE offers SET postado_em = ?, preco_postado = preco WHERE platform = ? AND item_id = ?",
+            (agora, platform, row["item_id"]),
+        )
+        return Offer(
+            fonte=platform,
+            titulo=row["titulo"],
+            link=row["link"],
+            preco_centavos=row["preco"],
+            moeda=row["moeda"] or "BRL",
+            imagem=row["imagem"],
+            item_id=row["item_id"],
+        )
+
+    async def marcar_postado(self, platform: str, item_id: str):
+        await self._rodar(
+            self._conn.execute,
+            "UPDATE offers SET postado_em = ?, preco_postado = preco WHERE platform = ? AND item_id = ?",
+            (time.time(), platform, str(item_id)),
+        )
+
+    async def remover(self, platform: str, item_ids):
+        """Tira ofertas do pool (anúncios encerrados); o histórico de preço fica."""
+        await self._rodar(
+            self._conn.executemany,
+            "DELETE FROM offers WHERE platform = ? AND item_id = ?",
+            [(platform, str(i)) for i in item_ids],
+        )
+
+    async def item_ids(self, platform: str, max_idade: float = None) -> list:
+        """Ids da plataforma vistos nos últimos `max_idade` s (todos se None)."""
+        desde = 0.0 if max_idade is None else time.time() - max_idade
+        rows = await self._rodar(self._consultar,
+                                 "SELECT item_id FROM offers WHERE platform = ? AND atualizado_em >= ?",
+                                 (platform, desde))
+        return [r["item_id"] for r in rows]
+
+    async def historico(self, platform: str, item_id: str, limite: int = 100):
+        rows = await self._rodar(self._consultar,
+                                 "SELECT visto_em, preco FROM price_history WHERE platform = ? AND item_id = ? "
+                                 "ORDER BY visto_em DESC LIMIT ?",
+                                 (platform, str(item_id), limite))
+        return [(r["visto_em"], r["preco"]) for r in rows]
+
+    def _consultar(self, sql: str, params) -> list:
+        return self._conn.execute(sql, params).fetchall()
+
+
+_store = None
+
+
+def get_store() -> OfferStore:
+    global _store
+    if _store is None:
+        _store = OfferStore()
+    return _store
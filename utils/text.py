@@ -1,7 +1,13 @@
-def formatar_oferta(o: dict) -> str:
-    fonte = o.get("fonte", "LOJA")
-    titulo = o.get("titulo", "Oferta")
-    preco = o.get("preco", "—")
-    link = o.get("link", "")
+from utils.offer import Offer
+
+
+def formatar_oferta(o) -> str:
     # Pode enriquecer com imagem (enviar como foto com caption, se quiser)
-    return f"🛒 <b>{fonte}</b>\n{titulo}\n💰 {preco}\n🔗 {link}"
+    if not isinstance(o, Offer):
+        o = Offer.from_dict(o)
+    return o.html()
+
+
+def formatar_digest(ofertas, titulo: str = "🔥 Ofertas do momento") -> str:
+    """Junta várias ofertas numa única mensagem (reaproveita o HTML memoizado)."""
+    return "\n\n".join([f"<b>{titulo}</b>", *(formatar_oferta(o) for o in ofertas)])
@@ -0,0 +1,340 @@
+"""
+Acompanhamento de preços de um conjunto vigiado de itens (ids do ML,
+item_id da Shopee, ASINs da Amazon), reprecificados em lote de tempos em
+tempos.
+
+Cada item ocupa um slot em arrays de inteiros: a série guarda o menor preço
+de cada dia numa janela circular de JANELA_DIAS posições, e o mínimo da
+janela fica em cache. Um preço novo é comparado com esse cache em O(1); o
+mínimo só é recalculado (O(JANELA_DIAS)) quando o dia que o continha sai da
+janela. Com 100k itens e 30 dias são ~13 MB de arrays e ~20 MB do índice
+de ids, fixos (TRACKER_MAX_ITEMS limita o total).
+
+Só vigia itens que o pool local viu nos últimos MAX_IDADE s; um id que sai
+do pool ou fica MAX_FALTAS rodadas sem preço (anúncio encerrado) é
+esquecido e o slot volta para a fila de livres.
+
+Só são emitidas mudanças de pelo menos LIMIAR em relação ao último preço
+emitido do item; `Mudanca.oferta` indica se o preço também ficou LIMIAR
+abaixo do mínimo da janela (uma oferta de verdade).
+"""
+import os
+import time
+import pickle
+import asyncio
+import logging
+import importlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+JANELA_DIAS = int(os.getenv("TRACKER_WINDOW_DAYS", 30))
+LIMIAR = float(os.getenv("TRACKER_MIN_CHANGE", 0.05))
+MAX_ITENS = int(os.getenv("TRACKER_MAX_ITEMS", 100_000))
+LOTE = int(os.getenv("TRACKER_BATCH", 1000))  # ids por rodada de reprecificação
+INTERVALO = float(os.getenv("TRACKER_INTERVAL", 1800))
+# ids vistos no pool há mais que isso deixam de ser vigiados
+MAX_IDADE = float(os.getenv("TRACKER_MAX_AGE", JANELA_DIAS * 86400))
+# rodadas seguidas sem preço até esquecer o id
+MAX_FALTAS = int(os.getenv("TRACKER_MAX_MISSES", 3))
+TRACKER_FILE = os.getenv("TRACKER_FILE", "data/tracker.pkl")
+
+SEM = -1  # posição vazia / sem preço
+DIA = 86400
+
+# plataforma -> "modulo:funcao" async funcao(ids) -> list[Offer] (importado na primeira rodada)
+REPRECIFICADORES = {
+    "MERCADOLIVRE": "ml_api:buscar_precos_mercadolivre",
+    "SHOPEE": "shopee_api:buscar_precos_shopee",
+    "AMAZON": "providers.amazon_api:buscar_precos_amazon",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Mudanca:
+    platform: str
+    item_id: str
+    preco: int      # centavos
+    anterior: int   # último preço emitido
+    minimo: int     # mínimo da janela antes deste preço (SEM se não havia)
+    variacao: float  # (preco - anterior) / anterior
+    oferta: bool    # preço LIMIAR abaixo do mínimo da janela
+
+
+class PriceTracker:
+    def __init__(self, max_itens: int = MAX_ITENS, dias: int = JANELA_DIAS, limiar: float = LIMIAR,
+                 max_faltas: int = MAX_FALTAS):
+        self.max_itens = max_itens
+        self.dias = dias
+        self.limiar = limiar
+        self.max_faltas = max_faltas
+        self._slots: Dict[tuple, int] = {}  # (platform, item_id) -> slot
+        self._chaves: List[Optional[tuple]] = []  # slot -> (platform, item_id)
+        self._livres: List[int] = []
+        self._dia = array("i")      # dia (epoch // 86400) da última observação
+        self._serie = array("i")    # slot * dias + dia % dias -> menor preço do dia
+        self._minimo = array("i")   # mínimo da janela (cache)
+        self._emitido = array("i")  # último preço emitido (referência das mudanças)
+        self._faltas = array("i")   # rodadas seguidas sem preço
+        self._cheio = False  # já avisou que está no limite
+        self.ultimas_ofertas: Dict[str, list] = {}  # plataforma -> Offers das últimas mudanças
+        self.encerrados: Dict[str, list] = {}  # plataforma -> ids esquecidos sem preço na última rodada
+
+    def __len__(self):
+        return len(self._slots)
+
+    def vigiar(self, platform: str, item_ids) -> int:
+        """Passa a acompanhar os ids; devolve quantos foram adicionados."""
+        novos = 0
+        for item_id in item_ids:
+            chave = (platform, str(item_id))
+            if chave in self._slots:
+                continue
+            if len(self._slots) >= self.max_itens:
+                metrics.contar("tracker_rejected_total", platform=platform)
+                if not self._cheio:
+                    self._cheio = True
+                    logger.warning(f"⚠️ Tracker cheio ({self.max_itens} itens); ignorando novos ids.")
+                break
+            if self._livres:
+                slot = self._livres.pop()
+                self._chaves[slot] = chave
+                self._limpar(slot)
+            else:
+                slot = len(self._chaves)
+                self._chaves.append(chave)
+                self._dia.append(SEM)
+                self._minimo.append(SEM)
+                self._emitido.append(SEM)
+                self._faltas.append(0)
+                self._serie.extend([SEM] * self.dias)
+            self._slots[chave] = slot
+            novos += 1
+        return novos
+
+    def esquecer(self, platform: str, item_id: str):
+        slot = self._slots.pop((platform, str(item_id)), None)
+        if slot is not None:
+            self._chaves[slot] = None
+            self._livres.append(slot)
+            self._cheio = False
+            metrics.contar("tracker_forgotten_total", platform=platform)
+
+    def sincronizar(self, platform: str, item_ids) -> tuple:
+        """
+        Deixa a plataforma vigiando exatamente `item_ids`: esquece os que
+        saíram e vigia os novos. Devolve (adicionados, esquecidos).
+        """
+        atuais = {str(i) for i in item_ids}
+        saiu = [i for i in self.ids(platform) if i not in atuais]
+        for item_id in saiu:
+            self.esquecer(platform, item_id)
+        return self.vigiar(platform, atuais), len(saiu)
+
+    def _limpar(self, slot: int):
+        self._dia[slot] = self._minimo[slot] = self._emitido[slot] = SEM
+        self._faltas[slot] = 0
+        base = slot * self.dias
+        self._serie[base:base + self.dias] = array("i", [SEM] * self.dias)
+
+    def _recalcular_minimo(self, slot: int):
+        base = slot * self.dias
+        validos = [p for p in self._serie[base:base + self.dias] if p != SEM]
+        self._minimo[slot] = min(validos) if validos else SEM
+
+    def _avancar(self, slot: int, dia: int):
+        """Esvazia as posições dos dias que saíram da janela."""
+        ultimo = self._dia[slot]
+        if ultimo == SEM or dia <= ultimo:
+            return
+        base = slot * self.dias
+        if dia - ultimo >= self.dias:
+            self._serie[base:base + self.dias] = array("i", [SEM] * self.dias)
+            self._minimo[slot] = SEM
+            return
+        minimo = self._minimo[slot]
+        saiu_minimo = False
+        for d in range(ultimo + 1, dia + 1):
+            pos = base + d % self.dias
+            if self._serie[pos] == minimo:
+                saiu_minimo = True
+            self._serie[pos] = SEM
+        if saiu_minimo:
+            self._recalcular_minimo(slot)
+
+    def minimo(self, platform: str, item_id: str) -> Optional[int]:
+        slot = self._slots.get((platform, str(item_id)))
+        if slot is None or self._minimo[slot] == SEM:
+            return None
+        return self._minimo[slot]
+
+    def serie(self, platform: str, item_id: str) -> List[Optional[int]]:
+        """Menor preço de cada dia da janela, do mais antigo ao mais recente."""
+        slot = self._slots.get((platform, str(item_id)))
+        if slot is None or self._dia[slot] == SEM:
+            return []
+        base, dia = slot * self.dias, self._dia[slot]
+        return [
+            None if (p := self._serie[base + d % self.dias]) == SEM else p
+            for d in range(dia - self.dias + 1, dia + 1)
+        ]
+
+    def observar(self, platform: str, item_id: str, centavos: Optional[int], agora: float = None) -> Optional[Mudanca]:
+        """Registra um preço; devolve a Mudanca se ela for significativa."""
+        slot = self._slots.get((platform, str(item_id)))
+        if slot is None or centavos is None or centavos <= 0:
+            return None
+        dia = int((agora if agora is not None else time.time()) // DIA)
+        self._avancar(slot, dia)
+        dia = max(dia, self._dia[slot])
+
+        minimo = self._minimo[slot]
+        pos = slot * self.dias + dia % self.dias
+        if self._serie[pos] == SEM or centavos < self._serie[pos]:
+            self._serie[pos] = centavos
+        if minimo == SEM or centavos < minimo:
+            self._minimo[slot] = centavos
+        self._dia[slot] = dia
+
+        anterior = self._emitido[slot]
+        if anterior == SEM:
+            self._emitido[slot] = centavos  # primeira observação vira referência
+            return None
+        variacao = (centavos - anterior) / anterior
+        if abs(variacao) < self.limiar:
+            return None
+        self._emitido[slot] = centavos
+        oferta = minimo != SEM and centavos <= minimo * (1 - self.limiar)
+        return Mudanca(platform, str(item_id), centavos, anterior, minimo, variacao, oferta)
+
+    def ids(self, platform: str) -> List[str]:
+        return [c[1] for c in self._chaves if c is not None and c[0] == platform]
+
+    async def reprecificar(self, plataformas=None) -> List[Mudanca]:
+        """
+        Busca o preço atual de todos os itens vigiados, em lotes de LOTE ids
+        (as plataformas em paralelo), e devolve só as mudanças significativas.
+        As ofertas dessas mudanças ficam em `self.ultimas_ofertas[plataforma]`
+        e os ids esquecidos por falta de preço em `self.encerrados[plataforma]`.
+        """
+        self.ultimas_ofertas = {}
+        self.encerrados = {}
+        alvos = [p for p in (plataformas or REPRECIFICADORES) if p in REPRECIFICADORES]
+        lotes = await asyncio.gather(*(self._reprecificar(p) for p in alvos))
+        return [m for lote in lotes for m in lote]
+
+    async def _reprecificar(self, platform: str) -> List[Mudanca]:
+        ids = self.ids(platform)
+        if not ids:
+            return []
+        modulo, _, nome = REPRECIFICADORES[platform].partition(":")
+        buscar = getattr(importlib.import_module(modulo), nome)
+        mudancas = []
+        ofertas_mudadas = self.ultimas_ofertas[platform] = []
+        agora = time.time()
+        with metrics.cronometro("tracker_reprice_seconds", platform=platform):
+            for i in range(0, len(ids), LOTE):
+                try:
+                    ofertas = await buscar(ids[i:i + LOTE])
+                except Exception as e:
+                    logger.error(f"❌ Falha reprecificando {platform}: {e}")
+                    continue
+                com_preco = set()
+                for o in ofertas:
+                    if o.preco_centavos:
+                        com_preco.add(o.chave)
+                    m = self.observar(platform, o.chave, o.preco_centavos, agora)
+                    if m is not None:
+                        mudancas.append(m)
+                        ofertas_mudadas.append(o)
+                self._contar_faltas(platform, ids[i:i + LOTE], com_preco)
+        metrics.contar("tracker_changes_total", len(mudancas), platform=platform)
+        metrics.definir("tracker_items", len(ids), platform=platform)
+        return mudancas
+
+    def _contar_faltas(self, platform: str, ids, com_preco: set):
+        """Esquece quem ficou max_faltas rodadas seguidas sem preço (anúncio encerrado)."""
+        for item_id in ids:
+            slot = self._slots.get((platform, item_id))
+            if slot is None:
+                continue
+            if item_id in com_preco:
+                self._faltas[slot] = 0
+                continue
+            self._faltas[slot] += 1
+            if self._faltas[slot] >= self.max_faltas:
+                self.esquecer(platform, item_id)
+                self.encerrados.setdefault(platform, []).append(item_id)
+
+    def salvar(self, path: str = TRACKER_FILE):
+        pasta = os.path.dirname(path) or "."
+        os.makedirs(pasta, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "dias": self.dias, "chaves": self._chaves, "livres": self._livres,
+                "dia": self._dia, "serie": self._serie, "minimo": self._minimo, "emitido": self._emitido,
+                "faltas": self._faltas,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def carregar(self, path: str = TRACKER_FILE) -> bool:
+        try:
+            with open(path, "rb") as f:
+                dados = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False
+        if dados.get("dias") != self.dias:
+            logger.warning("⚠️ Snapshot do tracker com outra janela; começando do zero.")
+            return False
+        self._chaves, self._livres = dados["chaves"], dados["livres"]
+        self._dia, self._serie = dados["dia"], dados["serie"]
+        self._minimo, self._emitido = dados["minimo"], dados["emitido"]
+        self._faltas = dados.get("faltas") or array("i", [0] * len(self._chaves))
+        self._slots = {c: i for i, c in enumerate(self._chaves) if c is not None}
+        return True
+
+
+_tracker = None
+
+
+def get_tracker() -> PriceTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = PriceTracker()
+        _tracker.carregar()
+    return _tracker
+
+
+async def manter_precos():
+    """
+    Loop de fundo: vigia os itens vistos no pool local nos últimos MAX_IDADE
+    s (esquecendo os que saíram), reprecifica tudo em lote a
+    cada INTERVALO s e grava no pool só os itens cujo preço mudou de verdade
+    (as quedas entram na fila de repost do OfferStore). Os ids que ficaram
+    sem preço saem do pool, senão voltariam a ser vigiados na rodada seguinte.
+    """
+    from utils.store import get_store
+
+    tracker = get_tracker()
+    store = get_store()
+    while True:
+        try:
+            for platform in REPRECIFICADORES:
+                tracker.sincronizar(platform, await store.item_ids(platform, MAX_IDADE))
+            mudancas = await tracker.reprecificar()
+            for platform, ofertas in tracker.ultimas_ofertas.items():
+                if ofertas:
+                    await store.registrar(platform, ofertas)
+            for platform, ids in tracker.encerrados.items():
+                await store.remover(platform, ids)
+            tracker.salvar()
+            quedas = sum(1 for m in mudancas if m.oferta)
+            logger.info(f"📉 Reprecificação: {len(tracker)} itens, {len(mudancas)} mudanças, {quedas} abaixo do mínimo.")
+        except Exception as e:
+            logger.error(f"❌ Erro na reprecificação: {e}")
+        await asyncio.sleep(INTERVALO)